@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 32
+# A call is "healthy" when its latency stays within this factor of the smoothed latency.
+HEALTHY_LATENCY_FACTOR = 2.0
+LATENCY_EWMA_ALPHA = 0.2
+DECREASE_FACTOR = 0.5
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit for asyncio tasks with additive-increase / multiplicative-decrease:
+    each healthy completion adds 1/limit (about +1 per full window), while a throttle
+    (429) or timeout halves the limit, at most once per window of in-flight calls.
+    """
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL_LIMIT,
+        minimum: int = DEFAULT_MIN_LIMIT,
+        maximum: int = DEFAULT_MAX_LIMIT,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self.peak_limit = self.limit
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_decrease = 0.0
+
+    def _cond(self) -> asyncio.Condition:
+        # Created per event loop, so the limit carries over between asyncio.run() batches.
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self.in_flight = 0
+        return self._condition
+
+    async def acquire(self) -> float:
+        """
+        Waits for a free slot; returns the start time to pass to release().
+        """
+        async with self._cond():
+            await self._cond().wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started: float, outcome: str = "ok") -> None:
+        """
+        outcome: "ok", "throttled" (429) or "timeout" shrink/grow the limit; anything else
+        (e.g. "error") only frees the slot.
+        """
+        latency = time.monotonic() - started
+        async with self._cond():
+            self.in_flight -= 1
+            if outcome == "ok":
+                healthy = self.latency_ewma is None or latency <= self.latency_ewma * HEALTHY_LATENCY_FACTOR
+                self.latency_ewma = (
+                    latency
+                    if self.latency_ewma is None
+                    else (1 - LATENCY_EWMA_ALPHA) * self.latency_ewma + LATENCY_EWMA_ALPHA * latency
+                )
+                if healthy and self.limit < self.maximum:
+                    self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                    self.peak_limit = max(self.peak_limit, self.limit)
+                    self.increases += 1
+            elif outcome in ("throttled", "timeout") and started >= self._last_decrease:
+                # Calls started before the last decrease saw the old limit; don't punish twice.
+                self.limit = max(float(self.minimum), self.limit * DECREASE_FACTOR)
+                self._last_decrease = time.monotonic()
+                self.decreases += 1
+            self._cond().notify_all()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": round(self.limit, 2),
+            "peak_limit": round(self.peak_limit, 2),
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "latency_ewma_seconds": round(self.latency_ewma or 0.0, 3),
+        }
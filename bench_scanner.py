@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from paths import BASE_DIR, CACHE_DIR
+from project_scanner import DEFAULT_EXCLUDE_DIRS, ProjectScanner
+
+BENCH_DIR = os.path.join(CACHE_DIR, "bench")
+RESULTS_VERSION = 1
+# Bump when the generator changes so cached trees are rebuilt.
+GENERATOR_VERSION = 1
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_BUDGET = 400_000
+
+TEXT_EXTS = (".py", ".py", ".py", ".md", ".json", ".yaml", ".txt", ".toml")
+IGNORED_EXTS = (".js", ".css", ".lock", ".csv")
+EXCLUDED_DIR_NAMES = ("node_modules", "__pycache__", ".venv", "build", ".git")
+PACKAGE_WORDS = ("core", "api", "utils", "models", "services", "io", "legacy", "plugins", "engine", "adapters")
+
+
+@dataclass
+class TreeInfo:
+    """
+    Summary of a generated synthetic tree (candidate = passes the scanner's dir/ext filters).
+    """
+
+    root: str
+    total_files: int
+    candidate_files: int
+    candidate_bytes: int
+    max_depth: int
+
+
+@dataclass
+class BenchResult:
+    tree_files: int
+    profile: str
+    max_chars: Optional[int]  # None = budget large enough for every candidate file
+    repeats: int
+    seconds_min: float
+    seconds_median: float
+    files_per_sec: Optional[float]
+    mb_per_sec: Optional[float]
+    peak_memory_bytes: Optional[int]
+    chars_collected: int
+    budget_utilization: Optional[float]
+    files_included: int
+    stopped_due_to_limit: bool
+    skipped_large: int
+    skipped_binary: int
+    skipped_generated: int
+    manifest_hits: int
+    manifest_misses: int
+
+
+def _python_source(rng: random.Random, target_bytes: int) -> str:
+    lines = ['"""Synthetic module for scanner benchmarks."""', "import os", "from typing import Dict, List", ""]
+    index = 0
+    while sum(len(line) + 1 for line in lines) < target_bytes:
+        name = f"{rng.choice(PACKAGE_WORDS)}_{index}"
+        lines.append(f"def handle_{name}(items: List[str], limit: int = {rng.randint(1, 500)}) -> Dict[str, int]:")
+        lines.append(f'    """Counts {name} entries up to the limit."""')
+        lines.append("    counts: Dict[str, int] = {}")
+        lines.append("    for item in items[:limit]:")
+        lines.append("        counts[item] = counts.get(item, 0) + 1")
+        lines.append("    return counts")
+        lines.append("")
+        index += 1
+    return "\n".join(lines) + "\n"
+
+
+def _prose(rng: random.Random, target_bytes: int) -> str:
+    words = PACKAGE_WORDS + ("scanner", "budget", "context", "project", "task", "report", "stage")
+    lines = ["# Notes", ""]
+    size = 0
+    while size < target_bytes:
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(6, 14)))
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _file_size(rng: random.Random) -> int:
+    roll = rng.random()
+    if roll < 0.70:
+        return rng.randint(100, 2_000)
+    if roll < 0.95:
+        return rng.randint(2_000, 20_000)
+    if roll < 0.99:
+        return rng.randint(20_000, 90_000)
+    return rng.randint(120_000, 400_000)  # over the default max_file_chars
+
+
+def _file_body(rng: random.Random, ext: str, size: int) -> bytes:
+    kind = rng.random()
+    if kind < 0.02:
+        return bytes(rng.getrandbits(8) for _ in range(min(size, 4_096)))  # binary under a text ext
+    if kind < 0.03:
+        return b"// @generated by protoc. DO NOT EDIT.\n" + b"x = 1\n" * (size // 6)
+    if kind < 0.04:
+        return (b"var a=1;" * 80 + b"\n") * max(1, size // 641)  # minified
+    if ext == ".py":
+        return _python_source(rng, size).encode("utf-8")
+    if ext == ".json":
+        entries = ",\n".join(f'  "key_{i}": {i}' for i in range(max(1, size // 16)))
+        return ("{\n" + entries + "\n}\n").encode("utf-8")
+    return _prose(rng, size).encode("utf-8")
+
+
+def generate_tree(root: str, n_files: int, seed: int = 0) -> TreeInfo:
+    """
+    Writes a deterministic synthetic project: nested packages (up to 8 levels), mixed sizes and
+    extensions, excluded directories, files with non-included extensions, binaries, minified
+    and generated files.
+    """
+    rng = random.Random(seed * 1_000_003 + n_files)
+    os.makedirs(root, exist_ok=True)
+    dirs = [""]
+    max_depth = 0
+    candidate_files = candidate_bytes = 0
+    for index in range(n_files):
+        if rng.random() < 0.08 or len(dirs) == 1:
+            parent = rng.choice(dirs)
+            depth = parent.count("/") + 1 if parent else 0
+            if depth < 8:
+                child = f"{rng.choice(PACKAGE_WORDS)}{len(dirs)}"
+                dirs.append(f"{parent}/{child}" if parent else child)
+                max_depth = max(max_depth, depth + 1)
+        rel_dir = rng.choice(dirs)
+        excluded = rng.random() < 0.10
+        if excluded:
+            rel_dir = f"{rel_dir}/{rng.choice(EXCLUDED_DIR_NAMES)}" if rel_dir else rng.choice(EXCLUDED_DIR_NAMES)
+        ext = rng.choice(IGNORED_EXTS) if rng.random() < 0.10 else rng.choice(TEXT_EXTS)
+        size = _file_size(rng)
+        body = _file_body(rng, ext, size)
+        abs_dir = os.path.join(root, rel_dir)
+        os.makedirs(abs_dir, exist_ok=True)
+        with open(os.path.join(abs_dir, f"file_{index}{ext}"), "wb") as handle:
+            handle.write(body)
+        if not excluded and ext not in IGNORED_EXTS:
+            candidate_files += 1
+            candidate_bytes += len(body)
+    return TreeInfo(root, n_files, candidate_files, candidate_bytes, max_depth)
+
+
+def ensure_tree(n_files: int, seed: int = 0, base_dir: str = BENCH_DIR) -> TreeInfo:
+    """
+    Returns a cached synthetic tree, generating it on first use.
+    """
+    root = os.path.join(base_dir, f"tree-v{GENERATOR_VERSION}-{n_files}-s{seed}")
+    info_path = root + ".json"
+    if os.path.isdir(root) and os.path.exists(info_path):
+        with open(info_path, "r", encoding="utf-8") as handle:
+            return TreeInfo(**json.load(handle))
+    shutil.rmtree(root, ignore_errors=True)
+    print(f"[INFO] Generating synthetic tree with {n_files} files at {root}")
+    info = generate_tree(root, n_files, seed)
+    with open(info_path, "w", encoding="utf-8") as handle:
+        json.dump(asdict(info), handle)
+    return info
+
+
+def _task_defaults(root: str, manifest_path: str) -> ProjectScanner:
+    """
+    Scanner as task runs build it (meta_core.scanner_options with config.json), with the
+    manifest kept next to the benchmark's own.
+    """
+    from meta_core import scanner_options
+
+    options = scanner_options()
+    if options.get("use_manifest"):
+        options["manifest_path"] = os.path.join(os.path.dirname(manifest_path), "task_defaults_manifest.json")
+    return ProjectScanner(root, **options)
+
+
+def _profiles(manifest_path: str) -> Dict[str, Callable[[str], ProjectScanner]]:
+    """
+    Scanner configurations to measure. manifest_warm must run after manifest_cold.
+    """
+    return {
+        "serial": lambda root: ProjectScanner(root),
+        "parallel": lambda root: ProjectScanner(root, parallel=True),
+        "manifest_cold": lambda root: ProjectScanner(root, parallel=True, use_manifest=True, manifest_path=manifest_path),
+        "manifest_warm": lambda root: ProjectScanner(root, parallel=True, use_manifest=True, manifest_path=manifest_path),
+        "task_defaults": lambda root: _task_defaults(root, manifest_path),
+    }
+
+
+def _timed_run(factory: Callable[[str], ProjectScanner], root: str, max_chars: int) -> Tuple[float, ProjectScanner, int]:
+    scanner = factory(root)
+    started = time.perf_counter()
+    context = scanner.collect_project_context(max_chars=max_chars)
+    return time.perf_counter() - started, scanner, len(context)
+
+
+def _peak_memory(factory: Callable[[str], ProjectScanner], root: str, max_chars: int) -> int:
+    tracemalloc.start()
+    try:
+        factory(root).collect_project_context(max_chars=max_chars)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_tree(
+    info: TreeInfo,
+    budgets: List[Optional[int]],
+    profiles: Optional[List[str]] = None,
+    repeats: int = 3,
+    measure_memory: bool = True,
+) -> List[BenchResult]:
+    """
+    Times collect_project_context for each profile and budget on one tree.
+    Throughput (files/sec, MB/sec) is only reported for full-budget runs, where every candidate
+    file is examined; budgeted walk runs stop early and are reported as latency.
+    """
+    results: List[BenchResult] = []
+    with tempfile.TemporaryDirectory(prefix="bench-manifest-") as tmp_dir:
+        manifest_path = os.path.join(tmp_dir, "manifest.json")
+        available = _profiles(manifest_path)
+        for name in profiles or list(available):
+            factory = available[name]
+            for budget in budgets:
+                # Headers add ~20 chars per file; a 2x margin keeps the full budget from binding.
+                max_chars = budget if budget is not None else info.candidate_bytes * 2 + info.candidate_files * 64
+                if name == "manifest_cold" and os.path.exists(manifest_path):
+                    os.remove(manifest_path)
+                if name == "manifest_warm" and not os.path.exists(manifest_path):
+                    _timed_run(factory, info.root, max_chars)
+                timings: List[float] = []
+                scanner = None
+                chars = 0
+                for _ in range(max(1, repeats if name != "manifest_cold" else 1)):
+                    if name == "manifest_cold" and os.path.exists(manifest_path):
+                        os.remove(manifest_path)
+                    seconds, scanner, chars = _timed_run(factory, info.root, max_chars)
+                    timings.append(seconds)
+                peak = None
+                if measure_memory:
+                    if name == "manifest_cold" and os.path.exists(manifest_path):
+                        os.remove(manifest_path)
+                    peak = _peak_memory(factory, info.root, max_chars)
+                best = min(timings)
+                stats = scanner.stats
+                full = budget is None
+                results.append(
+                    BenchResult(
+                        tree_files=info.total_files,
+                        profile=name,
+                        max_chars=budget,
+                        repeats=len(timings),
+                        seconds_min=round(best, 6),
+                        seconds_median=round(statistics.median(timings), 6),
+                        files_per_sec=round(info.candidate_files / best, 1) if full and best > 0 else None,
+                        mb_per_sec=round(info.candidate_bytes / 1_048_576 / best, 2) if full and best > 0 else None,
+                        peak_memory_bytes=peak,
+                        chars_collected=chars,
+                        budget_utilization=round(chars / budget, 4) if budget else None,
+                        files_included=stats.files_included,
+                        stopped_due_to_limit=stats.stopped_due_to_limit,
+                        skipped_large=len(stats.skipped_large_files),
+                        skipped_binary=len(stats.skipped_binary_files),
+                        skipped_generated=len(stats.skipped_generated_files),
+                        manifest_hits=stats.manifest_hits,
+                        manifest_misses=stats.manifest_misses,
+                    )
+                )
+                print(
+                    f"[INFO] {info.total_files:>7} files  {name:<14} budget={budget or 'full'}: "
+                    f"{best:.3f}s"
+                    + (f", {results[-1].files_per_sec} files/s, {results[-1].mb_per_sec} MB/s" if full else "")
+                    + (f", peak {peak / 1_048_576:.1f} MiB" if peak is not None else "")
+                )
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        proc = subprocess.run(
+            ["git", "-C", BASE_DIR, "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except OSError:
+        return None
+    return proc.stdout.strip() or None if proc.returncode == 0 else None
+
+
+def compare_results(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """
+    Returns one line per (tree, profile, budget) present in both result files with the change
+    in best time and peak memory.
+    """
+
+    def _key(row: Dict[str, Any]) -> Tuple[int, str, Optional[int]]:
+        return row["tree_files"], row["profile"], row["max_chars"]
+
+    before = {_key(row): row for row in previous.get("results", [])}
+    lines: List[str] = []
+    for row in current.get("results", []):
+        old = before.get(_key(row))
+        if not old or not old.get("seconds_min"):
+            continue
+        delta = (row["seconds_min"] - old["seconds_min"]) / old["seconds_min"] * 100
+        line = (
+            f"{row['tree_files']:>7} files  {row['profile']:<14} budget={row['max_chars'] or 'full'}: "
+            f"{old['seconds_min']:.3f}s -> {row['seconds_min']:.3f}s ({delta:+.1f}%)"
+        )
+        if old.get("peak_memory_bytes") and row.get("peak_memory_bytes"):
+            mem_delta = (row["peak_memory_bytes"] - old["peak_memory_bytes"]) / old["peak_memory_bytes"] * 100
+            line += f", memory {mem_delta:+.1f}%"
+        lines.append(line)
+    return lines
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ProjectScanner benchmark on synthetic trees")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES), help="Comma-separated tree sizes (files).")
+    parser.add_argument(
+        "--budgets",
+        default=f"{DEFAULT_BUDGET},full",
+        help="Comma-separated max_chars budgets; 'full' fits every candidate file (throughput run).",
+    )
+    parser.add_argument("--profiles", default="", help="Comma-separated profiles (default: all).")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory run.")
+    parser.add_argument("--trees-dir", default=BENCH_DIR, help="Where synthetic trees are cached.")
+    parser.add_argument("--output", default="", help="Results JSON path (default: cache/bench/results-<timestamp>.json).")
+    parser.add_argument("--compare", default="", help="Previous results JSON to compare against.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    budgets: List[Optional[int]] = [
+        None if budget.strip().lower() == "full" else int(budget) for budget in args.budgets.split(",") if budget.strip()
+    ]
+    profiles = [name.strip() for name in args.profiles.split(",") if name.strip()] or None
+    unknown = set(profiles or []) - set(_profiles(""))
+    if unknown:
+        print(f"[ERROR] Unknown profiles: {', '.join(sorted(unknown))}")
+        return 1
+
+    results: List[BenchResult] = []
+    trees: List[Dict[str, Any]] = []
+    for size in sizes:
+        info = ensure_tree(size, seed=args.seed, base_dir=args.trees_dir)
+        trees.append(asdict(info))
+        results.extend(bench_tree(info, budgets, profiles, repeats=args.repeats, measure_memory=not args.no_memory))
+
+    payload = {
+        "version": RESULTS_VERSION,
+        "generator_version": GENERATOR_VERSION,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "excluded_dirs": sorted(DEFAULT_EXCLUDE_DIRS),
+        "trees": trees,
+        "results": [asdict(result) for result in results],
+    }
+    output = args.output or os.path.join(BENCH_DIR, f"results-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(payload, handle, indent=2)
+    print(f"[INFO] Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as handle:
+            previous = json.load(handle)
+        for line in compare_results(previous, payload):
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
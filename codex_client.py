@@ -1,11 +1,33 @@
+import asyncio
 import os
-from typing import List, Optional
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from adaptive_concurrency import AIMDLimiter
+from llm_retry import RetryPolicy, is_throttle, is_timeout
+from prompt_budget import PromptBudgetAllocator, TokenCalibration
+from rate_limiter import TokenBucketLimiter
+from response_cache import ResponseCache, get_response_cache, response_cache_key
+
+_DEFAULT_CACHE = object()
+_OUTCOME_STATS = {"hit": "hits", "miss": "misses", "shared": "shared"}
+SYSTEM_PROMPT = (
+    "You are an autonomous code-generation and refactoring agent "
+    "inside a Meta-Agent pipeline. Follow instructions precisely, "
+    "output only code or patches when required."
+)
 
 
 class CodexClient:
-    def __init__(self, mode: Optional[str] = None):
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        response_cache: Optional[ResponseCache] = _DEFAULT_CACHE,
+        rate_limiter: Optional[TokenBucketLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
         # Determine mode: env has priority, then provided arg, default dev
         env_mode = os.getenv("META_AGENT_MODE")
         resolved_mode = (env_mode or mode or "dev").strip().lower()
@@ -18,7 +40,8 @@ class CodexClient:
         if not self.api_key:
             raise RuntimeError("API key not set in environment variables")
 
-        self.client = OpenAI(api_key=self.api_key)
+        # retries are handled below (shared rate limiter + backoff), not by the SDK
+        self.client = OpenAI(api_key=self.api_key, max_retries=0)
 
         # more stable model for long prompts
         self.model = "gpt-4.1"
@@ -26,39 +49,223 @@ class CodexClient:
         # max chunk size to avoid 400 errors
         self.chunk_size = 12000
 
+        # token budget for the model window; calibrated from recorded usage
+        self.calibration = TokenCalibration()
+        self.budget = PromptBudgetAllocator(
+            self.model, calibration=self.calibration, system_prompt=SYSTEM_PROMPT, chunk_chars=self.chunk_size
+        )
+
+        # identical requests (e.g. a re-run after a failed stage) are answered from disk;
+        # pass response_cache=None to always call the API
+        self.response_cache = get_response_cache() if response_cache is _DEFAULT_CACHE else response_cache
+        self.cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "shared": 0}
+
+        # transient failures are retried with backoff; every attempt first takes its share of
+        # the host-wide requests/min and tokens/min quota
+        self.rate_limiter = rate_limiter or TokenBucketLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_stats: Dict[str, float] = {"retries": 0, "throttled": 0, "backoff_seconds": 0.0}
+
     def _chunk_prompt(self, text: str) -> List[str]:
         """Split large prompts into smaller chunks."""
         return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
 
+    def _prepare(self, prompt: str) -> Tuple[List[dict], dict, int, Optional[str]]:
+        """
+        (messages, params, prompt_chars, error) for a prompt; error is set when the prompt
+        does not fit the model window.
+        """
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+
+        for chunk in self._chunk_prompt(prompt):
+            messages.append({"role": "user", "content": chunk})
+
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        estimated_tokens = self.budget.estimate_chat_tokens(prompt)
+        max_prompt_tokens = self.budget.window_tokens - self.budget.output_reserve
+        error = None
+        if estimated_tokens > max_prompt_tokens:
+            error = (
+                f"[ERROR] CodexClient rejected prompt: ~{estimated_tokens} tokens exceeds "
+                f"{max_prompt_tokens}-token budget for {self.model}"
+            )
+        params = {"max_tokens": self.budget.output_reserve, "temperature": 0}
+        return messages, params, prompt_chars, error
+
+    @staticmethod
+    def _cacheable(response) -> bool:
+        return isinstance(response, str) and not response.lstrip().startswith("[ERROR]")
+
     def send(self, prompt: str) -> str:
         """
         Sends prompt to Codex with safe chunking and stable formatting.
         Avoids invalid_request_error and ensures compatibility with chat models.
         """
+        messages, params, prompt_chars, error = self._prepare(prompt)
+        if error:
+            return error
+        if self.response_cache is None:
+            return self._complete(messages, params, prompt_chars)
+        key = response_cache_key(self.model, messages, params)
+        response, outcome = self.response_cache.get_or_compute(
+            key,
+            lambda: self._complete(messages, params, prompt_chars),
+            cacheable=self._cacheable,
+            model=self.model,
+        )
+        self.cache_stats[_OUTCOME_STATS[outcome]] += 1
+        return response
 
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "You are an autonomous code-generation and refactoring agent "
-                    "inside a Meta-Agent pipeline. Follow instructions precisely, "
-                    "output only code or patches when required."
-                ),
-            }
-        ]
+    def _request_tokens(self, prompt_chars: int, params: dict) -> int:
+        # providers count max_tokens against the tokens/min quota up front
+        return int(prompt_chars / self.budget.chars_per_token()) + int(params.get("max_tokens", 0))
 
-        for chunk in self._chunk_prompt(prompt):
-            messages.append({"role": "user", "content": chunk})
+    def _backoff(self, exc: BaseException, attempt: int) -> float:
+        """
+        Delay before the next attempt, recorded in retry_stats. The caller pauses the other
+        processes (rate_limiter.penalize) when the failure was a throttle.
+        """
+        delay = self.retry_policy.delay(attempt, exc)
+        self.retry_stats["retries"] += 1
+        self.retry_stats["backoff_seconds"] += delay
+        if is_throttle(exc):
+            self.retry_stats["throttled"] += 1
+        print(f"[WARN] CodexClient attempt {attempt + 1} failed ({type(exc).__name__}); retrying in {delay:.1f}s")
+        return delay
+
+    def _complete(self, messages: List[dict], params: dict, prompt_chars: int) -> str:
+        request_tokens = self._request_tokens(prompt_chars, params)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(request_tokens)
+            try:
+                response = self.client.chat.completions.create(model=self.model, messages=messages, **params)
+                self._record_usage(response, prompt_chars)
+                return response.choices[0].message.content
+
+            except Exception as e:
+                if not self.retry_policy.should_retry(e, attempt):
+                    return f"[ERROR] CodexClient failed: {str(e)}"
+                delay = self._backoff(e, attempt)
+                if is_throttle(e):
+                    self.rate_limiter.penalize(delay)
+                time.sleep(delay)
+                attempt += 1
+
+    def _record_usage(self, response, prompt_chars: int) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "prompt_tokens", None):
+            try:
+                self.calibration.record(self.model, prompt_chars, int(usage.prompt_tokens))
+            except OSError:
+                pass
 
+
+class AsyncCodexClient(CodexClient):
+    """
+    CodexClient with an asyncio API for batches: send_many runs prompts concurrently under an
+    AIMD limit that grows while latency stays healthy and halves on 429s and timeouts.
+    Shares the response cache (identical prompts in a batch are sent once).
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        response_cache: Optional[ResponseCache] = _DEFAULT_CACHE,
+        limiter: Optional[AIMDLimiter] = None,
+        request_timeout: float = 300.0,
+        rate_limiter: Optional[TokenBucketLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        super().__init__(mode=mode, response_cache=response_cache, rate_limiter=rate_limiter, retry_policy=retry_policy)
+        self.async_client: Optional[AsyncOpenAI] = None  # bound to the running event loop
+        self.limiter = limiter or AIMDLimiter()
+        self.request_timeout = request_timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def _complete_async(self, messages: List[dict], params: dict, prompt_chars: int) -> str:
+        if self.async_client is None:
+            self.async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        request_tokens = self._request_tokens(prompt_chars, params)
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async(request_tokens)
+            started = await self.limiter.acquire()
+            outcome = "error"
+            try:
+                response = await asyncio.wait_for(
+                    self.async_client.chat.completions.create(model=self.model, messages=messages, **params),
+                    timeout=self.request_timeout,
+                )
+                outcome = "ok"
+                self._record_usage(response, prompt_chars)
+                return response.choices[0].message.content
+            except Exception as e:
+                failure = e
+                outcome = "throttled" if is_throttle(e) else "timeout" if is_timeout(e) else "error"
+            finally:
+                # The slot is freed before backing off, so waiting retries don't hold concurrency.
+                await self.limiter.release(started, outcome)
+            if not self.retry_policy.should_retry(failure, attempt):
+                return f"[ERROR] CodexClient failed: {str(failure)}"
+            delay = self._backoff(failure, attempt)
+            if is_throttle(failure):
+                await self.rate_limiter.penalize_async(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def send_async(self, prompt: str) -> str:
+        messages, params, prompt_chars, error = self._prepare(prompt)
+        if error:
+            return error
+        if self.response_cache is None:
+            return await self._complete_async(messages, params, prompt_chars)
+        key = response_cache_key(self.model, messages, params)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.cache_stats["shared"] += 1
+            return await asyncio.shield(pending)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self.cache_stats["hits"] += 1
+            return cached
+        self.cache_stats["misses"] += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=4096,
-                temperature=0,
-            )
+            response = await self._complete_async(messages, params, prompt_chars)
+            if self._cacheable(response):
+                try:
+                    self.response_cache.put(key, response, self.model)
+                except OSError as exc:
+                    print(f"[WARN] Could not cache model response: {exc}")
+            future.set_result(response)
+            return response
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
 
-            return response.choices[0].message.content
+    async def send_many_async(self, prompts: Sequence[str]) -> List[str]:
+        async with AsyncOpenAI(api_key=self.api_key, max_retries=0) as client:
+            self.async_client = client
+            try:
+                return list(await asyncio.gather(*(self.send_async(prompt) for prompt in prompts)))
+            finally:
+                self.async_client = None
 
-        except Exception as e:
-            return f"[ERROR] CodexClient failed: {str(e)}"
+    def send_many(self, prompts: Sequence[str]) -> List[str]:
+        """
+        Sends prompts concurrently and returns the responses in input order (failed calls
+        return "[ERROR] ..." strings, like send). Must not be called from a running loop.
+        """
+        if not prompts:
+            return []
+        started = time.perf_counter()
+        responses = asyncio.run(self.send_many_async(prompts))
+        print(
+            f"[INFO] send_many: {len(prompts)} prompts in {time.perf_counter() - started:.1f}s "
+            f"(concurrency {self.limiter.stats()})"
+        )
+        return responses
@@ -0,0 +1,119 @@
+import hashlib
+import re
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+# First line of each scanner chunk: "### FILE: path", "### OUTLINE: path", ...
+CHUNK_HEADER = re.compile(r"### (FILE|OUTLINE|EXCERPT|GIT DIFF): ?([^\n]*)")
+TIERS = {"FILE": "file", "OUTLINE": "outline", "EXCERPT": "excerpt", "GIT DIFF": "diff"}
+
+
+class ContextEntry:
+    """
+    One chunk of project context: the file it came from, its tier (file | reference |
+    outline | excerpt | diff), the file's content digest if known, and its character span in
+    the bundle.
+    """
+
+    __slots__ = ("path", "tier", "digest", "offset", "length")
+
+    def __init__(self, path: str, tier: str, digest: Optional[str], offset: int, length: int):
+        self.path = path
+        self.tier = tier
+        self.digest = digest
+        self.offset = offset
+        self.length = length
+
+    def to_dict(self) -> Dict:
+        return {"path": self.path, "tier": self.tier, "chars": self.length, "digest": self.digest}
+
+
+class ContextBundle:
+    """
+    Project context as the scanner produced it: the chunk strings plus one ContextEntry per
+    chunk. Chunks are never concatenated here; the prompt is joined once at assembly time, and
+    budgeting drops whole entries in place.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: List[str] = []
+        self.entries: List[ContextEntry] = []
+        self.chars = 0
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[str], digests: Optional[Dict[str, str]] = None) -> "ContextBundle":
+        bundle = cls()
+        for chunk in chunks:
+            bundle.append(chunk, digests=digests)
+        return bundle
+
+    def append(self, chunk: str, path: Optional[str] = None, tier: Optional[str] = None, digests: Optional[Dict[str, str]] = None) -> None:
+        """
+        Adds a chunk; path and tier are read from its header line when not given.
+        """
+        if path is None or tier is None:
+            match = CHUNK_HEADER.match(chunk)
+            header_tier, header_path = (TIERS[match.group(1)], match.group(2).strip()) if match else ("text", "")
+            if header_tier == "file" and chunk.startswith("(same as ", len(match.group(0)) + 1):
+                header_tier = "reference"
+            if header_tier == "diff":
+                header_path = ""
+            path = header_path if path is None else path
+            tier = header_tier if tier is None else tier
+        digest = (digests or {}).get(path) if path else None
+        self.chunks.append(chunk)
+        self.entries.append(ContextEntry(path, tier, digest, self.chars, len(chunk)))
+        self.chars += len(chunk)
+
+    def __len__(self) -> int:
+        return self.chars
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.chunks)
+
+    def truncate(self, max_chars: int) -> int:
+        """
+        Drops trailing entries until the bundle fits in max_chars, so no chunk is sent half
+        cut. Returns the number of entries dropped.
+        """
+        if self.chars <= max_chars:
+            return 0
+        keep = len(self.entries)
+        while keep and self.entries[keep - 1].offset + self.entries[keep - 1].length > max_chars:
+            keep -= 1
+        dropped = len(self.entries) - keep
+        del self.chunks[keep:]
+        del self.entries[keep:]
+        self.chars = self.entries[-1].offset + self.entries[-1].length if self.entries else 0
+        return dropped
+
+    def write_to(self, handle: IO[str]) -> int:
+        for chunk in self.chunks:
+            handle.write(chunk)
+        return self.chars
+
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def digest(self) -> str:
+        """
+        Hash over the chunk contents, e.g. for cache keys.
+        """
+        hasher = hashlib.sha256()
+        for chunk in self.chunks:
+            hasher.update(chunk.encode("utf-8"))
+        return hasher.hexdigest()
+
+    def files(self, tier: Optional[str] = None) -> List[str]:
+        """
+        Distinct file paths in the bundle (optionally of one tier), in send order.
+        """
+        return list(dict.fromkeys(entry.path for entry in self.entries if entry.path and (tier is None or entry.tier == tier)))
+
+    def manifest(self) -> List[Dict]:
+        """
+        Report form: what was sent, one record per entry.
+        """
+        return [entry.to_dict() for entry in self.entries]
@@ -0,0 +1,208 @@
+import ast
+import io
+import json
+import math
+import re
+import tokenize
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Applied in this order; blank_lines last so it also collapses gaps left by the other passes.
+COMPRESSION_PASSES = ("license", "comments", "docstrings", "json", "yaml", "blank_lines")
+DEFAULT_COMPRESSION_PASSES = ("blank_lines",)
+# Passes that drop content or rewrite layout. A file the task may edit would come back in the
+# compressed form, so they are opt-in and never applied to target files.
+LOSSY_PASSES = {"license", "comments", "docstrings", "json", "yaml"}
+
+LICENSE_MARKERS = re.compile(r"copyright|licen[sc]e|spdx-license-identifier|all rights reserved", re.I)
+YAML_BLOCK_SCALAR = re.compile(r"(?:^|[:\-]\s)\s*[|>][-+0-9]*\s*(?:#.*)?$")
+BLANK_RUN = re.compile(r"\n{3,}")
+PATH_TOKEN = re.compile(r"[\w.\-/\\]+")
+
+
+def validate_passes(passes: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Returns the passes in application order; raises ValueError on unknown names.
+    """
+    requested = set(passes)
+    unknown = requested - set(COMPRESSION_PASSES)
+    if unknown:
+        raise ValueError(
+            f"Unsupported compression pass(es) {', '.join(sorted(unknown))}. Expected any of: {', '.join(COMPRESSION_PASSES)}"
+        )
+    return tuple(name for name in COMPRESSION_PASSES if name in requested)
+
+
+def mentioned_paths(text: str) -> Set[str]:
+    """
+    Path-like tokens of a task text, normalized to posix paths without a leading "./", for
+    exact matching against scanned paths.
+    """
+    paths = set()
+    for token in PATH_TOKEN.findall(text or ""):
+        token = token.replace("\\", "/").rstrip(".")
+        while token.startswith("./"):
+            token = token[2:]
+        if token:
+            paths.add(token)
+    return paths
+
+
+def strip_license_banner(text: str, rel_path: str = "") -> str:
+    """
+    Drops a leading comment block (# or // lines, or one /* */ block) that mentions a
+    copyright or license. A shebang or encoding line before it is kept.
+    """
+    lines = text.split("\n")
+    start = 0
+    while start < len(lines) and (lines[start].startswith("#!") or re.match(r"#.*coding[:=]", lines[start])):
+        start += 1
+    end = start
+    stripped = lines[start].lstrip() if start < len(lines) else ""
+    if stripped.startswith("/*"):
+        while end < len(lines) and "*/" not in lines[end]:
+            end += 1
+        if end == len(lines) or lines[end].split("*/", 1)[1].strip():
+            return text
+        end += 1
+    else:
+        prefix = "#" if stripped.startswith("#") else "//" if stripped.startswith("//") else None
+        if prefix is None:
+            return text
+        while end < len(lines) and lines[end].lstrip().startswith(prefix):
+            end += 1
+    if not LICENSE_MARKERS.search("\n".join(lines[start:end])):
+        return text
+    while end < len(lines) and not lines[end].strip():
+        end += 1
+    return "\n".join(lines[:start] + lines[end:])
+
+
+def strip_python_comments(text: str, rel_path: str = "") -> str:
+    """
+    Removes # comments from Python source (a shebang/encoding first line is kept); lines that
+    held only a comment are dropped. Unparseable sources are returned unchanged.
+    """
+    if not rel_path.endswith(".py"):
+        return text
+    lines = text.split("\n")
+    cuts: Dict[int, int] = {}
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(text).readline):
+            if token.type == tokenize.COMMENT:
+                row, col = token.start
+                if row == 1 and token.string.startswith("#!"):
+                    continue
+                cuts[row - 1] = col
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return text
+    kept: List[str] = []
+    for index, line in enumerate(lines):
+        col = cuts.get(index)
+        if col is None:
+            kept.append(line)
+        elif line[:col].strip():
+            kept.append(line[:col].rstrip())
+    return "\n".join(kept)
+
+
+def strip_python_docstrings(text: str, rel_path: str = "") -> str:
+    """
+    Removes module, class and function docstrings that occupy whole lines. A body left empty
+    gets `...` so the source still parses.
+    """
+    if not rel_path.endswith(".py"):
+        return text
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return text
+    lines = text.split("\n")
+    replacements: List[Tuple[int, int, Optional[str]]] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        body = node.body
+        if not body or not isinstance(body[0], ast.Expr):
+            continue
+        value = body[0].value
+        if not (isinstance(value, ast.Constant) and isinstance(value.value, str)):
+            continue
+        first, last = value.lineno - 1, (value.end_lineno or value.lineno) - 1
+        if lines[first][: value.col_offset].strip() or lines[last][value.end_col_offset :].strip():
+            continue
+        filler = None if len(body) > 1 else lines[first][: value.col_offset] + "..."
+        replacements.append((first, last, filler))
+    for first, last, filler in sorted(replacements, reverse=True):
+        lines[first : last + 1] = [filler] if filler is not None else []
+    return "\n".join(lines)
+
+
+def minify_json(text: str, rel_path: str = "") -> str:
+    """
+    Re-serializes .json files without insignificant whitespace (key order preserved).
+    """
+    if not rel_path.endswith(".json"):
+        return text
+    try:
+        return json.dumps(json.loads(text), ensure_ascii=False, separators=(",", ":"))
+    except (ValueError, RecursionError):
+        return text
+
+
+def minify_yaml(text: str, rel_path: str = "") -> str:
+    """
+    Drops comment-only and blank lines and trailing whitespace from .yml/.yaml files and
+    re-indents to one space per level. Files with block scalars (| or >) are left unchanged,
+    since their line layout is content.
+    """
+    if not rel_path.endswith((".yml", ".yaml")):
+        return text
+    lines = [line.rstrip() for line in text.split("\n")]
+    if any(YAML_BLOCK_SCALAR.search(line) for line in lines):
+        return text
+    kept = [line for line in lines if line.strip() and not line.lstrip().startswith("#")]
+    unit = 0
+    for line in kept:
+        unit = math.gcd(unit, len(line) - len(line.lstrip(" ")))
+    if unit > 1:
+        kept = [" " * ((len(line) - len(line.lstrip(" "))) // unit) + line.lstrip(" ") for line in kept]
+    return "\n".join(kept)
+
+
+def collapse_blank_lines(text: str, rel_path: str = "") -> str:
+    """
+    Strips trailing whitespace and collapses runs of blank lines into one.
+    """
+    return BLANK_RUN.sub("\n\n", "\n".join(line.rstrip() for line in text.split("\n")))
+
+
+PASS_FUNCTIONS: Dict[str, Callable[[str, str], str]] = {
+    "license": strip_license_banner,
+    "comments": strip_python_comments,
+    "docstrings": strip_python_docstrings,
+    "json": minify_json,
+    "yaml": minify_yaml,
+    "blank_lines": collapse_blank_lines,
+}
+
+
+def compress_text(
+    rel_path: str,
+    text: str,
+    passes: Iterable[str],
+    target: bool = False,
+    savings: Optional[Dict[str, int]] = None,
+) -> str:
+    """
+    Runs the given passes (validated, in application order) over one file's text. Target files
+    skip LOSSY_PASSES. Characters removed by each pass are added to `savings`.
+    """
+    rel_path = rel_path.replace("\\", "/").lower()
+    for name in passes:
+        if target and name in LOSSY_PASSES:
+            continue
+        compressed = PASS_FUNCTIONS[name](text, rel_path)
+        if savings is not None and len(compressed) < len(text):
+            savings[name] = savings.get(name, 0) + len(text) - len(compressed)
+        text = compressed
+    return text
@@ -0,0 +1,134 @@
+import math
+import re
+from collections import Counter
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "are", "was", "not", "but",
+    "all", "any", "can", "should", "must", "use", "using", "when", "then", "than", "will",
+    "each", "our", "you", "your", "its", "has", "have", "def", "self", "return", "import",
+    "none", "true", "false", "class",
+}
+# Max number of capacity units for the knapsack table (keeps the DP matrix small).
+KNAPSACK_RESOLUTION = 2000
+# Max number of items entering the DP; beyond this only the highest-valued ones are kept.
+KNAPSACK_MAX_ITEMS = 2000
+# A file with the strongest history prior gains this fraction of the best BM25 score.
+PRIOR_WEIGHT = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase terms, breaking snake_case and camelCase identifiers apart.
+    """
+    tokens: List[str] = []
+    for raw in TOKEN_PATTERN.findall(text.replace("_", " ")):
+        for part in CAMEL_BOUNDARY.split(raw):
+            lowered = part.lower()
+            if len(lowered) > 2 and lowered not in STOPWORDS:
+                tokens.append(lowered)
+    return tokens
+
+
+def bm25_scores(documents: Sequence[str], query: str, k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Scores each document against the query with Okapi BM25.
+    The term-frequency matrix is restricted to query terms, so cost is linear in corpus size.
+    """
+    n_docs = len(documents)
+    query_terms = sorted(set(tokenize(query)))
+    if n_docs == 0 or not query_terms:
+        return np.zeros(n_docs, dtype=np.float64)
+
+    term_index = {term: idx for idx, term in enumerate(query_terms)}
+    tf = np.zeros((n_docs, len(query_terms)), dtype=np.float64)
+    doc_lengths = np.zeros(n_docs, dtype=np.float64)
+    for doc_idx, document in enumerate(documents):
+        tokens = tokenize(document)
+        doc_lengths[doc_idx] = len(tokens)
+        for term, count in Counter(tokens).items():
+            col = term_index.get(term)
+            if col is not None:
+                tf[doc_idx, col] = count
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+    avg_len = doc_lengths.mean() or 1.0
+    norm = k1 * (1.0 - b + b * doc_lengths / avg_len)
+    weighted = tf * (k1 + 1.0) / (tf + norm[:, None])
+    return weighted @ idf
+
+
+def knapsack_select(sizes: Sequence[int], values: Sequence[float], capacity: int) -> List[int]:
+    """
+    0/1 knapsack over file sizes (chars) and relevance values.
+    Sizes are bucketed so the DP table never exceeds KNAPSACK_RESOLUTION columns; items are
+    rounded up, so the selection never overflows `capacity`. Only items with a positive value
+    that fit at all enter the DP, at most KNAPSACK_MAX_ITEMS of them (highest values first).
+    Returns the selected indices in ascending order.
+    """
+    if capacity <= 0 or not sizes:
+        return []
+    unit = max(1, math.ceil(capacity / KNAPSACK_RESOLUTION))
+    cap = capacity // unit
+    weights = np.array([max(1, math.ceil(size / unit)) for size in sizes], dtype=np.int64)
+    vals = np.asarray(values, dtype=np.float64)
+
+    candidates = np.flatnonzero((vals > 0) & (weights <= cap))
+    if candidates.size > KNAPSACK_MAX_ITEMS:
+        top = np.argsort(-vals[candidates], kind="stable")[:KNAPSACK_MAX_ITEMS]
+        candidates = np.sort(candidates[top])
+
+    best = np.zeros(cap + 1, dtype=np.float64)
+    keep = np.zeros((len(candidates), cap + 1), dtype=bool)
+    for row, idx in enumerate(candidates):
+        weight = int(weights[idx])
+        candidate = best[: cap + 1 - weight] + vals[idx]
+        improved = candidate > best[weight:]
+        keep[row, weight:] = improved
+        best[weight:] = np.where(improved, candidate, best[weight:])
+
+    selected: List[int] = []
+    remaining = int(np.argmax(best))
+    for row in range(len(candidates) - 1, -1, -1):
+        if keep[row, remaining]:
+            idx = int(candidates[row])
+            selected.append(idx)
+            remaining -= int(weights[idx])
+    return sorted(selected)
+
+
+def rank_and_pack(
+    paths: Sequence[str],
+    bodies: Sequence[str],
+    sizes: Sequence[int],
+    query: str,
+    capacity: int,
+    prior: Optional[Sequence[float]] = None,
+) -> List[int]:
+    """
+    Picks the subset of files that maximizes total BM25 relevance within `capacity` chars.
+    Paths are indexed alongside bodies (path terms count double). An optional per-file prior
+    (e.g. history of touched files) is normalized and added on the BM25 scale. Leftover
+    capacity is filled with the remaining files in their original order.
+    """
+    documents = [f"{path} {path} {body}" for path, body in zip(paths, bodies)]
+    scores = bm25_scores(documents, query)
+    if prior is not None and len(prior) == len(scores):
+        boost = np.asarray(prior, dtype=np.float64)
+        if boost.size and boost.max() > 0:
+            scale = scores.max() if scores.size and scores.max() > 0 else 1.0
+            scores = scores + PRIOR_WEIGHT * scale * boost / boost.max()
+    selected = knapsack_select(sizes, scores, capacity)
+
+    used = sum(sizes[idx] for idx in selected)
+    chosen = set(selected)
+    for idx, size in enumerate(sizes):
+        if idx not in chosen and used + size <= capacity:
+            chosen.add(idx)
+            used += size
+    return sorted(chosen)
@@ -2,7 +2,9 @@ import difflib
 import os
 import re
 from dataclasses import dataclass, field
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
+
+from gitignore_matcher import PathScope
 
 
 @dataclass
@@ -16,6 +18,7 @@ class FileChange:
 class ChangeSet:
     project_root: str
     changes: Dict[str, FileChange] = field(default_factory=dict)
+    out_of_scope: List[str] = field(default_factory=list)  # files dropped by the task SCOPE
 
 
 class FileManager:
@@ -106,6 +109,7 @@ class FileManager:
         warn("process_output is deprecated; use ChangeSet helpers instead.", DeprecationWarning)
         matches = re.findall(self.FILE_PATTERN, response, flags=re.S | re.M)
         written_files: list[str] = []
+        written_paths: list[str] = []  # absolute destinations, for callers that need real paths
         created_files: list[str] = []
         changed_files: list[str] = []
         for path, code in matches:
@@ -118,6 +122,7 @@ class FileManager:
             display_path = self._display_path(dest)
             if display_path not in written_files:
                 written_files.append(display_path)
+                written_paths.append(os.path.abspath(dest))
             if existed_before:
                 if display_path not in changed_files:
                     changed_files.append(display_path)
@@ -129,16 +134,25 @@ class FileManager:
 
         return {
             "written_files": written_files,
+            "written_paths": written_paths,
             "created_files": created_files,
             "changed_files": changed_files,
         }
 
 
-def build_change_set_from_response(project_root: str, model_output: str) -> ChangeSet:
+def build_change_set_from_response(
+    project_root: str,
+    model_output: str,
+    snapshot=None,
+    scope: Optional[Iterable[str]] = None,
+) -> ChangeSet:
     """
     Parses model output and builds a ChangeSet with old/new content.
+    Old content is taken from a shared ProjectSnapshot when given, falling back to disk.
+    With a task scope (path globs), files outside it are listed in out_of_scope, not changed.
     """
     project_root_abs = os.path.abspath(project_root)
+    path_scope = PathScope(scope or ())
     file_pattern = r"===FILE:\s*(.*?)===\n(.*?)(?=\n===FILE:|$)"
     matches = re.findall(file_pattern, model_output, flags=re.S | re.M)
     change_set = ChangeSet(project_root=project_root_abs, changes={})
@@ -148,11 +162,18 @@ def build_change_set_from_response(project_root: str, model_output: str) -> Chan
         if os.path.commonpath([abs_path, project_root_abs]) != project_root_abs:
             # Skip files outside project root for safety
             continue
-        try:
-            with open(abs_path, "r", encoding="utf-8", errors="ignore") as handle:
-                old_content = handle.read()
-        except OSError:
-            old_content = ""
+        if path_scope and not path_scope.matches(os.path.relpath(abs_path, project_root_abs)):
+            change_set.out_of_scope.append(rel_path)
+            continue
+        old_content = None
+        if snapshot is not None and not os.path.isabs(rel_path):
+            old_content = snapshot.read_text(rel_path)
+        if old_content is None:
+            try:
+                with open(abs_path, "r", encoding="utf-8", errors="ignore") as handle:
+                    old_content = handle.read()
+            except OSError:
+                old_content = ""
         change_set.changes[rel_path] = FileChange(path=rel_path, old_content=old_content, new_content=code)
     return change_set
 
@@ -0,0 +1,180 @@
+import json
+import os
+import subprocess
+from typing import List, Optional, Sequence, Tuple
+
+from paths import CACHE_DIR
+from report_schema import REPORTS_DIR
+
+GIT_TIMEOUT_SECONDS = 60.0
+# Scanned trees at a ref, keyed by tree hash (see ProjectScanner git_ref).
+GIT_TREES_DIR = os.path.join(CACHE_DIR, "git_trees")
+GIT_TREES_MAX_FILES = 16
+REGULAR_FILE_MODES = {"100644", "100755"}
+
+
+def _git(project_root: str, *args: str, timeout: float = GIT_TIMEOUT_SECONDS) -> Optional[str]:
+    """
+    Runs a git command in project_root; returns stdout, or None if git is missing or fails.
+    """
+    try:
+        proc = subprocess.run(
+            ["git", "-C", project_root, *args],
+            capture_output=True,
+            check=False,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.decode("utf-8", errors="replace")
+
+
+def git_head(project_root: str) -> Optional[str]:
+    """
+    Commit hash checked out in project_root, or None outside a git work tree.
+    """
+    output = _git(project_root, "rev-parse", "--verify", "HEAD")
+    return output.strip() if output else None
+
+
+def resolve_ref(project_root: str, ref: str) -> Optional[str]:
+    output = _git(project_root, "rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+    return output.strip() if output else None
+
+
+def last_successful_ref(project_root: str, reports_dir: str = REPORTS_DIR) -> Optional[str]:
+    """
+    git_head recorded by the most recent successful task report for this project, provided
+    the commit still exists in the repository.
+    """
+    if not os.path.isdir(reports_dir):
+        return None
+    target = os.path.normcase(os.path.abspath(project_root))
+    best: Optional[tuple] = None
+    for name in os.listdir(reports_dir):
+        if not name.endswith("_report.json"):
+            continue
+        try:
+            with open(os.path.join(reports_dir, name), "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            continue
+        meta = data.get("meta") or {}
+        if data.get("status") != "ok" or not meta.get("git_head") or not meta.get("target_project"):
+            continue
+        if os.path.normcase(os.path.abspath(meta["target_project"])) != target:
+            continue
+        key = (meta.get("finished_at") or "", meta["git_head"])
+        if best is None or key > best:
+            best = key
+    if best is None:
+        return None
+    return resolve_ref(project_root, best[1])
+
+
+def changed_files(project_root: str, base_ref: str, pathspecs: Sequence[str] = ()) -> Optional[List[str]]:
+    """
+    Paths (relative to project_root) that differ between base_ref and the working tree,
+    including untracked files; deleted files are omitted. pathspecs limit the paths compared.
+    """
+    diff = _git(project_root, "diff", "--name-only", "--relative", "--diff-filter=d", "-z", base_ref, "--", *pathspecs)
+    if diff is None:
+        return None
+    untracked = _git(project_root, "ls-files", "-z", "--others", "--exclude-standard", "--", *pathspecs) or ""
+    paths = {path for path in diff.split("\0") + untracked.split("\0") if path}
+    return sorted(paths)
+
+
+def diff_text(project_root: str, base_ref: str, pathspecs: Sequence[str] = ()) -> Optional[str]:
+    """
+    Unified diff between base_ref and the working tree (tracked files only).
+    """
+    return _git(project_root, "diff", "--no-color", "--no-ext-diff", "--relative", base_ref, "--", *pathspecs)
+
+
+def tree_hash(project_root: str, ref: str) -> Optional[str]:
+    """
+    Hash of the tree `ref` has at project_root (a subdirectory of the repository is fine).
+    """
+    output = _git(project_root, "rev-parse", "--verify", "--quiet", f"{ref}:./")
+    return output.strip() if output else None
+
+
+def ls_tree(project_root: str, ref: str) -> Optional[List[Tuple[str, str, int]]]:
+    """
+    (posix path relative to project_root, blob hash, size) for the regular files in `ref`'s
+    tree below project_root; symlinks and submodules are left out.
+    """
+    output = _git(project_root, "ls-tree", "-r", "-z", "-l", ref)
+    if output is None:
+        return None
+    files = []
+    for record in output.split("\0"):
+        if "\t" not in record:
+            continue
+        info, path = record.split("\t", 1)
+        mode, kind, blob, size = info.split()
+        if kind == "blob" and mode in REGULAR_FILE_MODES:
+            files.append((path, blob, int(size)))
+    return files
+
+
+class GitBlobReader:
+    """
+    Reads blobs through one long-lived `git cat-file --batch` process instead of one process
+    (or file open) per file. Not thread-safe; use one reader per thread.
+    """
+
+    def __init__(self, project_root: str):
+        self._proc = subprocess.Popen(
+            ["git", "-C", project_root, "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, blob: str) -> Optional[bytes]:
+        """
+        Contents of a blob, or None if the object is missing.
+        """
+        self._proc.stdin.write(blob.encode("ascii") + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline().split()
+        if len(header) != 3:
+            return None
+        data = self._proc.stdout.read(int(header[2]))
+        self._proc.stdout.read(1)  # trailing newline
+        return data
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            self._proc.stdin.close()
+            try:
+                self._proc.wait(timeout=GIT_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        self._proc.stdout.close()
+
+    def __enter__(self) -> "GitBlobReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def prune_tree_cache(cache_dir: str = GIT_TREES_DIR, keep: int = GIT_TREES_MAX_FILES) -> None:
+    """
+    Keeps the `keep` most recently written tree caches.
+    """
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".json")]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,254 @@
+import os
+import re
+import subprocess
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+def _translate_glob(pattern: str) -> str:
+    """
+    Translates a gitignore glob (without anchoring/negation markers) into a regex fragment.
+    """
+    out: List[str] = []
+    idx = 0
+    length = len(pattern)
+    while idx < length:
+        char = pattern[idx]
+        if pattern.startswith("**/", idx):
+            out.append("(?:.*/)?")
+            idx += 3
+            continue
+        if pattern.startswith("/**", idx) and idx + 3 == length:
+            out.append("/.*")
+            idx += 3
+            continue
+        if pattern.startswith("**", idx):
+            out.append(".*")
+            idx += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        elif char == "[":
+            close = pattern.find("]", idx + 1)
+            if close == -1:
+                out.append(re.escape(char))
+            else:
+                body = pattern[idx + 1:close].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                idx = close
+        elif char == "\\" and idx + 1 < length:
+            idx += 1
+            out.append(re.escape(pattern[idx]))
+        else:
+            out.append(re.escape(char))
+        idx += 1
+    return "".join(out)
+
+
+def _compile(fragments: List[str]) -> Optional["re.Pattern[str]"]:
+    if not fragments:
+        return None
+    return re.compile("|".join(f"(?:{fragment})" for fragment in fragments))
+
+
+def compile_path_globs(patterns: Iterable[str]) -> Optional["re.Pattern[str]"]:
+    """
+    Combined regex (use fullmatch) for posix relative paths. Like gitignore, a pattern without
+    a slash matches a file name at any depth, others are anchored at the project root, and a
+    trailing slash matches everything below that directory.
+    """
+    fragments: List[str] = []
+    for pattern in patterns:
+        pattern = pattern.strip().replace("\\", "/")
+        if not pattern:
+            continue
+        if pattern.endswith("/"):
+            pattern += "**"
+        anchored = "/" in pattern
+        body = _translate_glob(pattern.lstrip("/"))
+        fragments.append(body if anchored else "(?:.*/)?" + body)
+    return _compile(fragments)
+
+
+class PathScope:
+    """
+    A task's SCOPE: path globs anchored at the project root. A pattern without glob
+    characters also covers everything below it ("ml" == "ml/" == "ml/**"). Besides matching
+    files, it tells walkers which directories can be skipped entirely.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        for pattern in patterns:
+            pattern = pattern.strip().replace("\\", "/").lstrip("/")
+            if not pattern:
+                continue
+            if GLOB_CHARS.search(pattern) or pattern.endswith("/"):
+                self.patterns.append(pattern)
+            else:
+                self.patterns.extend([pattern, pattern + "/"])
+        self._re = compile_path_globs("/" + pattern for pattern in self.patterns)
+        # Directory each pattern is confined to ("ml/models/" for "ml/models/*.py"); "/" when a
+        # glob in the first component can match anywhere, None for files at the root.
+        self._prefixes: List[Optional[str]] = []
+        for pattern in self.patterns:
+            literal = GLOB_CHARS.split(pattern, 1)[0]
+            if "/" not in literal and GLOB_CHARS.search(pattern):
+                self._prefixes.append("/")
+            else:
+                directory = literal.rpartition("/")[0]
+                self._prefixes.append(directory + "/" if directory else None)
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def matches(self, rel_path: str) -> bool:
+        return self._re is not None and self._re.fullmatch(rel_path.replace(os.sep, "/")) is not None
+
+    def may_contain(self, rel_dir: str) -> bool:
+        """
+        False if no file below rel_dir can match, so a walk may prune it.
+        """
+        rel_dir = rel_dir.replace(os.sep, "/").strip("/")
+        if not rel_dir:
+            return True
+        rel_dir += "/"
+        return any(
+            prefix == "/" or prefix.startswith(rel_dir) or rel_dir.startswith(prefix)
+            for prefix in self._prefixes
+            if prefix is not None
+        )
+
+    def pathspecs(self) -> List[str]:
+        """
+        Equivalent git pathspecs, e.g. to limit `git diff`.
+        """
+        return [f":(glob){pattern}**" if pattern.endswith("/") else f":(glob){pattern}" for pattern in self.patterns]
+
+    def iter_files(self, project_root: str) -> Iterator[str]:
+        """
+        Posix relative paths of the files in scope, walking only directories that may match.
+        """
+        for root, dirs, files in os.walk(project_root):
+            rel_root = os.path.relpath(root, project_root)
+            rel_root = "" if rel_root == "." else rel_root.replace(os.sep, "/")
+            dirs[:] = sorted(d for d in dirs if d != ".git" and self.may_contain(f"{rel_root}/{d}" if rel_root else d))
+            for name in sorted(files):
+                rel_path = f"{rel_root}/{name}" if rel_root else name
+                if self.matches(rel_path):
+                    yield rel_path
+
+
+class GitIgnoreMatcher:
+    """
+    Matches project-relative paths against .gitignore / .git/info/exclude rules.
+
+    All rules are compiled into a handful of combined regexes (ignore vs. negated, any vs.
+    directory-only), so a check is a single regex match. Negations are applied after all
+    ignores rather than in strict file order, which matches git for the common
+    "ignore dir/*, re-include dir/keep" layouts. Ignored directories should be pruned by the
+    caller, which also gives git's "cannot re-include inside an excluded dir" behavior.
+    """
+
+    def __init__(self, project_root: str):
+        self.project_root = os.path.abspath(project_root)
+        self._fragments: Tuple[List[str], List[str], List[str], List[str]] = ([], [], [], [])
+        self._compiled: Tuple = (None, None, None, None)
+        self._loaded_dirs: set = set()
+        self._add_file(os.path.join(self.project_root, ".git", "info", "exclude"), "")
+
+    def _add_file(self, path: str, rel_dir: str) -> bool:
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as handle:
+                lines = handle.read().splitlines()
+        except OSError:
+            return False
+        added = False
+        for line in lines:
+            added = self.add_pattern(line, rel_dir, recompile=False) or added
+        if added:
+            self._recompile()
+        return added
+
+    def add_pattern(self, line: str, rel_dir: str = "", recompile: bool = True) -> bool:
+        """
+        Adds one gitignore line whose base is `rel_dir` (posix, relative to the project root).
+        """
+        pattern = line.rstrip("\n")
+        if not pattern.strip() or pattern.startswith("#"):
+            return False
+        if not pattern.endswith("\\ "):
+            pattern = pattern.rstrip()
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\!") or pattern.startswith("\\#"):
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return False
+
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        base = re.escape(rel_dir.strip("/") + "/") if rel_dir.strip("/") else ""
+        prefix = base if anchored else base + "(?:.*/)?"
+        fragment = f"{prefix}{_translate_glob(pattern)}"
+
+        slot = (2 if negate else 0) + (1 if dir_only else 0)
+        self._fragments[slot].append(fragment)
+        if recompile:
+            self._recompile()
+        return True
+
+    def _recompile(self) -> None:
+        self._compiled = tuple(_compile(fragments) for fragments in self._fragments)
+
+    def load_dir(self, rel_dir: str) -> None:
+        """
+        Loads `<rel_dir>/.gitignore` once; call when the walk enters a directory.
+        """
+        rel_dir = rel_dir.replace(os.sep, "/")
+        if rel_dir in self._loaded_dirs:
+            return
+        self._loaded_dirs.add(rel_dir)
+        abs_dir = os.path.join(self.project_root, rel_dir) if rel_dir else self.project_root
+        self._add_file(os.path.join(abs_dir, ".gitignore"), rel_dir)
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        path = rel_path.replace(os.sep, "/")
+        ignore_any, ignore_dir, keep_any, keep_dir = self._compiled
+        ignored = bool(ignore_any and ignore_any.fullmatch(path)) or bool(
+            is_dir and ignore_dir and ignore_dir.fullmatch(path)
+        )
+        if not ignored:
+            return False
+        kept = bool(keep_any and keep_any.fullmatch(path)) or bool(is_dir and keep_dir and keep_dir.fullmatch(path))
+        return not kept
+
+
+def git_list_files(project_root: str, timeout: float = 60.0) -> Optional[List[str]]:
+    """
+    Lists tracked and untracked-but-not-ignored files via `git ls-files`.
+    Returns posix relative paths, or None if the root is not a git work tree or git is missing.
+    """
+    if not os.path.exists(os.path.join(project_root, ".git")):
+        return None
+    try:
+        proc = subprocess.run(
+            ["git", "-C", project_root, "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            capture_output=True,
+            check=False,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if proc.returncode != 0:
+        return None
+    paths = proc.stdout.decode("utf-8", errors="surrogateescape").split("\0")
+    return sorted({path for path in paths if path})
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from paths import CACHE_DIR
+from report_schema import REPORTS_DIR
+
+HISTORY_PRIOR_VERSION = 1
+HISTORY_PRIOR_PATH = os.path.join(CACHE_DIR, "history_prior.json")
+# A report's weight halves every HISTORY_HALF_LIFE_DAYS.
+HISTORY_HALF_LIFE_DAYS = 30.0
+# Weight of files touched by other task types of the same project, relative to the same type.
+PROJECT_PRIOR_WEIGHT = 0.25
+COUNTED_STATUSES = {"ok", "partial"}
+
+
+@dataclass
+class HistoryRecord:
+    """
+    Files touched by one successful task run, as recorded in its report.
+    """
+
+    project: str
+    task_type: str
+    finished_at: float  # epoch seconds
+    files: List[str] = field(default_factory=list)
+
+
+def _parse_timestamp(value: Optional[str], fallback: float) -> float:
+    if not value:
+        return fallback
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return fallback
+
+
+class HistoryPrior:
+    """
+    Aggregated index of which files past tasks touched, per project and task_type, built from
+    reports/*_report.json. Parsed reports are cached by file mtime, so refreshing only reads
+    new or rewritten reports.
+    """
+
+    def __init__(self, reports_dir: str = REPORTS_DIR, path: str = HISTORY_PRIOR_PATH):
+        self.reports_dir = reports_dir
+        self.path = path
+        self._records: Dict[str, tuple] = {}  # report file name -> (mtime_ns, HistoryRecord | None)
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") != HISTORY_PRIOR_VERSION or data.get("reports_dir") != os.path.abspath(self.reports_dir):
+            return
+        for name, entry in (data.get("reports") or {}).items():
+            record = HistoryRecord(**entry["record"]) if entry.get("record") else None
+            self._records[name] = (int(entry.get("mtime_ns", 0)), record)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        payload = {
+            "version": HISTORY_PRIOR_VERSION,
+            "reports_dir": os.path.abspath(self.reports_dir),
+            "reports": {
+                name: {"mtime_ns": mtime_ns, "record": asdict(record) if record else None}
+                for name, (mtime_ns, record) in sorted(self._records.items())
+            },
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    @staticmethod
+    def _read_report(path: str, mtime: float) -> Optional[HistoryRecord]:
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("status") not in COUNTED_STATUSES:
+            return None
+        files = list(dict.fromkeys((data.get("changed_files") or []) + (data.get("created_files") or [])))
+        if not files:
+            return None
+        meta = data.get("meta") or {}
+        return HistoryRecord(
+            project=str(data.get("project") or "unknown"),
+            task_type=str(data.get("task_type") or "unknown"),
+            finished_at=_parse_timestamp(meta.get("finished_at"), mtime),
+            files=[path.replace("\\", "/") for path in files],
+        )
+
+    def refresh(self) -> "HistoryPrior":
+        """
+        Picks up new, rewritten and deleted reports, then persists the index.
+        """
+        seen = set()
+        if os.path.isdir(self.reports_dir):
+            for entry in os.scandir(self.reports_dir):
+                if not entry.name.endswith("_report.json") or not entry.is_file():
+                    continue
+                seen.add(entry.name)
+                stat = entry.stat()
+                cached = self._records.get(entry.name)
+                if cached is not None and cached[0] == stat.st_mtime_ns:
+                    continue
+                self._records[entry.name] = (stat.st_mtime_ns, self._read_report(entry.path, stat.st_mtime))
+                self._dirty = True
+        for name in set(self._records) - seen:
+            del self._records[name]
+            self._dirty = True
+        self.save()
+        return self
+
+    def scores(self, project: str, task_type: Optional[str] = None, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        Recency-weighted touch counts (relative paths -> score) for a project: runs of the same
+        task_type count fully, other task types of the project at PROJECT_PRIOR_WEIGHT.
+        """
+        now = time.time() if now is None else now
+        totals: Dict[str, float] = {}
+        for _, record in self._records.values():
+            if record is None or record.project != project:
+                continue
+            age_days = max(0.0, now - record.finished_at) / 86400.0
+            weight = 0.5 ** (age_days / HISTORY_HALF_LIFE_DAYS)
+            if task_type is not None and record.task_type != task_type:
+                weight *= PROJECT_PRIOR_WEIGHT
+            for rel_path in record.files:
+                totals[rel_path] = totals.get(rel_path, 0.0) + weight
+        return totals
+
+
+def load_history_scores(project: str, task_type: Optional[str] = None) -> Dict[str, float]:
+    """
+    Convenience wrapper: refreshes the on-disk prior and returns scores for a project/task_type.
+    """
+    return HistoryPrior().refresh().scores(project, task_type)
@@ -0,0 +1,229 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from paths import CACHE_DIR
+
+IMPORT_GRAPH_VERSION = 1
+IMPORT_GRAPHS_DIR = os.path.join(CACHE_DIR, "import_graphs")
+# Directories treated as import roots in addition to the project root (src layout).
+SOURCE_ROOTS = ("", "src")
+# A bare file name in the task that matches more files than this is too ambiguous to seed from.
+MAX_SEED_MATCHES = 3
+
+PATH_MENTION = re.compile(r"[\w./\\-]+\.py\b")
+MODULE_MENTION = re.compile(r"\b[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+\b")
+
+# (module, imported names, relative level) as written in the source
+RawImport = Tuple[str, Tuple[str, ...], int]
+
+
+def import_graph_path_for(project_root: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(project_root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(IMPORT_GRAPHS_DIR, f"{digest}.json")
+
+
+def parse_imports(source: str) -> List[RawImport]:
+    """
+    Extracts import statements from Python source; unparsable files have no imports.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    imports: List[RawImport] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend((alias.name, (), 0) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append((node.module or "", tuple(alias.name for alias in node.names), node.level))
+    return imports
+
+
+def _module_names(rel_path: str) -> List[str]:
+    """
+    Dotted module names a project file can be imported as (one per matching source root).
+    """
+    posix = rel_path.replace(os.sep, "/")
+    if not posix.endswith(".py"):
+        return []
+    names = []
+    for root in SOURCE_ROOTS:
+        prefix = f"{root}/" if root else ""
+        if not posix.startswith(prefix):
+            continue
+        parts = posix[len(prefix) : -3].split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if parts and all(part.isidentifier() for part in parts):
+            names.append(".".join(parts))
+    return names
+
+
+class ImportGraph:
+    """
+    Project-internal import graph built from `ast` parsing. Parsed imports are cached on disk
+    per file content digest, so only changed files are re-parsed between runs.
+    """
+
+    def __init__(self, project_root: str, path: Optional[str] = None):
+        self.project_root = os.path.abspath(project_root)
+        self.path = path or import_graph_path_for(self.project_root)
+        self._parsed: Dict[str, Tuple[str, List[RawImport]]] = {}
+        self._modules: Dict[str, str] = {}
+        self.edges: Dict[str, List[str]] = {}
+        self.parsed_files = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") != IMPORT_GRAPH_VERSION:
+            return
+        for rel_path, entry in (data.get("files") or {}).items():
+            imports = [(module, tuple(names), level) for module, names, level in entry.get("imports", [])]
+            self._parsed[rel_path] = (entry.get("digest", ""), imports)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        payload = {
+            "version": IMPORT_GRAPH_VERSION,
+            "project_root": self.project_root,
+            "files": {
+                rel_path: {"digest": digest, "imports": [list(item) for item in imports]}
+                for rel_path, (digest, imports) in sorted(self._parsed.items())
+            },
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def update(self, sources: Iterable[Tuple[str, str, str]]) -> None:
+        """
+        Refreshes the graph from (rel_path, digest, text) of the project's Python files;
+        files not listed are dropped.
+        """
+        seen: Set[str] = set()
+        for rel_path, digest, text in sources:
+            seen.add(rel_path)
+            cached = self._parsed.get(rel_path)
+            if cached is not None and cached[0] == digest:
+                continue
+            self._parsed[rel_path] = (digest, parse_imports(text))
+            self.parsed_files += 1
+            self._dirty = True
+        for rel_path in set(self._parsed) - seen:
+            del self._parsed[rel_path]
+            self._dirty = True
+        self._resolve()
+
+    def _resolve(self) -> None:
+        self._modules = {}
+        for rel_path in sorted(self._parsed):
+            for name in _module_names(rel_path):
+                self._modules.setdefault(name, rel_path)
+        self.edges = {}
+        for rel_path, (_, imports) in self._parsed.items():
+            targets: List[str] = []
+            for module, names, level in imports:
+                for target in self._resolve_import(rel_path, module, names, level):
+                    if target != rel_path and target not in targets:
+                        targets.append(target)
+            self.edges[rel_path] = targets
+
+    def _lookup(self, dotted: str) -> Optional[str]:
+        """
+        Most specific project module for a dotted name (a.b.c, else a.b, else a).
+        """
+        parts = dotted.split(".")
+        while parts:
+            found = self._modules.get(".".join(parts))
+            if found:
+                return found
+            parts.pop()
+        return None
+
+    def _resolve_import(self, rel_path: str, module: str, names: Sequence[str], level: int) -> List[str]:
+        if level:
+            package = _module_names(rel_path)
+            if not package:
+                return []
+            base = package[0].split(".")
+            if not rel_path.replace(os.sep, "/").endswith("/__init__.py") and rel_path != "__init__.py":
+                base = base[:-1]
+            if level > 1:
+                base = base[: len(base) - (level - 1)] if len(base) >= level - 1 else []
+            module = ".".join(part for part in base + module.split(".") if part)
+            if not module:
+                return [self._modules[name] for name in names if name in self._modules]
+        targets: List[str] = []
+        # `from pkg import name` may import a submodule rather than an attribute.
+        for name in names:
+            submodule = self._modules.get(f"{module}.{name}")
+            if submodule:
+                targets.append(submodule)
+        if len(targets) < len(names) or not names:
+            found = self._lookup(module)
+            if found:
+                targets.append(found)
+        return targets
+
+    def closure(self, seeds: Sequence[str], max_depth: int) -> List[Tuple[str, int]]:
+        """
+        Breadth-first expansion from `seeds` through imports: (rel_path, depth) in visit order.
+        """
+        visited: Dict[str, int] = {}
+        queue = deque((seed, 0) for seed in seeds)
+        order: List[Tuple[str, int]] = []
+        while queue:
+            rel_path, depth = queue.popleft()
+            if rel_path in visited:
+                continue
+            visited[rel_path] = depth
+            order.append((rel_path, depth))
+            if depth < max_depth:
+                queue.extend((target, depth + 1) for target in self.edges.get(rel_path, []) if target not in visited)
+        return order
+
+    def module_file(self, dotted: str) -> Optional[str]:
+        return self._modules.get(dotted)
+
+
+def find_seed_files(query: str, rel_paths: Sequence[str], graph: Optional[ImportGraph] = None) -> List[str]:
+    """
+    Files named in a task body, either as paths (bot/execution.py, execution.py) or as dotted
+    module names (bot.execution), in order of first mention.
+    """
+    posix_paths = [path.replace(os.sep, "/") for path in rel_paths]
+    known = set(posix_paths)
+    seeds: List[str] = []
+    for match in PATH_MENTION.finditer(query):
+        mention = match.group(0).replace("\\", "/").lstrip("./") or match.group(0)
+        if mention in known:
+            candidates = [mention]
+        else:
+            candidates = [path for path in posix_paths if path.endswith("/" + mention)]
+            if len(candidates) > MAX_SEED_MATCHES:
+                candidates = []
+        seeds.extend(path for path in candidates if path not in seeds)
+    if graph is not None:
+        for match in MODULE_MENTION.finditer(query):
+            found = graph.module_file(match.group(0))
+            if found and found not in seeds:
+                seeds.append(found)
+    return seeds
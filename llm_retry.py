@@ -0,0 +1,93 @@
+import asyncio
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY_SECONDS = 1.0
+DEFAULT_MAX_DELAY_SECONDS = 60.0
+# Retry-After values above this are not worth waiting for inside one run.
+MAX_RETRY_AFTER_SECONDS = 300.0
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """
+    Server-requested delay from retry-after-ms / Retry-After (seconds or HTTP date), if any.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_throttle(exc: BaseException) -> bool:
+    return isinstance(exc, RateLimitError)
+
+
+def is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, (APITimeoutError, asyncio.TimeoutError))
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Transient failures: throttling, timeouts, connection errors and 408/409/5xx responses.
+    """
+    if is_throttle(exc) or is_timeout(exc) or isinstance(exc, APIConnectionError):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter; a server Retry-After is honoured as a lower bound.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY_SECONDS,
+        max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        """
+        attempt is 0-based; False once attempts are used up or the error is permanent.
+        """
+        if attempt + 1 >= self.max_attempts or not is_retryable(exc):
+            return False
+        retry_after = retry_after_seconds(exc)
+        return retry_after is None or retry_after <= MAX_RETRY_AFTER_SECONDS
+
+    def delay(self, attempt: int, exc: Optional[BaseException] = None) -> float:
+        backoff = random.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = retry_after_seconds(exc) if exc is not None else None
+        return max(backoff, retry_after) if retry_after is not None else backoff
@@ -3,13 +3,13 @@ import json
 import os
 import shutil
 import sys
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 import yaml
 
 from codex_client import CodexClient
 from file_manager import FileManager
-from meta_core import run_task
+from meta_core import context_chars_for, history_scores_for, run_task, scanner_options, watcher_options
 from paths import (
     BASE_DIR,
     OUTPUT_DIR,
@@ -20,6 +20,8 @@ from paths import (
     TASKS_DIR,
 )
 from project_scanner import ProjectScanner
+from project_snapshot import get_project_snapshot
+from project_watcher import start_project_watchers
 from projects_config import load_project_registry, resolve_project_root
 from prompt_builder import PromptBuilder
 from supervisor_runner import run_supervisor_cycle
@@ -29,7 +31,6 @@ from task_manager import list_tasks
 FRONT_MATTER_DELIMITER = "---"
 ALLOWED_MODES = {"readonly", "write_dev", "write_prod"}
 DEFAULT_TASK_FILE = os.path.join(TASKS_DIR, "task_current.md")
-MAX_CONTEXT_CHARS = 250_000
 
 
 def load_task_from_file(path: str) -> Tuple[Dict, str]:
@@ -61,6 +62,23 @@ def load_task_from_file(path: str) -> Tuple[Dict, str]:
     return metadata, body
 
 
+def _project_relative(paths: List[str], project_root: str) -> List[str]:
+    """
+    Paths inside project_root, relative to it; anything else (e.g. redirected to output/) is dropped.
+    """
+    root = os.path.abspath(project_root)
+    relative = []
+    for path in paths:
+        path = os.path.abspath(path)
+        try:
+            inside = os.path.commonpath([path, root]) == root
+        except ValueError:  # different drives
+            inside = False
+        if inside and path != root:
+            relative.append(os.path.relpath(path, root))
+    return relative
+
+
 class MetaAgent:
     def __init__(self, config_path: str = "config.json"):
         self.config = self._load_config(config_path)
@@ -160,36 +178,50 @@ class MetaAgent:
                 with open(resolved_prompt, "r", encoding="utf-8") as handle:
                     stage_instructions = handle.read()
 
+                stage_metadata = {
+                    "stage": name,
+                    "mode": "legacy",
+                    "target_project": target_project,
+                    "project_id": project_id,
+                    "project_path": target_project,
+                }
+                budget = self.builder.plan_budget(self.client.budget, stage_instructions, stage_metadata)
+
                 print(f"[INFO] Collecting project context from {target_project} for stage {name} (project_id={project_id})...")
-                scanner = ProjectScanner(target_project)
-                context = scanner.collect_project_context(max_chars=MAX_CONTEXT_CHARS)
+                profile = project_info.scan_profile
+                scanner = ProjectScanner(
+                    target_project,
+                    snapshot=get_project_snapshot(target_project),
+                    history_scores=history_scores_for(project_id, config=self.config),
+                    **scanner_options(self.config, profile, budget),
+                )
+                context = scanner.collect_context_bundle(
+                    max_chars=context_chars_for(budget, profile),
+                    query=stage_instructions,
+                )
                 print(
                     f"[INFO] Collected context for stage {name}: "
-                    f"{scanner.stats.files_included} files, {scanner.stats.chars_collected} chars."
+                    f"{scanner.stats.files_included} files, {scanner.stats.chars_collected} chars "
+                    f"(manifest hits/misses: {scanner.stats.manifest_hits}/{scanner.stats.manifest_misses}, "
+                    f"walk {scanner.stats.walk_seconds:.2f}s, read {scanner.stats.read_seconds:.2f}s)."
                 )
 
-                full_prompt = self.builder.build_prompt(
-                    stage_instructions,
-                    context,
-                    {
-                        "stage": name,
-                        "mode": "legacy",
-                        "target_project": target_project,
-                        "project_id": project_id,
-                        "project_path": target_project,
-                    },
-                )
+                full_prompt = self.builder.build_prompt(stage_instructions, context, stage_metadata, budget=budget)
+                print(f"[INFO] Sent {len(context.files())} files ({len(context)} chars) of context for stage {name}.")
 
                 print(f"[INFO] Sending prompt to Codex for stage {name}...")
                 response = self.client.send(full_prompt)
-                print(f"[INFO] Codex response received for stage {name}.")
+                print(f"[INFO] Codex response received for stage {name} (response cache: {self.client.cache_stats}).")
 
                 if isinstance(response, str) and response.lstrip().startswith("[ERROR]"):
                     print(f"[ERROR] Codex call failed for stage {name}: {response}")
                     return False, stages
 
                 file_manager = FileManager(base_output_dir=OUTPUT_DIR, target_project=str(target_project), mode="write_dev")
-                file_manager.process_output(response)
+                write_result = file_manager.process_output(response)
+                scanner.snapshot.refresh_files(
+                    _project_relative(write_result.get("written_paths") or [], scanner.snapshot.project_root)
+                )
                 print(f"[INFO] Stage {name} completed.")
             except Exception as exc:
                 print(f"[ERROR] Stage {name} failed: {exc}")
@@ -239,6 +271,11 @@ def parse_args():
     parser.add_argument("--supervisor-project", dest="supervisor_project", help="Project root for supervisor goal runs.", default="ai_scalper_bot")
     parser.add_argument("--project-id", dest="stage_project_id", help="Override project id for stage pipeline.")
     parser.add_argument("--once", action="store_true", help="Run once and exit (default behavior).")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Interactive mode: keep project contexts warm and run task ids/paths read from stdin.",
+    )
     return parser.parse_args()
 
 
@@ -293,9 +330,43 @@ def cleanup_after_successful_run(stages: list) -> None:
                     print(f"[WARN] Failed to move report {src}: {exc}")
 
 
+def run_watch_mode() -> int:
+    """
+    Starts watchers on all registered projects, then runs each task id/path entered on stdin
+    against the warm snapshots until EOF or 'quit'.
+    """
+    registry = load_project_registry()
+    watchers = start_project_watchers(
+        registry, lambda info: scanner_options(profile=info.scan_profile), **watcher_options()
+    )
+    print("[INFO] Enter a task id or path per line ('quit' to exit).")
+    try:
+        for line in sys.stdin:
+            task_identifier = line.strip()
+            if not task_identifier:
+                continue
+            if task_identifier.lower() in {"quit", "exit"}:
+                break
+            result = run_task(task_identifier)
+            print(f"[INFO] Task {result.get('task_id')} status: {result.get('status')}")
+            if result.get("error_message"):
+                print(f"[ERROR] {result['error_message']}")
+            if result.get("report_md_path"):
+                print(f"[INFO] Markdown report: {result['report_md_path']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for watcher in watchers.values():
+            watcher.stop()
+    return 0
+
+
 def main() -> int:
     args = parse_args()
 
+    if args.watch:
+        return run_watch_mode()
+
     if args.once:
         print("[INFO] --once specified; running a single pass.")
 
@@ -2,18 +2,26 @@ import json
 import os
 import subprocess
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List
 
-from codex_client import CodexClient
+from codex_client import AsyncCodexClient, CodexClient
+from context_compression import DEFAULT_COMPRESSION_PASSES
 from file_manager import (
     apply_change_set_direct,
     build_change_set_from_response,
     write_change_set_as_patches,
 )
+from git_context import git_head, last_successful_ref
+from gitignore_matcher import PathScope
+from history_prior import load_history_scores
 from project_scanner import ProjectScanner
+from project_snapshot import get_project_snapshot
+from project_watcher import DEFAULT_POLL_INTERVAL_SECONDS
+from projects_config import ScanProfile, load_project_registry
 from prompt_builder import PromptBuilder
 from report_schema import Report, write_json_report, write_md_report
 from safety_policy import evaluate_change_set, load_safety_policy
+from summary_cache import ProjectSummarizer, SummaryCache
 from task_manager import load_task
 from task_schema import TaskParseError
 
@@ -22,6 +30,12 @@ CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 TASKS_DIR = os.path.join(BASE_DIR, "tasks")
 REPORTS_DIR = os.path.join(BASE_DIR, "reports")
 PATCHES_DIR = os.path.join(BASE_DIR, "patches")
+DEFAULT_MAX_FILE_CHARS = 100_000
+# Task types whose context is the git diff since the last successful run instead of a full snapshot.
+DEFAULT_DIFF_CONTEXT_TASK_TYPES = ["supervisor_followup"]
+# Broad task types that get a cached summary overview of the whole project plus less raw context.
+DEFAULT_SUMMARY_CONTEXT_TASK_TYPES = ["audit_code", "strategy_review"]
+DEFAULT_SUMMARY_OVERVIEW_RATIO = 0.3
 
 
 def _ensure_dir(path: str) -> None:
@@ -63,15 +77,157 @@ def _resolve_target_project(task_project: str) -> str:
     return os.path.abspath(task_project)
 
 
-def run_basic_quality_checks(project_root: str, affected_files: List[str]) -> Dict[str, any]:
+def scanner_options(
+    config: Dict | None = None,
+    profile: ScanProfile | None = None,
+    budget: Any = None,
+) -> Dict[str, Any]:
+    """
+    ProjectScanner keyword arguments shared by task runs, stage runs and background watchers.
+    Keeping them in one place means a warm shared snapshot is reused (same scan settings).
+    A project's scan profile (projects.yaml) overrides the config.json defaults; the file size
+    cap is further limited by the prompt budget when one is given.
+    """
+    config = _load_config() if config is None else config
+    options = {
+        "use_manifest": True,
+        "parallel": True,
+        "dedupe": True,
+        "outline_tier": True,
+        "ranking_mode": config.get("context_ranking", "walk"),
+        "ignore_mode": config.get("context_ignore_mode", "none"),
+        "import_depth": int(config.get("context_import_depth", 2)),
+        "excerpt_large_files": bool(config.get("context_excerpt_large_files", True)),
+        "shared_snapshot": bool(config.get("context_shared_snapshot", False)),
+        "compression_passes": config.get("context_compression_passes", list(DEFAULT_COMPRESSION_PASSES)),
+    }
+    max_file_chars = DEFAULT_MAX_FILE_CHARS
+    if profile is not None:
+        options.update(profile.scanner_kwargs())
+        max_file_chars = profile.max_file_chars or max_file_chars
+    options["max_file_chars"] = min(max_file_chars, budget.max_file_chars) if budget is not None else max_file_chars
+    return options
+
+
+def watcher_options(config: Dict | None = None) -> Dict[str, Any]:
+    """
+    ProjectWatcher keyword arguments from config.json (watch_poll_interval: seconds between
+    stat walks when watchdog is not installed).
+    """
+    config = _load_config() if config is None else config
+    return {"poll_interval": float(config.get("watch_poll_interval", DEFAULT_POLL_INTERVAL_SECONDS))}
+
+
+def context_chars_for(budget: Any, profile: ScanProfile | None = None) -> int:
+    """
+    Context allotment of a prompt budget, capped by the project's context_chars if set.
+    """
+    if profile is not None and profile.context_chars:
+        return min(budget.context_chars, profile.context_chars)
+    return budget.context_chars
+
+
+def project_scan_profile(project_id: str | None = None, path: str | None = None) -> ScanProfile:
+    """
+    Scan profile of a registered project (by id, else by root path); empty if unknown.
+    """
+    try:
+        registry = load_project_registry()
+    except RuntimeError as exc:
+        print(f"[WARN] Project registry unavailable, using default scan settings: {exc}")
+        return ScanProfile()
+    return registry.scan_profile(project_id, path)
+
+
+def history_scores_for(project: str, task_type: str | None = None, config: Dict | None = None) -> Dict[str, float]:
+    """
+    History prior (files past runs touched) for a project/task_type, unless disabled with
+    context_history_prior=false.
+    """
+    config = _load_config() if config is None else config
+    if not config.get("context_history_prior", True):
+        return {}
+    try:
+        return load_history_scores(project, task_type)
+    except OSError as exc:
+        print(f"[WARN] History prior unavailable: {exc}")
+        return {}
+
+
+def _task_scanner_options(task, target_project: str, profile: ScanProfile, budget: Any) -> Dict[str, Any]:
+    """
+    scanner_options() for one task, with the history prior of its project/task_type.
+    Follow-up task types get the incremental diff context, based on the git HEAD recorded by
+    the project's last successful run (or HEAD itself). A task with CONTEXT_REF is scanned at
+    that git ref instead.
+    """
+    config = _load_config()
+    task_type = task.task_type
+    options = scanner_options(config, profile, budget)
+    options["history_scores"] = history_scores_for(task.project, task_type, config)
+    if task.scope:
+        options["scope"] = task.scope
+    if task.context_ref:
+        options["git_ref"] = task.context_ref
+        if options["ranking_mode"] == "diff":
+            options["ranking_mode"] = "walk"
+    elif task_type in config.get("diff_context_task_types", DEFAULT_DIFF_CONTEXT_TASK_TYPES):
+        options["ranking_mode"] = "diff"
+        options["diff_base_ref"] = last_successful_ref(target_project)
+    return options
+
+
+def _project_overview(scanner: ProjectScanner, client: CodexClient, task_type: str, context_chars: int) -> tuple:
+    """
+    Cached-summary overview for broad task types (summary_context_task_types); returns
+    (overview, stats). Empty for other task types.
+    """
+    config = _load_config()
+    if task_type not in config.get("summary_context_task_types", DEFAULT_SUMMARY_CONTEXT_TASK_TYPES):
+        return "", {}
+    ratio = float(config.get("summary_overview_ratio", DEFAULT_SUMMARY_OVERVIEW_RATIO))
+    cache = SummaryCache(max_bytes=int(config.get("summary_cache_bytes", 16 * 1024 * 1024)))
+    summarizer = ProjectSummarizer(client.send, cache, complete_many=getattr(client, "send_many", None))
+    files = scanner.scanned_files()
+    overview = summarizer.overview(scanner.project_root, files, int(context_chars * ratio), scanner.git_blobs())
+    stats = {
+        "overview_chars": len(overview),
+        "summary_cache_hits": cache.hits,
+        "summary_cache_misses": cache.misses,
+        "summaries_generated": summarizer.generated,
+        "summary_requests_failed": summarizer.failed_requests,
+    }
+    return overview, stats
+
+
+def run_basic_quality_checks(
+    project_root: str,
+    affected_files: List[str],
+    snapshot=None,
+    scope: List[str] | None = None,
+) -> Dict[str, any]:
     """
     Simple quality checks: py_compile on affected python files, optional pytest if available.
+    With a shared ProjectSnapshot, sources are compiled in-process from the snapshot instead of
+    spawning py_compile against disk.
+    With a task scope, only files in scope are compiled and pytest runs the test files in scope
+    (test_*.py / *_test.py) instead of tests/.
     """
+    path_scope = PathScope(scope or ())
     compile_errors: Dict[str, str] = {}
     for rel in affected_files:
-        if not rel.endswith(".py"):
+        if not rel.endswith(".py") or (path_scope and not path_scope.matches(rel)):
             continue
         abs_path = os.path.join(project_root, rel)
+        source = snapshot.read_text(rel) if snapshot is not None else None
+        if source is not None:
+            # Text is decoded as plain utf-8, so a BOM survives; py_compile accepts it.
+            source = source[1:] if source.startswith("\ufeff") else source
+            try:
+                compile(source, abs_path, "exec", dont_inherit=True)
+            except (SyntaxError, ValueError) as exc:
+                compile_errors[rel] = f"{type(exc).__name__}: {exc}"
+            continue
         if not os.path.exists(abs_path):
             continue
         try:
@@ -87,12 +243,20 @@ def run_basic_quality_checks(project_root: str, affected_files: List[str]) -> Di
     tests_run = False
     tests_status = "skipped"
     tests_output = ""
-    tests_dir = os.path.join(project_root, "tests")
-    if os.path.isdir(tests_dir):
+    if path_scope:
+        test_targets = [
+            os.path.join(project_root, rel)
+            for rel in path_scope.iter_files(project_root)
+            if (os.path.basename(rel).startswith("test_") and rel.endswith(".py")) or rel.endswith("_test.py")
+        ]
+    else:
+        tests_dir = os.path.join(project_root, "tests")
+        test_targets = [tests_dir] if os.path.isdir(tests_dir) else []
+    if test_targets:
         try:
             tests_run = True
             proc = subprocess.run(
-                ["python", "-m", "pytest", tests_dir, "-q"],
+                ["python", "-m", "pytest", *test_targets, "-q"],
                 capture_output=True,
                 text=True,
                 check=False,
@@ -130,6 +294,7 @@ def run_task(task_id_or_path: str) -> Dict:
     try:
         task = load_task(task_id_or_path)
         target_project = _resolve_target_project(task.project)
+        head_at_start = git_head(target_project)
 
         prompt_metadata = {
             "task_id": task.task_id,
@@ -142,18 +307,39 @@ def run_task(task_id_or_path: str) -> Dict:
             "run_mode": "task",
         }
 
-        context = ProjectScanner(target_project).collect_project_files()
-        full_prompt = PromptBuilder().build_prompt(task.body_markdown, context, prompt_metadata)
-
-        client = CodexClient()
+        client = AsyncCodexClient()
         model_name = client.model
+        builder = PromptBuilder()
+        budget = builder.plan_budget(client.budget, task.body_markdown, prompt_metadata)
+
+        profile = project_scan_profile(task.project, target_project)
+        snapshot = get_project_snapshot(target_project)
+        scanner = ProjectScanner(
+            target_project,
+            snapshot=snapshot,
+            **_task_scanner_options(task, target_project, profile, budget),
+        )
+        context_chars = context_chars_for(budget, profile)
+        overview, overview_stats = _project_overview(scanner, client, task.task_type, context_chars)
+        context = scanner.collect_context_bundle(
+            max_chars=context_chars - len(overview),
+            query=task.body_markdown,
+        )
+        full_prompt = builder.build_prompt(
+            task.body_markdown,
+            context,
+            prompt_metadata,
+            budget=budget,
+            project_overview=overview,
+        )
+
         response = client.send(full_prompt)
 
         if isinstance(response, str) and response.lstrip().startswith("[ERROR]"):
             raise RuntimeError(response)
 
         # Build change set from model output
-        change_set = build_change_set_from_response(target_project, response)
+        change_set = build_change_set_from_response(target_project, response, snapshot=snapshot, scope=task.scope)
 
         # Evaluate safety
         policy = load_safety_policy()
@@ -182,11 +368,14 @@ def run_task(task_id_or_path: str) -> Dict:
                 apply_result = write_change_set_as_patches(change_set, PATCHES_DIR)
             else:
                 apply_result = apply_change_set_direct(change_set)
+                snapshot.apply_change_set(change_set)
 
         # Quality checks
         qc_result = run_basic_quality_checks(
             target_project,
             (apply_result.get("changed_files") or []) + (apply_result.get("created_files") or []),
+            snapshot=snapshot,
+            scope=task.scope,
         )
 
         risks: List[str] = []
@@ -197,6 +386,8 @@ def run_task(task_id_or_path: str) -> Dict:
         if qc_result.get("tests_status") == "error":
             risks.append("Tests failed.")
             status = "partial" if status == "ok" else status
+        if change_set.out_of_scope:
+            risks.append(f"Ignored {len(change_set.out_of_scope)} file(s) outside the task scope.")
 
         safety_status = safety_eval.overall_verdict
         blocked_files = [f.path for f in safety_eval.files if f.verdict == "block"]
@@ -234,6 +425,29 @@ def run_task(task_id_or_path: str) -> Dict:
                 "write_mode_used": safety_eval.write_mode,
                 "safety_reasons": safety_eval.reasons,
                 "quality_checks": qc_result,
+                "project_snapshot_hash": scanner.stats.snapshot_hash,
+                "context_dedup_chars_saved": scanner.stats.dedup_chars_saved,
+                "context_compression_saved": dict(scanner.stats.compression_chars_saved),
+                "context_mode": scanner.ranking_mode,
+                "context_chars": scanner.stats.chars_collected,
+                "context_diff_base_ref": scanner.stats.diff_base_ref,
+                "context_git_ref": scanner.git_ref,
+                "context_git_tree": scanner.stats.git_tree,
+                "scope": task.scope,
+                "out_of_scope_files": change_set.out_of_scope,
+                "context_history_boosted": len(scanner.stats.history_boosted_files),
+                "context_files": context.manifest(),
+                "project_overview": overview_stats,
+                "llm_cache": dict(client.cache_stats),
+                "llm_concurrency": client.limiter.stats(),
+                "llm_retries": dict(client.retry_stats, rate_limit_wait_seconds=round(client.rate_limiter.waited_seconds, 2)),
+                "git_head": head_at_start,
+                "prompt_budget": {
+                    "window_tokens": budget.window_tokens,
+                    "context_tokens": budget.context_tokens,
+                    "output_reserve_tokens": budget.output_reserve_tokens,
+                    "chars_per_token": budget.chars_per_token,
+                },
             },
         )
     except (TaskParseError, FileNotFoundError) as exc:
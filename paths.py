@@ -9,6 +9,7 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 REPORTS_DIR = os.path.join(BASE_DIR, "reports")
 TASKS_DIR = os.path.join(BASE_DIR, "tasks")
 PATCHES_DIR = os.path.join(BASE_DIR, "patches")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
 
 os.makedirs(PROMPTS_DIR, exist_ok=True)
 os.makedirs(PROMPTS_ARCHIVE_DIR, exist_ok=True)
@@ -1,6 +1,20 @@
+import hashlib
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Iterable, List, Optional, Set
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from context_bundle import ContextBundle
+from context_compression import compress_text, mentioned_paths, validate_passes
+from gitignore_matcher import GitIgnoreMatcher, PathScope, compile_path_globs, git_list_files
+from python_outline import build_outline
+from scan_manifest import ScanManifest, combine_digests, content_digest, skipped_digest
+
+if TYPE_CHECKING:
+    from project_snapshot import ProjectSnapshot
 
 # Default settings for context collection
 DEFAULT_INCLUDE_EXTS: Set[str] = {".py", ".md", ".yaml", ".yml", ".toml", ".json", ".txt"}
@@ -29,6 +43,90 @@ DEFAULT_EXCLUDE_DIRS: Set[str] = {
     "htmlcov",
 }
 
+# walk: tree order; bm25: relevance-packed; imports: files named in the task plus their import closure;
+# diff: `git diff` since a base ref, the changed files and outlines of the modules around them
+RANKING_MODES: Set[str] = {"walk", "bm25", "imports", "diff"}
+# none: extension/dir filters only; gitignore: honour .gitignore files; git: `git ls-files` listing
+IGNORE_MODES: Set[str] = {"none", "gitignore", "git"}
+
+# Content sniffing applied to the head of each file before it is decoded.
+SNIFF_BYTES = 8192
+MAX_BYTES_PER_CHAR = 4  # UTF-8 upper bound, used for the st_size prefilter
+GENERATED_MARKERS = (b"@generated", b"do not edit", b"auto-generated", b"autogenerated")
+GENERATED_MARKER_LINES = 5
+MINIFIED_AVG_LINE_CHARS = 300
+CONTROL_BYTES = bytes(range(0, 9)) + bytes(range(14, 32))
+# Oversized Python files are still parsed for the outline tier, up to this many bytes.
+OUTLINE_MAX_BYTES = 4_000_000
+# An outline smaller than this is not worth parsing for (header plus a few signatures), and
+# at most this many files are parsed for outlines per scan.
+MIN_OUTLINE_CHARS = 120
+MAX_OUTLINE_ATTEMPTS = 200
+# At most this many historically touched files are moved to the front in walk mode.
+HISTORY_BOOST_MAX_FILES = 50
+
+
+def walk_order_key(rel_path: str) -> List[Tuple[int, str]]:
+    """
+    Sort key reproducing the scanner's walk order for relative paths:
+    a directory's files (sorted) come before its subdirectories (sorted).
+    """
+    parts = rel_path.replace(os.sep, "/").split("/")
+    return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
+
+@dataclass
+class ScannedFile:
+    """
+    Result of reading one candidate file. `text` is None when the file was skipped
+    (skip_reason: large | binary | minified | generated).
+    """
+
+    rel_path: str
+    chars: int
+    text: Optional[str] = None
+    skip_reason: Optional[str] = None
+    file_id: Optional[Tuple[int, int]] = None  # (st_dev, st_ino); symlinks resolve to their target
+    digest: Optional[str] = None  # sha256 of text (computed lazily) or a metadata digest if skipped
+
+    @property
+    def has_text(self) -> bool:
+        return self.text is not None
+
+
+class MappedScannedFile(ScannedFile):
+    """
+    ScannedFile backed by a zero-copy slice of a shared snapshot mapping. The text is decoded
+    on each access and not kept, so worker processes hold no private copy of the project;
+    the slice keeps the mapping alive.
+    """
+
+    def __init__(
+        self,
+        rel_path: str,
+        chars: int,
+        view: Optional[memoryview],
+        skip_reason: Optional[str] = None,
+        file_id: Optional[Tuple[int, int]] = None,
+        digest: Optional[str] = None,
+    ):
+        self._view = view
+        super().__init__(rel_path, chars, None, skip_reason, file_id, digest)
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._text is not None or self._view is None:
+            return self._text
+        return str(self._view, "utf-8")
+
+    @text.setter
+    def text(self, value: Optional[str]) -> None:
+        self._text = value
+
+    @property
+    def has_text(self) -> bool:
+        return self._text is not None or self._view is not None
+
 
 @dataclass
 class ScannerStats:
@@ -40,6 +138,34 @@ class ScannerStats:
     chars_collected: int = 0
     stopped_due_to_limit: bool = False
     skipped_large_files: List[str] = field(default_factory=list)
+    skipped_binary_files: List[str] = field(default_factory=list)
+    skipped_generated_files: List[str] = field(default_factory=list)
+    manifest_hits: int = 0
+    manifest_misses: int = 0
+    snapshot_hash: Optional[str] = None
+    snapshot_reused: bool = False
+    walk_seconds: float = 0.0
+    read_seconds: float = 0.0
+    ranking_mode: str = "walk"
+    ignore_mode: str = "none"
+    files_ranked_out: int = 0
+    duplicate_files: int = 0
+    dedup_chars_saved: int = 0
+    outlined_files: List[str] = field(default_factory=list)
+    outline_chars: int = 0
+    import_seeds: List[str] = field(default_factory=list)
+    import_closure_files: int = 0
+    diff_base_ref: Optional[str] = None
+    diff_changed_files: List[str] = field(default_factory=list)
+    diff_chars: int = 0
+    excerpt_symbols: List[str] = field(default_factory=list)
+    excerpt_files: List[str] = field(default_factory=list)
+    excerpt_chars: int = 0
+    history_boosted_files: List[str] = field(default_factory=list)
+    shared_snapshot_reused: bool = False
+    compression_chars_saved: Dict[str, int] = field(default_factory=dict)
+    git_tree: Optional[str] = None
+    git_tree_cached: bool = False
 
 
 class ProjectScanner:
@@ -53,69 +179,1239 @@ class ProjectScanner:
         include_exts: Optional[Iterable[str]] = None,
         exclude_dirs: Optional[Iterable[str]] = None,
         max_file_chars: int = 100_000,
+        use_manifest: bool = False,
+        manifest_path: Optional[str] = None,
+        parallel: bool = False,
+        max_workers: int = 8,
+        ranking_mode: str = "walk",
+        dedupe: bool = False,
+        outline_tier: bool = False,
+        outline_budget_ratio: float = 0.2,
+        ignore_mode: str = "none",
+        snapshot: Optional["ProjectSnapshot"] = None,
+        import_depth: int = 2,
+        import_graph_path: Optional[str] = None,
+        diff_base_ref: Optional[str] = None,
+        diff_budget_ratio: float = 0.5,
+        excerpt_large_files: bool = False,
+        excerpt_budget_ratio: float = 0.2,
+        symbol_index_path: Optional[str] = None,
+        include_globs: Optional[Iterable[str]] = None,
+        exclude_globs: Optional[Iterable[str]] = None,
+        priority_dirs: Optional[Iterable[str]] = None,
+        history_scores: Optional[Dict[str, float]] = None,
+        shared_snapshot: bool = False,
+        shared_snapshot_path: Optional[str] = None,
+        compression_passes: Optional[Iterable[str]] = None,
+        git_ref: Optional[str] = None,
+        git_trees_dir: Optional[str] = None,
+        scope: Optional[Iterable[str]] = None,
     ):
         self.project_root = os.path.abspath(project_root)
         self.include_exts = {ext.lower() for ext in (include_exts or DEFAULT_INCLUDE_EXTS)}
         self.exclude_dirs = {d.lower() for d in (exclude_dirs or DEFAULT_EXCLUDE_DIRS)}
         self.max_file_chars = max_file_chars
         self.stats = ScannerStats()
+        # Loaded on first use: a scan served from a current snapshot never reads it.
+        self.use_manifest = use_manifest
+        self.manifest_path = manifest_path
+        self._manifest: Optional[ScanManifest] = None
+        self.parallel = parallel
+        self.max_workers = max(1, max_workers)
+        if ranking_mode not in RANKING_MODES:
+            raise ValueError(f"Unsupported ranking_mode '{ranking_mode}'. Expected one of: {', '.join(sorted(RANKING_MODES))}")
+        self.ranking_mode = ranking_mode
+        self.dedupe = dedupe
+        self.outline_tier = outline_tier
+        self.outline_budget_ratio = min(max(outline_budget_ratio, 0.0), 1.0)
+        self._outline_attempts = 0
+        if ignore_mode not in IGNORE_MODES:
+            raise ValueError(f"Unsupported ignore_mode '{ignore_mode}'. Expected one of: {', '.join(sorted(IGNORE_MODES))}")
+        self.ignore_mode = ignore_mode
+        self.snapshot = snapshot
+        self.import_depth = max(0, import_depth)
+        self.import_graph_path = import_graph_path
+        self.diff_base_ref = diff_base_ref
+        self.diff_budget_ratio = min(max(diff_budget_ratio, 0.0), 1.0)
+        self.excerpt_large_files = excerpt_large_files
+        self.excerpt_budget_ratio = min(max(excerpt_budget_ratio, 0.0), 1.0)
+        self.symbol_index_path = symbol_index_path
+        # File list of the scan in progress, shared by the symbol excerpts and the main walk.
+        self._listed_files: Optional[List[Tuple[str, str, Optional[os.stat_result]]]] = None
+        # include_globs add files beyond include_exts; exclude_globs remove matching files.
+        self.include_globs = tuple(include_globs or ())
+        self.exclude_globs = tuple(exclude_globs or ())
+        self._include_re = compile_path_globs(self.include_globs)
+        self._exclude_re = compile_path_globs(self.exclude_globs)
+        # Task SCOPE globs: only matching files are scanned; other directories are not walked.
+        self.scope = PathScope(scope or ())
+        # Walk mode fills the budget from these directories first, in the given order.
+        self.priority_dirs = [d.replace(os.sep, "/").strip("/") for d in (priority_dirs or ()) if d.strip("/\\")]
+        # Cross-process snapshot file (mmap); reused when a stat walk shows nothing changed.
+        self.shared_snapshot = shared_snapshot
+        self.shared_snapshot_path = shared_snapshot_path
+        # Render-time passes (context_compression); files named in the query or changed in
+        # diff mode are targets and are left out of the lossy passes.
+        self.compression_passes = validate_passes(compression_passes or ())
+        self._target_paths: Set[str] = set()
+        self._digests: Dict[str, str] = {}  # rel path -> content digest of rendered files
+        # Scan the tree committed at git_ref instead of the working tree (no checkout); the
+        # working-tree snapshot, manifest and symbol index are bypassed.
+        if git_ref and ranking_mode == "diff":
+            raise ValueError("ranking_mode 'diff' compares against the working tree and cannot be combined with git_ref")
+        self.git_ref = git_ref
+        self.git_trees_dir = git_trees_dir
+        self._git_blobs: Dict[str, str] = {}  # rel path -> blob hash at git_ref
+        # Prior from past reports (posix rel path -> score): boosted to the front of walk order
+        # and added to BM25 relevance.
+        self.history_scores = {path.replace("\\", "/"): score for path, score in (history_scores or {}).items() if score > 0}
 
-    def _should_exclude_dir(self, dirname: str) -> bool:
-        return dirname.lower() in self.exclude_dirs
+    def _should_exclude_dir(self, dirname: str, rel_dir: Optional[str] = None) -> bool:
+        if dirname.lower() in self.exclude_dirs:
+            return True
+        return bool(self.scope) and rel_dir is not None and not self.scope.may_contain(rel_dir)
 
-    def _should_include_file(self, filename: str) -> bool:
+    def _should_include_file(self, filename: str, rel_path: Optional[str] = None) -> bool:
         _, ext = os.path.splitext(filename)
-        return ext.lower() in self.include_exts
+        included = ext.lower() in self.include_exts
+        if rel_path is not None and self.scope and not self.scope.matches(rel_path):
+            return False
+        if rel_path is None or (self._include_re is None and self._exclude_re is None):
+            return included
+        posix = rel_path.replace(os.sep, "/")
+        if not included and self._include_re is not None:
+            included = self._include_re.fullmatch(posix) is not None
+        if included and self._exclude_re is not None:
+            included = self._exclude_re.fullmatch(posix) is None
+        return included
 
-    def collect_project_context(self, max_chars: int = 250_000) -> str:
+    def _iter_files(self) -> Iterator[Tuple[str, str, Optional[os.stat_result]]]:
         """
-        Walks the project tree and returns a concatenated string of file contents
-        limited to `max_chars`. Large files (> max_file_chars) are skipped.
-        Directory exclusions and extension filters are applied to reduce noise.
+        Yields (rel_path, abs_path, stat) for included files in a deterministic top-down order:
+        files of a directory (sorted) first, then its subdirectories (sorted).
+        stat is only populated by the scandir walk (parallel mode).
+        Ignored subtrees (ignore_mode) are pruned without being traversed.
         """
-        context_parts: List[str] = []
-        total_chars = 0
+        if self._listed_files is not None:
+            yield from self._listed_files
+            return
+        self.stats.ignore_mode = self.ignore_mode
+        if self.ignore_mode == "git":
+            listed = git_list_files(self.project_root)
+            if listed is not None:
+                yield from self._git_listed_files(listed)
+                return
+            # Not a git work tree (or git unavailable): honour ignore files directly.
+            self.stats.ignore_mode = "gitignore"
+        matcher = GitIgnoreMatcher(self.project_root) if self.ignore_mode != "none" else None
+
+        if self.parallel:
+            yield from self._scandir_files(self.project_root, matcher)
+            return
 
         for root, dirs, files in os.walk(self.project_root):
+            rel_root = os.path.relpath(root, self.project_root)
+            rel_root = "" if rel_root == "." else rel_root
+            if matcher is not None:
+                matcher.load_dir(rel_root)
             # Prune excluded directories in-place for performance
-            dirs[:] = [d for d in dirs if not self._should_exclude_dir(d)]
+            dirs[:] = sorted(
+                d for d in dirs
+                if not self._should_exclude_dir(d, os.path.join(rel_root, d))
+                and not (matcher is not None and matcher.is_ignored(os.path.join(rel_root, d), is_dir=True))
+            )
 
             for fname in sorted(files):
-                if not self._should_include_file(fname):
+                if not self._should_include_file(fname, os.path.join(rel_root, fname)):
                     continue
-
                 abs_path = os.path.join(root, fname)
                 rel_path = os.path.relpath(abs_path, self.project_root)
+                if matcher is not None and matcher.is_ignored(rel_path):
+                    continue
+                yield rel_path, abs_path, None
+
+    def _git_listed_files(self, listed: List[str]) -> Iterator[Tuple[str, str, Optional[os.stat_result]]]:
+        """
+        Filters `git ls-files` output and re-sorts it into the scanner's walk order
+        (a directory's files before its subdirectories).
+        """
+        candidates = [os.path.join(*path.split("/")) for path in listed if self.accepts_path(path)]
+        for rel_path in sorted(candidates, key=walk_order_key):
+            yield rel_path, os.path.join(self.project_root, rel_path), None
+
+    def accepts_path(self, rel_path: str) -> bool:
+        """
+        Applies the directory-exclusion and extension filters to a relative path.
+        """
+        parts = rel_path.replace(os.sep, "/").split("/")
+        if any(self._should_exclude_dir(part) for part in parts[:-1]):
+            return False
+        return self._should_include_file(parts[-1], rel_path)
+
+    def _scandir_files(
+        self,
+        directory: str,
+        matcher: Optional[GitIgnoreMatcher] = None,
+    ) -> Iterator[Tuple[str, str, Optional[os.stat_result]]]:
+        """
+        os.scandir-based equivalent of the os.walk order that reuses DirEntry stat results.
+        Symlinked directories are listed but not followed, mirroring os.walk defaults.
+        """
+        rel_dir = os.path.relpath(directory, self.project_root)
+        rel_dir = "" if rel_dir == "." else rel_dir
+        if matcher is not None:
+            matcher.load_dir(rel_dir)
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            return
+
+        files: List[os.DirEntry] = []
+        subdirs: List[os.DirEntry] = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if matcher is not None and matcher.is_ignored(os.path.join(rel_dir, entry.name), is_dir=is_dir):
+                continue
+            if is_dir:
+                if not self._should_exclude_dir(entry.name, os.path.join(rel_dir, entry.name)):
+                    subdirs.append(entry)
+            elif self._should_include_file(entry.name, os.path.join(rel_dir, entry.name)):
+                files.append(entry)
+
+        for entry in sorted(files, key=lambda e: e.name):
+            try:
+                stat = entry.stat()
+            except OSError:
+                stat = None
+            yield os.path.relpath(entry.path, self.project_root), entry.path, stat
+
+        for entry in sorted(subdirs, key=lambda e: e.name):
+            if entry.is_symlink():
+                continue
+            yield from self._scandir_files(entry.path, matcher)
+
+    @property
+    def manifest(self) -> Optional[ScanManifest]:
+        """
+        The scan manifest, loaded on first use so snapshot-served scans never read it.
+        """
+        if self.use_manifest and self._manifest is None:
+            self._manifest = ScanManifest(self.project_root, path=self.manifest_path)
+        return self._manifest
+
+    def _list_files(self) -> List[Tuple[str, str, Optional[os.stat_result]]]:
+        started = time.perf_counter()
+        files = list(self._iter_files())
+        self.stats.walk_seconds += time.perf_counter() - started
+        return files
+
+    @staticmethod
+    def _sniff(head: bytes) -> Optional[str]:
+        """
+        Classifies the first bytes of a file: binary, generated or minified content is rejected
+        before the rest of the file is read or decoded.
+        """
+        if not head:
+            return None
+        if b"\0" in head or len(head.translate(None, CONTROL_BYTES)) < len(head) * 0.9:
+            return "binary"
+        preamble = b"\n".join(head.split(b"\n", GENERATED_MARKER_LINES)[:GENERATED_MARKER_LINES]).lower()
+        if any(marker in preamble for marker in GENERATED_MARKERS):
+            return "generated"
+        if len(head) >= 1024 and len(head) / (head.count(b"\n") + 1) > MINIFIED_AVG_LINE_CHARS:
+            return "minified"
+        return None
 
+    @staticmethod
+    def _file_id(stat: os.stat_result) -> Optional[Tuple[int, int]]:
+        # st_ino is 0 on filesystems without stable inode numbers; don't alias those.
+        return (stat.st_dev, stat.st_ino) if stat.st_ino else None
+
+    def _read_file(self, rel_path: str, abs_path: str, stat: Optional[os.stat_result] = None) -> Optional[ScannedFile]:
+        """
+        Reads a file with bounded memory. Returns None if unreadable.
+        Files whose st_size cannot fit in max_file_chars are rejected before opening, and at most
+        max_file_chars * 4 bytes are ever read. Newlines are normalized like text-mode reads.
+        """
+        byte_limit = self.max_file_chars * MAX_BYTES_PER_CHAR
+        try:
+            if stat is None:
+                stat = os.stat(abs_path)
+            file_id = self._file_id(stat)
+            if stat.st_size > byte_limit:
+                return self._skipped(rel_path, stat.st_size, "large", stat)
+            with open(abs_path, "rb") as handle:
+                head = handle.read(SNIFF_BYTES)
+                reason = self._sniff(head)
+                if reason:
+                    return self._skipped(rel_path, len(head), reason, stat)
+                raw = head + handle.read(byte_limit + 1 - len(head))
+        except OSError:
+            return None
+
+        text = raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+        if len(raw) > byte_limit or len(text) > self.max_file_chars:
+            return self._skipped(rel_path, len(text), "large", stat)
+        return ScannedFile(rel_path, len(text), text=text, file_id=file_id)
+
+    def _skipped(self, rel_path: str, chars: int, reason: str, stat: os.stat_result) -> ScannedFile:
+        return ScannedFile(
+            rel_path,
+            chars,
+            skip_reason=reason,
+            file_id=self._file_id(stat),
+            digest=skipped_digest(reason, stat.st_size, stat.st_mtime_ns),
+        )
+
+    def _read_many(self, files: List[Tuple[str, str, Optional[os.stat_result]]]) -> Iterator[Optional[ScannedFile]]:
+        """
+        Reads (rel_path, abs_path, stat) triples in input order. In parallel mode reads run on a bounded thread
+        pool in windows, so a consumer that stops early (budget exhausted) does not trigger the rest.
+        """
+        if not self.parallel or len(files) < 2:
+            for rel_path, abs_path, stat in files:
+                started = time.perf_counter()
+                result = self._read_file(rel_path, abs_path, stat)
+                self.stats.read_seconds += time.perf_counter() - started
+                yield result
+            return
+
+        window = self.max_workers * 4
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for offset in range(0, len(files), window):
+                started = time.perf_counter()
+                batch = list(executor.map(lambda item: self._read_file(*item), files[offset:offset + window]))
+                self.stats.read_seconds += time.perf_counter() - started
+                yield from batch
+
+    def refresh_manifest(self) -> List[ScannedFile]:
+        """
+        Stats the whole tree, re-reads only files whose size/mtime changed since the last scan,
+        prunes deleted files and persists the manifest.
+        Returns scanned files in walk order; skipped files carry a skip_reason and no text.
+        """
+        if not self.use_manifest:
+            raise RuntimeError("refresh_manifest requires use_manifest=True")
+
+        walk_started = time.perf_counter()
+        stated: List[Tuple[str, str, os.stat_result]] = []
+        for rel_path, abs_path, stat in self._iter_files():
+            if stat is None:
                 try:
-                    with open(abs_path, "r", encoding="utf-8", errors="ignore") as handle:
-                        content = handle.read()
+                    stat = os.stat(abs_path)
                 except OSError:
                     continue
+            stated.append((rel_path, abs_path, stat))
+        self.stats.walk_seconds += time.perf_counter() - walk_started
+
+        entries = [self.manifest.lookup(rel_path, stat, self.max_file_chars) for rel_path, _, stat in stated]
+        stale = [idx for idx, entry in enumerate(entries) if entry is None]
+        reads = self._read_many([stated[idx] for idx in stale])
+        for idx, result in zip(stale, reads):
+            if result is not None:
+                rel_path, _, stat = stated[idx]
+                entries[idx] = self.manifest.update(rel_path, stat, result.text, result.chars, result.skip_reason)
+
+        files = [
+            ScannedFile(
+                rel_path,
+                entry.chars,
+                entry.text,
+                entry.skip_reason,
+                file_id=self._file_id(stat),
+                digest=entry.sha256,
+            )
+            for (rel_path, _, stat), entry in zip(stated, entries)
+            if entry is not None
+        ]
+
+        self.manifest.prune((scanned.rel_path for scanned in files), self.scope.matches if self.scope else None)
+        self.manifest.save()
+        self.stats.manifest_hits = self.manifest.hits
+        self.stats.manifest_misses = self.manifest.misses
+        if self.scope:
+            self.stats.snapshot_hash = combine_digests((scanned.rel_path, scanned.digest) for scanned in files)
+        else:
+            self.stats.snapshot_hash = self.manifest.snapshot_hash()
+        return files
+
+    def snapshot_hash(self) -> str:
+        """
+        Returns a stable hash of the current project contents, refreshing the manifest if needed.
+        """
+        if self.stats.snapshot_hash is None:
+            self.refresh_manifest()
+        return self.stats.snapshot_hash or ""
+
+    def _scan_key(self, scoped: bool = True) -> Tuple:
+        """
+        Settings that determine which files a scan produces; a shared snapshot is only
+        reused by scanners with the same key.
+        """
+        return (
+            frozenset(self.include_exts),
+            frozenset(self.exclude_dirs),
+            self.max_file_chars,
+            self.ignore_mode,
+            self.include_globs,
+            self.exclude_globs,
+            tuple(self.scope.patterns) if scoped else (),
+        )
+
+    def _scan_key_text(self) -> str:
+        """
+        Process-independent form of _scan_key, stored in shared snapshot files.
+        """
+        return json.dumps(
+            [
+                sorted(self.include_exts),
+                sorted(self.exclude_dirs),
+                self.max_file_chars,
+                self.ignore_mode,
+                list(self.include_globs),
+                list(self.exclude_globs),
+                self.scope.patterns,
+            ]
+        )
+
+    def _shared_snapshot_file(self) -> str:
+        from snapshot_file import snapshot_file_path_for
 
-                if len(content) > self.max_file_chars:
-                    self.stats.skipped_large_files.append(rel_path)
+        return self.shared_snapshot_path or snapshot_file_path_for(self.project_root)
+
+    def _files_from_mapped(self, mapped) -> Optional[List[ScannedFile]]:
+        """
+        Files from a mapped snapshot if it was written with the same settings and a stat walk
+        finds the same files with unchanged size/mtime; None if anything differs.
+        """
+        if mapped.scan_key != self._scan_key_text():
+            return None
+        listed = self._list_files()
+        if len(listed) != len(mapped.entries):
+            return None
+        files: List[ScannedFile] = []
+        started = time.perf_counter()
+        for rel_path, abs_path, stat in listed:
+            entry = mapped.entries.get(rel_path.replace(os.sep, "/"))
+            if entry is None:
+                return None
+            try:
+                stat = stat or os.stat(abs_path)
+            except OSError:
+                return None
+            if (stat.st_size, stat.st_mtime_ns) != (entry.size, entry.mtime_ns):
+                return None
+            files.append(
+                MappedScannedFile(
+                    rel_path,
+                    entry.chars,
+                    mapped.view(entry.rel_path),
+                    entry.skip_reason,
+                    file_id=entry.file_id or self._file_id(stat),
+                    digest=entry.digest,
+                )
+            )
+        self.stats.read_seconds += time.perf_counter() - started
+        return files
+
+    def _shared_contents(self) -> List[ScannedFile]:
+        from snapshot_file import MappedSnapshot
+
+        mapped = MappedSnapshot.open(self._shared_snapshot_file())
+        files = self._files_from_mapped(mapped) if mapped is not None else None
+        if files is None and mapped is not None:
+            mapped.close()
+        if files is not None:
+            # Not closed: the files' slices keep the mapping alive until they are dropped.
+            self.stats.shared_snapshot_reused = True
+            self.stats.snapshot_hash = combine_digests((scanned.rel_path, scanned.digest) for scanned in files if scanned.digest)
+            return files
+        files = list(self._scan_contents())
+        self.export_shared_snapshot(files)
+        return files
+
+    def export_shared_snapshot(self, files: Optional[List[ScannedFile]] = None) -> None:
+        """
+        Writes `files` (default: the in-process snapshot) to the shared snapshot file so other
+        worker processes can map it instead of re-reading the project.
+        """
+        from snapshot_file import write_snapshot_file
+
+        if files is None:
+            if self.snapshot is None:
+                raise RuntimeError("export_shared_snapshot needs files or a snapshot")
+            files = self.snapshot.files()
+        records = []
+        for scanned in files:
+            try:
+                stat = os.stat(os.path.join(self.project_root, scanned.rel_path))
+            except OSError:
+                continue
+            if scanned.text is not None and scanned.digest is None:
+                scanned.digest = content_digest(scanned.text)
+            records.append(
+                (
+                    scanned.rel_path.replace(os.sep, "/"),
+                    scanned.text,
+                    scanned.chars,
+                    scanned.digest,
+                    scanned.skip_reason,
+                    stat,
+                    scanned.file_id,
+                )
+            )
+        try:
+            write_snapshot_file(self._shared_snapshot_file(), self.project_root, self._scan_key_text(), records)
+        except OSError as exc:
+            # e.g. Windows refuses to replace a file another process has mapped; retry next time.
+            print(f"[WARN] Could not write shared snapshot for {self.project_root}: {exc}")
+
+    def _git_tree_cache_path(self, tree: str) -> str:
+        from git_context import GIT_TREES_DIR
+
+        key = hashlib.sha1(self._scan_key_text().encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.git_trees_dir or GIT_TREES_DIR, f"{tree}-{key}.json")
+
+    def _read_blob(self, reader, rel_path: str, blob: str, size: int) -> Optional[ScannedFile]:
+        """
+        _read_file for a blob at git_ref: same size cap, sniffing and decoding.
+        """
+        if size > self.max_file_chars * MAX_BYTES_PER_CHAR:
+            return ScannedFile(rel_path, size, skip_reason="large", digest=f"large:{blob}")
+        raw = reader.read(blob)
+        if raw is None:
+            return None
+        reason = self._sniff(raw[:SNIFF_BYTES])
+        if reason:
+            return ScannedFile(rel_path, min(size, SNIFF_BYTES), skip_reason=reason, digest=f"{reason}:{blob}")
+        text = raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+        if len(text) > self.max_file_chars:
+            return ScannedFile(rel_path, len(text), skip_reason="large", digest=f"large:{blob}")
+        return ScannedFile(rel_path, len(text), text=text, digest=content_digest(text))
+
+    def _git_contents(self) -> List[ScannedFile]:
+        """
+        Files of the tree at git_ref, listed with `git ls-tree` and streamed through one
+        `git cat-file --batch` process. Results are cached per tree hash and scan settings.
+        """
+        from git_context import GitBlobReader, ls_tree, prune_tree_cache, tree_hash
+
+        tree = tree_hash(self.project_root, self.git_ref)
+        listed = ls_tree(self.project_root, self.git_ref) if tree else None
+        if listed is None:
+            raise RuntimeError(f"Cannot read git ref '{self.git_ref}' in {self.project_root}")
+        self.stats.git_tree = tree
+        self._git_blobs = {path.replace("/", os.sep): blob for path, blob, _ in listed}
+
+        cache_path = self._git_tree_cache_path(tree)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as handle:
+                cached = json.load(handle)
+            self.stats.git_tree_cached = True
+            return [ScannedFile(*item) for item in cached["files"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        started = time.perf_counter()
+        files: List[ScannedFile] = []
+        with GitBlobReader(self.project_root) as reader:
+            for path, blob, size in sorted(listed, key=lambda item: walk_order_key(item[0])):
+                rel_path = path.replace("/", os.sep)
+                if not self.accepts_path(rel_path):
                     continue
+                scanned = self._read_blob(reader, rel_path, blob, size)
+                if scanned is not None:
+                    files.append(scanned)
+        self.stats.read_seconds += time.perf_counter() - started
 
-                header = f"### FILE: {rel_path}\n"
-                snippet = header + content.strip() + "\n\n"
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"files": [[f.rel_path, f.chars, f.text, f.skip_reason, None, f.digest] for f in files]}, handle)
+        os.replace(tmp_path, cache_path)
+        prune_tree_cache(os.path.dirname(cache_path))
+        return files
 
-                if total_chars + len(snippet) > max_chars:
-                    self.stats.stopped_due_to_limit = True
+    def _iter_contents(self) -> Iterator[ScannedFile]:
+        if self.git_ref:
+            yield from self._git_contents()
+            return
+        if self.snapshot is None:
+            yield from self._shared_contents() if self.shared_snapshot else self._scan_contents()
+            return
+
+        scan_key = self._scan_key()
+        if self.scope and self.snapshot.is_current(self._scan_key(scoped=False)):
+            # A warm whole-project snapshot (e.g. kept by a watcher) covers any scope.
+            self.stats.snapshot_reused = True
+            for scanned in self.snapshot.files():
+                if self.scope.matches(scanned.rel_path):
+                    yield scanned
+            return
+        if self.snapshot.is_current(scan_key):
+            self.stats.snapshot_reused = True
+        else:
+            files = self._shared_contents() if self.shared_snapshot else list(self._scan_contents())
+            self.snapshot.load(scan_key, files, self.max_file_chars, self.accepts_path)
+        self.stats.snapshot_hash = self.snapshot.snapshot_hash()
+        yield from self.snapshot.files()
+
+    def warm_snapshot(self) -> None:
+        """
+        (Re)loads the shared snapshot from a full scan without rendering any context.
+        """
+        if self.snapshot is None:
+            raise RuntimeError("warm_snapshot requires a snapshot")
+        self.stats = ScannerStats(ranking_mode=self.ranking_mode)
+        self.snapshot.invalidate()
+        for _ in self._iter_contents():
+            pass
+
+    def refresh_snapshot_files(self, rel_paths: Iterable[str]) -> None:
+        """
+        Re-reads individual files into the shared snapshot (used by watchers for small change
+        bursts); files that disappeared or no longer pass the filters are dropped.
+        """
+        if self.snapshot is None:
+            raise RuntimeError("refresh_snapshot_files requires a snapshot")
+        matcher = GitIgnoreMatcher(self.project_root) if self.ignore_mode != "none" else None
+        for rel_path in rel_paths:
+            abs_path = os.path.join(self.project_root, rel_path)
+            ignored = False
+            if matcher is not None:
+                parts = rel_path.replace(os.sep, "/").split("/")
+                for depth in range(len(parts)):
+                    matcher.load_dir("/".join(parts[:depth]))
+                ignored = any(
+                    matcher.is_ignored("/".join(parts[: depth + 1]), is_dir=depth < len(parts) - 1)
+                    for depth in range(len(parts))
+                )
+            scanned = None
+            if not ignored and self.accepts_path(rel_path) and os.path.isfile(abs_path):
+                scanned = self._read_file(rel_path, abs_path)
+            if scanned is None:
+                self.snapshot.remove(rel_path)
+            else:
+                self.snapshot.put(scanned)
+        self.snapshot.touch()
+        if self.shared_snapshot:
+            self.export_shared_snapshot()
+
+    def _scan_contents(self) -> Iterator[ScannedFile]:
+        if self.use_manifest:
+            yield from self.refresh_manifest()
+            return
+        for result in self._read_many(self._list_files()):
+            if result is not None:
+                yield result
+
+    def _iter_eligible(self) -> Iterator[ScannedFile]:
+        """
+        Yields files with usable text, recording skipped ones in stats.
+        With the outline tier enabled, oversized Python files are yielded too (text is None).
+        """
+        for scanned in self._iter_contents():
+            if scanned.has_text and scanned.chars <= self.max_file_chars:
+                yield scanned
+            elif scanned.skip_reason == "binary":
+                self.stats.skipped_binary_files.append(scanned.rel_path)
+            elif scanned.skip_reason in ("generated", "minified"):
+                self.stats.skipped_generated_files.append(scanned.rel_path)
+            else:
+                self.stats.skipped_large_files.append(scanned.rel_path)
+                if self.outline_tier and scanned.rel_path.endswith(".py"):
+                    yield scanned
+
+    def _iter_rendered(
+        self,
+        files: Optional[Iterable[ScannedFile]] = None,
+    ) -> Iterator[Tuple[ScannedFile, Optional[str], Optional[str]]]:
+        """
+        Yields (file, snippet, duplicate_of) for eligible files (or `files`, in that order).
+        With dedupe enabled, a file whose inode (hardlink/symlink) or content hash was already
+        seen is rendered as a short "same as <path>" reference instead of its full body.
+        snippet is None for oversized files that are only eligible for the outline tier.
+        """
+        seen_ids: dict = {}
+        seen_digests: dict = {}
+        for scanned in files if files is not None else self._iter_eligible():
+            if not scanned.has_text:
+                yield scanned, None, None
+                continue
+            if scanned.digest is not None:
+                self._digests[scanned.rel_path] = scanned.digest
+            if not self.dedupe:
+                yield scanned, self._render_file(scanned), None
+                continue
+
+            if scanned.digest is None:
+                scanned.digest = content_digest(scanned.text)
+                self._digests[scanned.rel_path] = scanned.digest
+            original = seen_ids.get(scanned.file_id) if scanned.file_id else None
+            original = original or seen_digests.get(scanned.digest)
+            if original is None:
+                if scanned.file_id:
+                    seen_ids[scanned.file_id] = scanned.rel_path
+                seen_digests[scanned.digest] = scanned.rel_path
+                yield scanned, self._render_file(scanned), None
+                continue
+
+            reference = self._render_reference(scanned.rel_path, original)
+            self.stats.duplicate_files += 1
+            self.stats.dedup_chars_saved += len(self._render_snippet(scanned.rel_path, scanned.text)) - len(reference)
+            yield scanned, reference, original
+
+    def _render_file(self, scanned: ScannedFile) -> str:
+        """
+        Full-body snippet for a file, after the configured compression passes.
+        """
+        text = scanned.text
+        if self.compression_passes:
+            rel_path = scanned.rel_path.replace(os.sep, "/")
+            target = rel_path in self._target_paths or rel_path in self.stats.diff_changed_files
+            text = compress_text(rel_path, text, self.compression_passes, target, self.stats.compression_chars_saved)
+        return self._render_snippet(scanned.rel_path, text)
+
+    @staticmethod
+    def _render_snippet(rel_path: str, content: str) -> str:
+        return f"### FILE: {rel_path}\n" + content.strip() + "\n\n"
+
+    @staticmethod
+    def _render_reference(rel_path: str, original: str) -> str:
+        return f"### FILE: {rel_path}\n(same as {original})\n\n"
+
+    def _render_outline(self, scanned: ScannedFile) -> Optional[str]:
+        """
+        Second-tier rendering for Python files whose body did not fit: an ast outline with
+        signatures and line numbers. Oversized files are re-read (bounded) just for parsing.
+        """
+        if not scanned.rel_path.endswith(".py"):
+            return None
+        source = scanned.text
+        if source is None and self.git_ref:
+            from git_context import GitBlobReader
+
+            blob = self._git_blobs.get(scanned.rel_path)
+            with GitBlobReader(self.project_root) as reader:
+                raw = reader.read(blob) if blob else None
+            if raw is None or len(raw) > OUTLINE_MAX_BYTES:
+                return None
+            source = raw.decode("utf-8", errors="ignore")
+        elif source is None:
+            try:
+                with open(os.path.join(self.project_root, scanned.rel_path), "rb") as handle:
+                    raw = handle.read(OUTLINE_MAX_BYTES + 1)
+            except OSError:
+                return None
+            if len(raw) > OUTLINE_MAX_BYTES:
+                return None
+            source = raw.decode("utf-8", errors="ignore")
+        outline = build_outline(source)
+        if not outline:
+            return None
+        return f"### OUTLINE: {scanned.rel_path}\n{outline}\n\n"
+
+    def _outlines_exhausted(self, room: int) -> bool:
+        return room < MIN_OUTLINE_CHARS or self._outline_attempts >= MAX_OUTLINE_ATTEMPTS
+
+    def _outline_within(self, scanned: ScannedFile, room: int) -> Optional[str]:
+        """
+        Outline of a file if it fits `room` chars. The file is not read or parsed when the
+        room, the per-scan attempt cap or its size (OUTLINE_MAX_BYTES) rules it out.
+        """
+        if (
+            self._outlines_exhausted(room)
+            or room < len(scanned.rel_path) + MIN_OUTLINE_CHARS
+            or scanned.chars > OUTLINE_MAX_BYTES
+            or not scanned.rel_path.endswith(".py")
+        ):
+            return None
+        self._outline_attempts += 1
+        outline = self._render_outline(scanned)
+        return outline if outline and len(outline) <= room else None
+
+    def _record_outline(self, rel_path: str, outline: str) -> None:
+        self.stats.outlined_files.append(rel_path)
+        self.stats.outline_chars += len(outline)
+
+    def iter_context_chunks(self, max_chars: int = 250_000, query: Optional[str] = None) -> Iterator[str]:
+        """
+        Streaming form of collect_project_context: yields one snippet per file so callers can
+        write context straight into a request body or spool file. In walk mode without a
+        manifest only one file is held in memory at a time (plus a bounded read-ahead window
+        in parallel mode). Stats are complete once the generator is exhausted.
+        """
+        self.stats = ScannerStats(ranking_mode=self.ranking_mode)
+        self._target_paths = mentioned_paths(query or "")
+        self._outline_attempts = 0
+        self._digests = {}
+        excerpts: List[str] = []
+        if self.excerpt_large_files and query and query.strip() and not self.git_ref:
+            if self._snapshot_current():
+                sources = self._snapshot_symbol_sources()
+            else:
+                # One walk serves both the symbol index and the scan below.
+                self._listed_files = self._list_files()
+                sources = self._stat_symbol_sources(self._listed_files)
+            excerpts = self._symbol_excerpts(query, int(max_chars * self.excerpt_budget_ratio), sources)
+        try:
+            yield from self._iter_budgeted(max_chars - sum(len(excerpt) for excerpt in excerpts), query)
+        finally:
+            self._listed_files = None
+        for excerpt in excerpts:
+            self.stats.chars_collected += len(excerpt)
+            yield excerpt
+
+    def _iter_budgeted(self, budget: int, query: Optional[str]) -> Iterator[str]:
+        """
+        Snippets of the configured ranking mode within `budget`.
+        """
+        if self.ranking_mode == "bm25" and query and query.strip():
+            yield from self._iter_ranked(budget, query)
+        elif self.ranking_mode == "imports" and query and query.strip():
+            yield from self._iter_import_closure(budget, query)
+        elif self.ranking_mode == "diff":
+            yield from self._iter_diff(budget)
+        else:
+            eligible = self._prioritized(self._iter_eligible()) if self.priority_dirs or self.history_scores else None
+            yield from self._iter_walk(budget, self._iter_rendered(eligible))
+
+    def _snapshot_current(self) -> bool:
+        """
+        Whether _iter_contents will serve this scan from the in-process snapshot (no walk).
+        """
+        if self.snapshot is None or self.git_ref:
+            return False
+        return self.snapshot.is_current(self._scan_key()) or bool(
+            self.scope and self.snapshot.is_current(self._scan_key(scoped=False))
+        )
+
+    def _snapshot_symbol_sources(self) -> List[Tuple[str, str, int]]:
+        """
+        (posix path, content signature, size) of the snapshot's Python files, for the symbol
+        index, without walking or stat-ing the tree.
+        """
+        sources = []
+        for scanned in self.snapshot.files():
+            if not scanned.rel_path.endswith(".py") or (self.scope and not self.scope.matches(scanned.rel_path)):
+                continue
+            if scanned.digest is None and scanned.has_text:
+                scanned.digest = content_digest(scanned.text)
+            sources.append((scanned.rel_path.replace(os.sep, "/"), f"digest:{scanned.digest}", scanned.chars))
+        return sources
+
+    @staticmethod
+    def _stat_symbol_sources(listed: Iterable[Tuple[str, str, Optional[os.stat_result]]]) -> List[Tuple[str, str, int]]:
+        """
+        (posix path, size:mtime signature, size) of the listed Python files.
+        """
+        sources = []
+        for rel_path, abs_path, stat in listed:
+            if not rel_path.endswith(".py"):
+                continue
+            try:
+                stat = stat or os.stat(abs_path)
+            except OSError:
+                continue
+            sources.append((rel_path.replace(os.sep, "/"), f"{stat.st_size}:{stat.st_mtime_ns}", stat.st_size))
+        return sources
+
+    def _symbol_excerpts(self, query: str, capacity: int, sources: List[Tuple[str, str, int]]) -> List[str]:
+        """
+        Line-numbered excerpts from Python files too large to send whole: the definitions the
+        query references (via the persistent symbol index) first, then their callers in any
+        scanned Python file, packed into `capacity`. For classes only the header up to the
+        first method is excerpted. `sources` are the scan's Python files as
+        (posix path, signature, size).
+        """
+        from symbol_index import SymbolIndex, referenced_identifiers, render_excerpt
+
+        names = referenced_identifiers(query)
+        if not names or capacity <= 0:
+            return []
+        if not any(size > self.max_file_chars for _, _, size in sources):
+            return []
+        index = SymbolIndex(self.project_root, path=self.symbol_index_path)
+        index.update(sources)
+        index.save()
+
+        wanted: List[Tuple[str, int, int, str]] = []
+        callers: List[Tuple[str, int, int, str]] = []
+        for name in sorted(names):
+            for rel_path, symbol in index.lookup(name):
+                if index.chars(rel_path) <= self.max_file_chars:
+                    continue
+                end = symbol.end
+                if symbol.kind == "class":
+                    methods = [s.start for s in index.files[rel_path][2] if s.name.startswith(symbol.name + ".")]
+                    end = min(methods) - 1 if methods else end
+                wanted.append((rel_path, symbol.start, end, symbol.name))
+                callers.extend(
+                    (caller_path, caller.start, caller.end, caller.name) for caller_path, caller in index.callers(symbol)
+                )
+
+        spans: dict = {}
+        used = 0
+        lines_cache: dict = {}
+        for rel_path, start, end, name in wanted + callers:
+            if rel_path not in lines_cache:
+                try:
+                    with open(os.path.join(self.project_root, rel_path), "rb") as handle:
+                        lines_cache[rel_path] = handle.read().decode("utf-8", errors="ignore").splitlines()
+                except OSError:
+                    lines_cache[rel_path] = []
+            lines = lines_cache[rel_path]
+            cost = sum(len(line) + 9 for line in lines[start - 1 : end]) + 4
+            if rel_path not in spans:
+                cost += len(rel_path) + 16
+            if not lines or used + cost > capacity or (start, end) in spans.get(rel_path, []):
+                continue
+            spans.setdefault(rel_path, []).append((start, end))
+            used += cost
+            if name not in self.stats.excerpt_symbols:
+                self.stats.excerpt_symbols.append(name)
+
+        excerpts = []
+        for rel_path in sorted(spans, key=walk_order_key):
+            excerpts.append(render_excerpt(rel_path, lines_cache[rel_path], spans[rel_path]))
+            self.stats.excerpt_files.append(rel_path)
+        self.stats.excerpt_chars = sum(len(excerpt) for excerpt in excerpts)
+        return excerpts
+
+    def _prioritized(self, files: Iterable[ScannedFile]) -> List[ScannedFile]:
+        """
+        Reorders files so the top historically touched files come first (highest score first),
+        then files under priority_dirs (in priority order), keeping walk order within groups.
+        """
+        ranked = sorted(self.history_scores.items(), key=lambda item: (-item[1], walk_order_key(item[0])))
+        boosted = {path: idx for idx, (path, _) in enumerate(ranked[:HISTORY_BOOST_MAX_FILES])}
+        history: List[Tuple[int, ScannedFile]] = []
+        groups: List[List[ScannedFile]] = [[] for _ in range(len(self.priority_dirs) + 1)]
+        for scanned in files:
+            posix = scanned.rel_path.replace(os.sep, "/")
+            if posix in boosted:
+                history.append((boosted[posix], scanned))
+                self.stats.history_boosted_files.append(posix)
+                continue
+            rank = next(
+                (idx for idx, prefix in enumerate(self.priority_dirs) if posix.startswith(prefix + "/")),
+                len(self.priority_dirs),
+            )
+            groups[rank].append(scanned)
+        history.sort(key=lambda item: item[0])
+        return [scanned for _, scanned in history] + [scanned for group in groups for scanned in group]
+
+    def _iter_walk(
+        self,
+        max_chars: int,
+        rendered: Iterable[Tuple[ScannedFile, Optional[str], Optional[str]]],
+    ) -> Iterator[str]:
+        """
+        Fills the budget in walk order; with the outline tier, files that no longer fit (and
+        oversized Python files) are emitted as outlines from the reserved share.
+        """
+        body_budget = max_chars
+        if self.outline_tier:
+            body_budget -= int(max_chars * self.outline_budget_ratio)
+
+        total_chars = 0
+        bodies_open = True
+        for scanned, snippet, original in rendered:
+            if snippet is not None and bodies_open:
+                if total_chars + len(snippet) <= body_budget:
+                    total_chars += len(snippet)
+                    self.stats.files_included += 1
+                    self.stats.chars_collected = total_chars
+                    yield snippet
+                    continue
+
+                self.stats.stopped_due_to_limit = True
+                if not self.outline_tier:
                     # Stop collecting further to respect the limit.
-                    context_parts.append(snippet[: max(0, max_chars - total_chars)])
+                    tail = snippet[: max(0, max_chars - total_chars)]
                     total_chars = max_chars
+                    self.stats.chars_collected = total_chars
+                    if tail:
+                        yield tail
+                    return
+                bodies_open = False
+
+            if original is not None:
+                continue
+            if not bodies_open and self._outlines_exhausted(max_chars - total_chars):
+                return
+            # Outline tier: remaining (or oversized) Python files as signatures only.
+            outline = self._outline_within(scanned, max_chars - total_chars)
+            if outline:
+                total_chars += len(outline)
+                self._record_outline(scanned.rel_path, outline)
+                self.stats.chars_collected = total_chars
+                yield outline
+
+    def write_context(self, handle: IO[str], max_chars: int = 250_000, query: Optional[str] = None) -> int:
+        """
+        Streams context into a text file-like object (e.g. a spool file); returns chars written.
+        """
+        written = 0
+        for chunk in self.iter_context_chunks(max_chars=max_chars, query=query):
+            handle.write(chunk)
+            written += len(chunk)
+        return written
+
+    def collect_project_context(self, max_chars: int = 250_000, query: Optional[str] = None) -> str:
+        """
+        Walks the project tree and returns a concatenated string of file contents
+        limited to `max_chars`. Large files (> max_file_chars) are skipped, as are binary,
+        minified and generated files detected by sniffing their first bytes.
+        Directory exclusions and extension filters are applied to reduce noise.
+        When a manifest is enabled, unchanged files are served from it instead of re-read.
+        With ranking_mode="bm25" and a query (task body / stage instructions), the budget is
+        packed with the most relevant files instead of being filled in walk order;
+        ranking_mode="imports" sends the files the query names plus their import closure, and
+        ranking_mode="diff" sends the git diff since diff_base_ref with the changed files.
+        """
+        return "".join(self.iter_context_chunks(max_chars=max_chars, query=query))
+
+    def collect_context_bundle(self, max_chars: int = 250_000, query: Optional[str] = None) -> ContextBundle:
+        """
+        Same selection as collect_project_context, kept as a ContextBundle: the chunks are not
+        concatenated and each one records its file, tier and content digest.
+        """
+        bundle = ContextBundle()
+        for chunk in self.iter_context_chunks(max_chars=max_chars, query=query):
+            bundle.append(chunk, digests=self._digests)
+        return bundle
+
+    def _iter_ranked(self, max_chars: int, query: str) -> Iterator[str]:
+        """
+        Scores every eligible file with BM25 against `query` and knapsack-packs whole files
+        into the budget; selected files are emitted in walk order to keep prompts stable.
+        Duplicate references are only added when their original made the cut.
+        Ranking needs the whole corpus, so this mode is not memory-bounded.
+        """
+        from context_ranking import rank_and_pack
+
+        paths: List[str] = []
+        bodies: List[str] = []
+        snippets: List[str] = []
+        positions: List[int] = []
+        duplicates: List[Tuple[int, str, str]] = []
+        outline_only: List[Tuple[int, ScannedFile]] = []
+        for position, (scanned, snippet, original) in enumerate(self._iter_rendered()):
+            if snippet is None:
+                outline_only.append((position, scanned))
+                continue
+            if original is not None:
+                duplicates.append((position, original, snippet))
+                continue
+            paths.append(scanned.rel_path)
+            bodies.append(scanned.text)
+            snippets.append(snippet)
+            positions.append(position)
+
+        body_budget = max_chars
+        if self.outline_tier:
+            body_budget -= int(max_chars * self.outline_budget_ratio)
+
+        sizes = [len(snippet) for snippet in snippets]
+        prior = [self.history_scores.get(path.replace(os.sep, "/"), 0.0) for path in paths] if self.history_scores else None
+        selected = rank_and_pack(paths, bodies, sizes, query, body_budget, prior=prior)
+        emitted = [(positions[idx], snippets[idx]) for idx in selected]
+        used = sum(sizes[idx] for idx in selected)
+        selected_paths = {paths[idx] for idx in selected}
+        for position, original, snippet in duplicates:
+            if original in selected_paths and used + len(snippet) <= max_chars:
+                emitted.append((position, snippet))
+                used += len(snippet)
+        self.stats.files_included = len(emitted)
+        self.stats.files_ranked_out = len(paths) + len(duplicates) - len(emitted)
+
+        if self.outline_tier:
+            chosen = set(selected)
+            outline_only.extend(
+                (positions[idx], ScannedFile(paths[idx], len(bodies[idx]), bodies[idx]))
+                for idx in range(len(paths))
+                if idx not in chosen
+            )
+            for position, scanned in sorted(outline_only, key=lambda item: item[0]):
+                if self._outlines_exhausted(max_chars - used):
                     break
+                outline = self._outline_within(scanned, max_chars - used)
+                if outline:
+                    emitted.append((position, outline))
+                    used += len(outline)
+                    self._record_outline(scanned.rel_path, outline)
+        emitted.sort()
+
+        self.stats.stopped_due_to_limit = self.stats.files_ranked_out > 0
+        self.stats.chars_collected = used
+        for _, snippet in emitted:
+            yield snippet
+
+    def _import_graph(self, rendered: List[Tuple[ScannedFile, Optional[str], Optional[str]]]):
+        """
+        Project import graph refreshed from the scanned Python sources (posix paths).
+        """
+        from import_graph import ImportGraph
+
+        graph = ImportGraph(self.project_root, path=self.import_graph_path)
+        sources = []
+        for scanned, _, _ in rendered:
+            if not scanned.has_text or not scanned.rel_path.endswith(".py"):
+                continue
+            if scanned.digest is None:
+                scanned.digest = content_digest(scanned.text)
+            sources.append((scanned.rel_path.replace(os.sep, "/"), scanned.digest, scanned.text))
+        graph.update(sources)
+        graph.save()
+        return graph
 
-                context_parts.append(snippet)
-                total_chars += len(snippet)
+    def _iter_import_closure(self, max_chars: int, query: str) -> Iterator[str]:
+        """
+        Seeds context from files named in `query` (paths or dotted modules) and expands through
+        the project's import graph up to `import_depth`, closest files first. Files outside the
+        closure are left out; without any recognisable seed this falls back to walk order.
+        """
+        from import_graph import find_seed_files
+
+        rendered = list(self._iter_rendered())
+        graph = self._import_graph(rendered)
+        by_path = {item[0].rel_path.replace(os.sep, "/"): item for item in rendered}
+        seeds = find_seed_files(query, list(by_path), graph)
+        if not seeds:
+            yield from self._iter_walk(max_chars, rendered)
+            return
+        self.stats.import_seeds = seeds
+        closure = [(rel_path, depth) for rel_path, depth in graph.closure(seeds, self.import_depth) if rel_path in by_path]
+        self.stats.import_closure_files = len(closure)
+
+        body_budget = max_chars
+        if self.outline_tier:
+            body_budget -= int(max_chars * self.outline_budget_ratio)
+
+        used = 0
+        left_out: List[ScannedFile] = []
+        included: Set[str] = set()
+        for rel_path, _ in closure:
+            scanned, snippet, original = by_path[rel_path]
+            if original is not None and original not in included:
+                # Duplicate of a file outside the emitted set: send its body instead.
+                snippet = self._render_file(scanned)
+            if snippet is not None and used + len(snippet) <= body_budget:
+                used += len(snippet)
+                included.add(rel_path)
                 self.stats.files_included += 1
+                yield snippet
+            else:
+                left_out.append(scanned)
+        if self.outline_tier:
+            for scanned in left_out:
+                if self._outlines_exhausted(max_chars - used):
+                    break
+                outline = self._outline_within(scanned, max_chars - used)
+                if outline:
+                    used += len(outline)
+                    self._record_outline(scanned.rel_path, outline)
+                    yield outline
+        self.stats.files_ranked_out = len(rendered) - self.stats.files_included - len(self.stats.outlined_files)
+        self.stats.stopped_due_to_limit = any(scanned.has_text for scanned in left_out)
+        self.stats.chars_collected = used
 
-            if total_chars >= max_chars:
+    def _iter_diff(self, max_chars: int) -> Iterator[str]:
+        """
+        Incremental context for follow-up work: the `git diff` between diff_base_ref (default
+        HEAD) and the working tree, the changed files in full, then outlines of surrounding
+        modules (import neighbours of the changed files, then same-directory modules).
+        Falls back to walk order outside a git work tree or when the ref does not resolve.
+        """
+        from git_context import changed_files, diff_text, resolve_ref
+
+        base = resolve_ref(self.project_root, self.diff_base_ref or "HEAD")
+        pathspecs = self.scope.pathspecs()
+        changed = changed_files(self.project_root, base, pathspecs) if base else None
+        if changed is None:
+            yield from self._iter_walk(max_chars, self._iter_rendered())
+            return
+        self.stats.diff_base_ref = base
+        self.stats.diff_changed_files = changed
+
+        used = 0
+        diff = (diff_text(self.project_root, base, pathspecs) or "").strip()
+        if diff:
+            header = f"### GIT DIFF: {base[:12]}..working tree\n"
+            room = int(max_chars * self.diff_budget_ratio) - len(header) - 2
+            if len(diff) > room:
+                marker = "\n... (diff truncated)"
+                cut = diff.rfind("\n", 0, max(0, room - len(marker)))
+                diff = (diff[:cut] if cut > 0 else "") + marker
+            if room > 0:
+                block = header + diff + "\n\n"
+                used += len(block)
+                self.stats.diff_chars = len(block)
+                yield block
+
+        rendered = list(self._iter_rendered())
+        by_path = {item[0].rel_path.replace(os.sep, "/"): item for item in rendered}
+        changed_set = set(changed)
+        body_budget = max_chars - int(max_chars * self.outline_budget_ratio)
+        included: Set[str] = set()
+        surrounding: List[str] = []
+        for rel_path, (scanned, snippet, original) in by_path.items():
+            if rel_path not in changed_set:
+                continue
+            if original is not None and original.replace(os.sep, "/") not in included:
+                snippet = self._render_file(scanned)
+            if snippet is not None and used + len(snippet) <= body_budget:
+                used += len(snippet)
+                included.add(rel_path)
+                self.stats.files_included += 1
+                yield snippet
+            else:
+                surrounding.append(rel_path)
+
+        changed_py = [path for path in by_path if path in changed_set and path.endswith(".py")]
+        if changed_py:
+            graph = self._import_graph(rendered)
+            importers = {
+                source for source, targets in graph.edges.items() if any(path in changed_set for path in targets)
+            }
+            imported = [target for path in changed_py for target in graph.edges.get(path, [])]
+            directories = {os.path.dirname(path) for path in changed_py}
+            siblings = [
+                path for path in by_path if path.endswith(".py") and os.path.dirname(path) in directories
+            ]
+            for path in imported + sorted(importers, key=walk_order_key) + siblings:
+                if path in by_path and path not in changed_set and path not in surrounding:
+                    surrounding.append(path)
+        for rel_path in surrounding:
+            if self._outlines_exhausted(max_chars - used):
                 break
+            outline = self._outline_within(by_path[rel_path][0], max_chars - used)
+            if outline:
+                used += len(outline)
+                self._record_outline(by_path[rel_path][0].rel_path, outline)
+                yield outline
+        self.stats.files_ranked_out = len(rendered) - self.stats.files_included - len(self.stats.outlined_files)
+        self.stats.stopped_due_to_limit = len(included) < len(changed_set & set(by_path))
+        self.stats.chars_collected = used
+
+    def scanned_files(self) -> List[ScannedFile]:
+        """
+        Text files plus oversized ones (text None) in walk order, skipping binary, minified and
+        generated files; for consumers that digest the whole project (e.g. summaries).
+        """
+        return [scanned for scanned in self._iter_contents() if scanned.skip_reason in (None, "large")]
 
-        self.stats.chars_collected = total_chars
-        return "".join(context_parts)
+    def git_blobs(self) -> Dict[str, str]:
+        """
+        Relative path -> blob hash of the files at git_ref, as listed by the last scan
+        (empty for working-tree scans).
+        """
+        return dict(self._git_blobs)
 
     def collect_project_files(self, max_chars: int = 250_000) -> str:
         """
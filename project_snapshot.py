@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from project_scanner import ScannedFile, walk_order_key
+from scan_manifest import combine_digests, content_digest
+
+# A snapshot older than this is reloaded on next use, so edits made outside Meta-Agent
+# (which never flow through a ChangeSet) are eventually picked up.
+SNAPSHOT_MAX_AGE_SECONDS = 600
+
+
+class ProjectSnapshot:
+    """
+    In-process view of a project's scanned files, shared by the scanner, change-set building and
+    quality checks. It is filled by the first ProjectScanner that uses it and then kept current
+    from applied ChangeSets rather than being rescanned.
+    """
+
+    def __init__(self, project_root: str, max_age_seconds: float = SNAPSHOT_MAX_AGE_SECONDS):
+        self.project_root = os.path.abspath(project_root)
+        self.max_age_seconds = max_age_seconds
+        self.scan_key: Optional[Tuple] = None
+        self.loaded_at: Optional[float] = None
+        self.max_file_chars = 0
+        self._files: Dict[str, ScannedFile] = {}
+        # New paths are appended; walk order is restored once, on the next ordered read.
+        self._unordered = False
+        self._accepts: Callable[[str], bool] = lambda rel_path: True
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(rel_path: str) -> str:
+        return os.path.normpath(rel_path)
+
+    def is_current(self, scan_key: Tuple) -> bool:
+        """
+        True if the snapshot was loaded with the same scanner settings and has not expired.
+        """
+        with self._lock:
+            if self.loaded_at is None or self.scan_key != scan_key:
+                return False
+            return time.monotonic() - self.loaded_at <= self.max_age_seconds
+
+    def load(
+        self,
+        scan_key: Tuple,
+        files: Iterable[ScannedFile],
+        max_file_chars: int,
+        accepts: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        """
+        Replaces the snapshot contents with a fresh scan (in walk order).
+        """
+        with self._lock:
+            self._files = {self._key(scanned.rel_path): scanned for scanned in files}
+            self._unordered = False
+            self.scan_key = scan_key
+            self.max_file_chars = max_file_chars
+            self._accepts = accepts or (lambda rel_path: True)
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.loaded_at = None
+
+    def touch(self) -> None:
+        """
+        Marks a loaded snapshot as verified-current (used by watchers after applying events).
+        """
+        with self._lock:
+            if self.loaded_at is not None:
+                self.loaded_at = time.monotonic()
+
+    def _ordered(self) -> Dict[str, ScannedFile]:
+        if self._unordered:
+            self._files = dict(sorted(self._files.items(), key=lambda item: walk_order_key(item[0])))
+            self._unordered = False
+        return self._files
+
+    def files(self) -> List[ScannedFile]:
+        with self._lock:
+            return list(self._ordered().values())
+
+    def get(self, rel_path: str) -> Optional[ScannedFile]:
+        with self._lock:
+            return self._files.get(self._key(rel_path))
+
+    def read_text(self, rel_path: str) -> Optional[str]:
+        """
+        Returns cached text for a file, or None if the snapshot has no text for it
+        (not scanned, or skipped as large/binary) and the caller should read from disk.
+        """
+        scanned = self.get(rel_path)
+        return scanned.text if scanned is not None else None
+
+    def snapshot_hash(self) -> str:
+        with self._lock:
+            files = self._ordered()
+            for scanned in files.values():
+                if scanned.digest is None and scanned.text is not None:
+                    scanned.digest = content_digest(scanned.text)
+            return combine_digests(
+                (rel_path, scanned.digest) for rel_path, scanned in files.items() if scanned.digest
+            )
+
+    def update_file(self, rel_path: str, text: Optional[str]) -> None:
+        """
+        Records new content for a file (None = deleted), keeping walk order.
+        Files outside the scanner's filters are ignored.
+        """
+        key = self._key(rel_path)
+        with self._lock:
+            if text is None:
+                self._files.pop(key, None)
+                return
+            if not self._accepts(key):
+                return
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            if len(text) > self.max_file_chars:
+                scanned = ScannedFile(key, len(text), skip_reason="large", digest=content_digest(text))
+            else:
+                scanned = ScannedFile(key, len(text), text=text)
+            existing = self._files.get(key)
+            if existing is not None:
+                scanned.file_id = existing.file_id
+            self.put(scanned)
+
+    def put(self, scanned: ScannedFile) -> None:
+        """
+        Inserts or replaces a scanned file; a new path is put in walk order on the next
+        files()/snapshot_hash(), so a burst of inserts sorts once.
+        """
+        key = self._key(scanned.rel_path)
+        with self._lock:
+            self._unordered = self._unordered or key not in self._files
+            self._files[key] = scanned
+
+    def remove(self, rel_path: str) -> None:
+        with self._lock:
+            self._files.pop(self._key(rel_path), None)
+
+    def apply_change_set(self, change_set) -> None:
+        """
+        Updates the snapshot in place from a ChangeSet that has been written to disk.
+        """
+        if os.path.abspath(change_set.project_root) != self.project_root:
+            return
+        for rel_path, change in change_set.changes.items():
+            self.update_file(rel_path, change.new_content)
+
+    def refresh_files(self, rel_paths: Iterable[str]) -> None:
+        """
+        Re-reads specific files from disk (e.g. after a legacy FileManager write).
+        """
+        for rel_path in rel_paths:
+            abs_path = os.path.join(self.project_root, rel_path)
+            try:
+                with open(abs_path, "r", encoding="utf-8", errors="ignore") as handle:
+                    text = handle.read()
+            except OSError:
+                text = None
+            self.update_file(rel_path, text)
+
+
+_SNAPSHOTS: Dict[str, ProjectSnapshot] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def get_project_snapshot(project_root: str) -> ProjectSnapshot:
+    """
+    Returns the process-wide snapshot for a project root, creating it on first use.
+    """
+    root = os.path.abspath(project_root)
+    with _SNAPSHOTS_LOCK:
+        snapshot = _SNAPSHOTS.get(root)
+        if snapshot is None:
+            snapshot = ProjectSnapshot(root)
+            _SNAPSHOTS[root] = snapshot
+        return snapshot
@@ -0,0 +1,290 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from gitignore_matcher import GitIgnoreMatcher
+from paths import CACHE_DIR
+from project_scanner import ProjectScanner
+from project_snapshot import ProjectSnapshot, get_project_snapshot
+from projects_config import ProjectInfo, ProjectRegistry
+
+try:  # optional: native backends (inotify / FSEvents / ReadDirectoryChangesW)
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - depends on environment
+    Observer = None
+
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+DEFAULT_MAX_DELAY_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL_SECONDS = 2.0
+# Bursts touching more files than this (e.g. `git checkout`) trigger one full rescan.
+FULL_RESCAN_THRESHOLD = 200
+# Content changes; opened/closed events (including the watcher's own reads) are ignored.
+WATCHED_EVENT_TYPES = {"created", "modified", "deleted", "moved"}
+
+
+class _EventCollector:
+    """
+    watchdog event handler that only records which paths changed; all work happens on the
+    watcher thread after the burst settles.
+    """
+
+    def __init__(self, watcher: "ProjectWatcher"):
+        self.watcher = watcher
+
+    def dispatch(self, event) -> None:
+        event_type = getattr(event, "event_type", None)
+        is_dir = bool(getattr(event, "is_directory", False))
+        # A directory "modified" event fires for every save inside it; the file event covers it.
+        if event_type not in WATCHED_EVENT_TYPES or (is_dir and event_type == "modified"):
+            return
+        paths = [getattr(event, "src_path", None), getattr(event, "dest_path", None)]
+        for path in paths:
+            if path:
+                self.watcher.notify(os.fsdecode(path), is_dir=is_dir)
+
+
+class ProjectWatcher:
+    """
+    Keeps a project's shared ProjectSnapshot (and scan manifest) warm while files change,
+    so run_task can take a ready snapshot instead of scanning on the critical path.
+
+    Uses watchdog's native observer when installed and falls back to stat polling.
+    Events are coalesced: the snapshot is refreshed once a burst has been quiet for
+    `debounce_seconds` (or after `max_delay_seconds` of continuous activity).
+    """
+
+    def __init__(
+        self,
+        project_root: str,
+        scanner_options: Optional[Dict[str, Any]] = None,
+        snapshot: Optional[ProjectSnapshot] = None,
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+        max_delay_seconds: float = DEFAULT_MAX_DELAY_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        use_native: bool = True,
+    ):
+        self.project_root = os.path.abspath(project_root)
+        self.snapshot = snapshot or get_project_snapshot(self.project_root)
+        self.scanner_options = dict(scanner_options or {})
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.poll_interval = poll_interval
+        self.use_native = use_native and Observer is not None
+        self.refresh_count = 0
+        self.full_rescans = 0
+        self.last_error: Optional[str] = None
+
+        self._pending: Set[str] = set()
+        self._pending_full = False
+        self._first_event_at: Optional[float] = None
+        self._last_event_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._saved_max_age: Optional[float] = None
+        self._signature: Dict[str, Tuple[int, int]] = {}
+        # Event filtering (observer thread): the scanner's include/exclude rules and ignore files.
+        self._filter = self._scanner()
+        self._matcher: Optional[GitIgnoreMatcher] = None
+        self._cache_dir = os.path.normcase(os.path.abspath(CACHE_DIR))
+
+    @property
+    def mode(self) -> str:
+        return "native" if self.use_native else "polling"
+
+    def _scanner(self) -> ProjectScanner:
+        return ProjectScanner(self.project_root, snapshot=self.snapshot, **self.scanner_options)
+
+    def start(self) -> "ProjectWatcher":
+        """
+        Warms the snapshot synchronously, then starts watching in the background.
+        """
+        if self._thread is not None:
+            return self
+        self._saved_max_age = self.snapshot.max_age_seconds
+        # The watcher keeps it current, so the snapshot no longer needs to expire.
+        self.snapshot.max_age_seconds = float("inf")
+        self._scanner().warm_snapshot()
+
+        if self.use_native:
+            self._observer = Observer()
+            self._observer.schedule(_EventCollector(self), self.project_root, recursive=True)
+            self._observer.start()
+            target = self._run_events
+        else:
+            # Baseline taken before returning so edits made right after start() are seen.
+            self._signature = self._stat_signature()
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, name=f"watch:{self.project_root}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._saved_max_age is not None:
+            self.snapshot.max_age_seconds = self._saved_max_age
+            self._saved_max_age = None
+
+    def _ignored(self, rel_path: str, is_dir: bool) -> bool:
+        if self._filter.ignore_mode == "none":
+            return False
+        if self._matcher is None:
+            self._matcher = GitIgnoreMatcher(self.project_root)
+        parent = rel_path.rsplit("/", 1)[0] if "/" in rel_path else ""
+        self._matcher.load_dir(parent)
+        return self._matcher.is_ignored(rel_path, is_dir=is_dir)
+
+    def _relevant(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Whether a change can affect the snapshot: paths the scanner would not walk into or
+        include (excluded/ignored directories, other extensions, out of scope) are dropped.
+        """
+        parts = rel_path.split("/")
+        dirs = parts if is_dir else parts[:-1]
+        for depth in range(1, len(dirs) + 1):
+            rel_dir = "/".join(dirs[:depth])
+            if self._filter._should_exclude_dir(dirs[depth - 1], rel_dir) or self._ignored(rel_dir, is_dir=True):
+                return False
+        return is_dir or (self._filter._should_include_file(parts[-1], rel_path) and not self._ignored(rel_path, False))
+
+    def notify(self, abs_path: str, is_dir: bool = False) -> None:
+        """
+        Records a changed path (called from observer threads).
+        """
+        abs_path = os.path.abspath(abs_path)
+        if os.path.normcase(abs_path).startswith(self._cache_dir + os.sep):
+            return  # manifest, snapshot and index writes of the scans themselves
+        rel_path = os.path.relpath(abs_path, self.project_root)
+        if rel_path == "." or rel_path.startswith(".."):
+            return
+        rel_path = rel_path.replace(os.sep, "/")
+        if rel_path.split("/")[0] == ".git":
+            return
+        if os.path.basename(rel_path) == ".gitignore":
+            # Ignore rules changed: reload them and rescan.
+            self._matcher = None
+            is_dir = True
+        elif not self._relevant(rel_path, is_dir):
+            return
+        rel_path = rel_path.replace("/", os.sep)
+        now = time.monotonic()
+        with self._cond:
+            if is_dir:
+                # Directory created/moved/removed: contents are unknown, rescan.
+                self._pending_full = True
+            else:
+                self._pending.add(rel_path)
+            if self._first_event_at is None:
+                self._first_event_at = now
+            self._last_event_at = now
+            self._cond.notify_all()
+
+    def _take_settled_batch(self) -> Optional[Tuple[Set[str], bool]]:
+        with self._cond:
+            while not self._stop.is_set():
+                if self._last_event_at is None:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                quiet_for = now - self._last_event_at
+                busy_for = now - (self._first_event_at or now)
+                if quiet_for >= self.debounce_seconds or busy_for >= self.max_delay_seconds:
+                    batch, full = self._pending, self._pending_full
+                    self._pending, self._pending_full = set(), False
+                    self._first_event_at = self._last_event_at = None
+                    return batch, full
+                self._cond.wait(self.debounce_seconds - quiet_for)
+        return None
+
+    def _apply(self, changed: Set[str], full: bool) -> None:
+        try:
+            scanner = self._scanner()
+            if full or len(changed) > FULL_RESCAN_THRESHOLD:
+                scanner.warm_snapshot()
+                self.full_rescans += 1
+            elif changed:
+                scanner.refresh_snapshot_files(sorted(changed))
+            self.refresh_count += 1
+            self.last_error = None
+        except Exception as exc:
+            # Fall back to a normal scan on next use rather than serving a half-updated snapshot.
+            self.snapshot.invalidate()
+            self.last_error = str(exc)
+
+    def _run_events(self) -> None:
+        while not self._stop.is_set():
+            batch = self._take_settled_batch()
+            if batch is None:
+                return
+            self._apply(*batch)
+
+    def _stat_signature(self) -> Dict[str, Tuple[int, int]]:
+        signature: Dict[str, Tuple[int, int]] = {}
+        for rel_path, abs_path, stat in self._scanner()._iter_files():
+            try:
+                stat = stat or os.stat(abs_path)
+            except OSError:
+                continue
+            signature[rel_path] = (stat.st_size, stat.st_mtime_ns)
+        return signature
+
+    def _run_polling(self) -> None:
+        previous = self._signature
+        while not self._stop.wait(self.poll_interval):
+            current = self._stat_signature()
+            if current == previous:
+                continue
+            # Coalesce: keep polling until the tree stops changing (or max delay passes).
+            burst_started = time.monotonic()
+            while not self._stop.wait(self.debounce_seconds):
+                settled = self._stat_signature()
+                if settled == current or time.monotonic() - burst_started >= self.max_delay_seconds:
+                    current = settled
+                    break
+                current = settled
+            changed = {
+                rel_path
+                for rel_path in set(previous) | set(current)
+                if previous.get(rel_path) != current.get(rel_path)
+            }
+            self._apply(changed, full=False)
+            previous = self._signature = current
+
+
+def start_project_watchers(
+    registry: ProjectRegistry,
+    options_for: Optional[Callable[[ProjectInfo], Dict[str, Any]]] = None,
+    **watcher_kwargs: Any,
+) -> Dict[str, ProjectWatcher]:
+    """
+    Starts one watcher per registered project whose root exists; returns them by project id.
+    options_for(project) gives the ProjectScanner kwargs (including the project's scan profile)
+    so each watcher warms the same snapshot its task runs will use.
+    """
+    watchers: Dict[str, ProjectWatcher] = {}
+    if Observer is None and registry.projects:
+        interval = watcher_kwargs.get("poll_interval", DEFAULT_POLL_INTERVAL_SECONDS)
+        print(
+            f"[WARN] watchdog is not installed: watchers fall back to polling, a full stat walk of "
+            f"each project every {interval}s (config watch_poll_interval). Install watchdog for native events."
+        )
+    for project_id, info in registry.projects.items():
+        root = str(info.root_path)
+        if not os.path.isdir(root):
+            print(f"[WARN] Not watching project {project_id}: path does not exist ({root}).")
+            continue
+        options = options_for(info) if options_for is not None else None
+        watchers[project_id] = ProjectWatcher(root, scanner_options=options, **watcher_kwargs).start()
+        print(f"[INFO] Watching project {project_id} at {root} ({watchers[project_id].mode}).")
+    return watchers
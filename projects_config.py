@@ -1,20 +1,66 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
 from paths import BASE_DIR
+from project_scanner import DEFAULT_EXCLUDE_DIRS, IGNORE_MODES, RANKING_MODES
 
 DEFAULT_PROJECTS_PATH = os.path.join(BASE_DIR, "config", "projects.yaml")
 
+# Parsed registries keyed by config path, reused while the file's (mtime, size) is unchanged.
+_REGISTRY_CACHE: Dict[str, Tuple[Tuple[int, int], "ProjectRegistry"]] = {}
+
+
+@dataclass
+class ScanProfile:
+    """
+    Per-project scanner settings from the `scan:` block in projects.yaml (merged over the
+    top-level `scan_defaults:`). Unset fields keep the scanner / config.json defaults.
+    include_exts replaces the default extension list; exclude_dirs are added to the defaults.
+    """
+
+    include_exts: Optional[List[str]] = None
+    exclude_dirs: List[str] = field(default_factory=list)
+    include_globs: List[str] = field(default_factory=list)
+    exclude_globs: List[str] = field(default_factory=list)
+    max_file_chars: Optional[int] = None
+    context_chars: Optional[int] = None
+    ranking_mode: Optional[str] = None
+    ignore_mode: Optional[str] = None
+    priority_dirs: List[str] = field(default_factory=list)
+
+    def scanner_kwargs(self) -> Dict[str, Any]:
+        """
+        ProjectScanner keyword arguments for the fields this profile sets (max_file_chars and
+        context_chars are budget caps and are applied by the caller).
+        """
+        kwargs: Dict[str, Any] = {}
+        if self.include_exts is not None:
+            kwargs["include_exts"] = list(self.include_exts)
+        if self.exclude_dirs:
+            kwargs["exclude_dirs"] = sorted(DEFAULT_EXCLUDE_DIRS | set(self.exclude_dirs))
+        if self.include_globs:
+            kwargs["include_globs"] = list(self.include_globs)
+        if self.exclude_globs:
+            kwargs["exclude_globs"] = list(self.exclude_globs)
+        if self.ranking_mode:
+            kwargs["ranking_mode"] = self.ranking_mode
+        if self.ignore_mode:
+            kwargs["ignore_mode"] = self.ignore_mode
+        if self.priority_dirs:
+            kwargs["priority_dirs"] = list(self.priority_dirs)
+        return kwargs
+
 
 @dataclass
 class ProjectInfo:
     project_id: str
     root_path: Path  # absolute path
     description: str = ""
+    scan_profile: ScanProfile = field(default_factory=ScanProfile)
 
 
 @dataclass
@@ -27,6 +73,22 @@ class ProjectRegistry:
             return self.projects.get(self.default_project_id)
         return self.projects.get(project_id)
 
+    def find_by_path(self, path: str) -> Optional[ProjectInfo]:
+        target = os.path.normcase(os.path.abspath(str(path)))
+        for info in self.projects.values():
+            if os.path.normcase(os.path.abspath(str(info.root_path))) == target:
+                return info
+        return None
+
+    def scan_profile(self, project_id: Optional[str] = None, path: Optional[str] = None) -> ScanProfile:
+        """
+        Profile of the project with this id, else of the project rooted at `path`, else empty.
+        """
+        info = self.projects.get(project_id) if project_id else None
+        if info is None and path:
+            info = self.find_by_path(path)
+        return info.scan_profile if info else ScanProfile()
+
 
 def _ensure_default_config(path: str = DEFAULT_PROJECTS_PATH) -> None:
     """
@@ -72,12 +134,83 @@ def _normalize_legacy(raw: dict) -> dict:
     return {"default": raw.get("default", "ai_scalper_bot"), "projects": projects_block}
 
 
+def _str_list(value: Any, key: str, project_id: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    if not isinstance(value, list):
+        raise RuntimeError(f"Invalid scan profile for project {project_id}: '{key}' must be a list")
+    return [str(item) for item in value]
+
+
+def _positive_int(value: Any, key: str, project_id: str) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 0
+    if number <= 0:
+        raise RuntimeError(f"Invalid scan profile for project {project_id}: '{key}' must be a positive integer")
+    return number
+
+
+def _parse_scan_profile(raw: Any, project_id: str) -> ScanProfile:
+    """
+    Validates a merged `scan:` block; unknown keys are rejected to catch typos early.
+    """
+    if not raw:
+        return ScanProfile()
+    if not isinstance(raw, dict):
+        raise RuntimeError(f"Invalid scan profile for project {project_id}: expected a mapping")
+    known = set(ScanProfile.__dataclass_fields__)
+    unknown = set(raw) - known
+    if unknown:
+        raise RuntimeError(f"Invalid scan profile for project {project_id}: unknown keys {', '.join(sorted(unknown))}")
+
+    ranking_mode = raw.get("ranking_mode")
+    if ranking_mode is not None and ranking_mode not in RANKING_MODES:
+        raise RuntimeError(
+            f"Invalid scan profile for project {project_id}: ranking_mode must be one of {', '.join(sorted(RANKING_MODES))}"
+        )
+    ignore_mode = raw.get("ignore_mode")
+    if ignore_mode is not None and ignore_mode not in IGNORE_MODES:
+        raise RuntimeError(
+            f"Invalid scan profile for project {project_id}: ignore_mode must be one of {', '.join(sorted(IGNORE_MODES))}"
+        )
+    include_exts = raw.get("include_exts")
+    return ScanProfile(
+        include_exts=[ext if ext.startswith(".") else f".{ext}" for ext in _str_list(include_exts, "include_exts", project_id)]
+        if include_exts is not None
+        else None,
+        exclude_dirs=_str_list(raw.get("exclude_dirs"), "exclude_dirs", project_id),
+        include_globs=_str_list(raw.get("include_globs"), "include_globs", project_id),
+        exclude_globs=_str_list(raw.get("exclude_globs"), "exclude_globs", project_id),
+        max_file_chars=_positive_int(raw.get("max_file_chars"), "max_file_chars", project_id),
+        context_chars=_positive_int(raw.get("context_chars"), "context_chars", project_id),
+        ranking_mode=ranking_mode,
+        ignore_mode=ignore_mode,
+        priority_dirs=_str_list(raw.get("priority_dirs"), "priority_dirs", project_id),
+    )
+
+
 def load_project_registry(config_path: str = DEFAULT_PROJECTS_PATH) -> ProjectRegistry:
     """
-    Reads config/projects.yaml, resolves paths, and returns a registry.
+    Reads config/projects.yaml, resolves paths and scan profiles, and returns a registry.
     If the file is missing, a default config is created automatically.
+    The parsed registry is cached until the file changes.
     """
     _ensure_default_config(config_path)
+    cache_key = os.path.abspath(config_path)
+    try:
+        stat = os.stat(config_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+    cached = _REGISTRY_CACHE.get(cache_key)
+    if cached is not None and signature is not None and cached[0] == signature:
+        return cached[1]
 
     try:
         with open(config_path, "r", encoding="utf-8") as handle:
@@ -90,6 +223,9 @@ def load_project_registry(config_path: str = DEFAULT_PROJECTS_PATH) -> ProjectRe
     normalized = _normalize_legacy(raw)
     default_project_id = normalized.get("default") or "ai_scalper_bot"
     projects_map = normalized.get("projects") or {}
+    scan_defaults = normalized.get("scan_defaults") or {}
+    if not isinstance(scan_defaults, dict):
+        raise RuntimeError("Invalid scan_defaults in config/projects.yaml: expected a mapping")
     projects: Dict[str, ProjectInfo] = {}
 
     for pid, info in projects_map.items():
@@ -98,6 +234,9 @@ def load_project_registry(config_path: str = DEFAULT_PROJECTS_PATH) -> ProjectRe
         rel_path = info.get("path")
         if not rel_path:
             continue
+        scan = info.get("scan") or {}
+        if not isinstance(scan, dict):
+            raise RuntimeError(f"Invalid scan profile for project {pid}: expected a mapping")
         root_path = Path(rel_path)
         if not root_path.is_absolute():
             root_path = Path(BASE_DIR) / rel_path
@@ -105,6 +244,7 @@ def load_project_registry(config_path: str = DEFAULT_PROJECTS_PATH) -> ProjectRe
             project_id=pid,
             root_path=root_path.resolve(),
             description=str(info.get("description") or ""),
+            scan_profile=_parse_scan_profile({**scan_defaults, **scan}, pid),
         )
 
     if default_project_id not in projects and projects:
@@ -113,7 +253,10 @@ def load_project_registry(config_path: str = DEFAULT_PROJECTS_PATH) -> ProjectRe
     if not projects:
         raise RuntimeError("No projects defined in config/projects.yaml")
 
-    return ProjectRegistry(default_project_id=default_project_id, projects=projects)
+    registry = ProjectRegistry(default_project_id=default_project_id, projects=projects)
+    if signature is not None:
+        _REGISTRY_CACHE[cache_key] = (signature, registry)
+    return registry
 
 
 def resolve_project_root(project_id: Optional[str], registry: ProjectRegistry) -> ProjectInfo:
@@ -0,0 +1,203 @@
+import json
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from paths import CACHE_DIR
+
+CALIBRATION_PATH = os.path.join(CACHE_DIR, "token_calibration.json")
+
+# Context windows (tokens) for models we route to; unknown models fall back to the default.
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-4.1": 1_047_576,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+    "gpt-4-turbo": 128_000,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+# Soft cap on prompt size regardless of model window (cost control); ~250k chars of context.
+DEFAULT_MAX_PROMPT_TOKENS = 72_000
+DEFAULT_OUTPUT_RESERVE = 4096
+DEFAULT_CHARS_PER_TOKEN = 4.0
+# Per-message overhead of the chat format (role markers, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+MIN_CALIBRATION_TOKENS = 2_000
+
+FILE_BLOCK_PATTERN = re.compile(r"^### FILE: ", re.M)
+
+
+class PromptBudgetError(Exception):
+    """Raised when the fixed prompt sections alone do not fit into the model window."""
+
+
+class TokenCalibration:
+    """
+    Per-model chars-per-token ratios learned from recorded API usage.
+    Persisted as {model: {"chars": int, "tokens": int, "samples": int}}.
+    """
+
+    def __init__(self, path: str = CALIBRATION_PATH):
+        self.path = path
+        self.data: Dict[str, Dict[str, int]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as handle:
+                    self.data = json.load(handle) or {}
+            except (json.JSONDecodeError, OSError):
+                self.data = {}
+
+    def chars_per_token(self, model: str) -> float:
+        entry = self.data.get(model) or {}
+        tokens = int(entry.get("tokens", 0))
+        if tokens < MIN_CALIBRATION_TOKENS:
+            return DEFAULT_CHARS_PER_TOKEN
+        return max(1.0, int(entry.get("chars", 0)) / tokens)
+
+    def record(self, model: str, prompt_chars: int, prompt_tokens: int) -> None:
+        """
+        Adds an observed (chars, tokens) sample for a model and persists the table.
+        """
+        if prompt_chars <= 0 or prompt_tokens <= 0:
+            return
+        entry = self.data.setdefault(model, {"chars": 0, "tokens": 0, "samples": 0})
+        entry["chars"] += prompt_chars
+        entry["tokens"] += prompt_tokens
+        entry["samples"] += 1
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.data, handle, ensure_ascii=True, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass
+class PromptBudget:
+    """
+    Token allocation of one model window across PromptBuilder sections.
+    """
+
+    model: str
+    window_tokens: int
+    chars_per_token: float
+    header_tokens: int
+    metadata_tokens: int
+    instructions_tokens: int
+    context_tokens: int
+    output_reserve_tokens: int
+
+    @property
+    def prompt_tokens(self) -> int:
+        return self.window_tokens - self.output_reserve_tokens
+
+    @property
+    def context_chars(self) -> int:
+        return int(self.context_tokens * self.chars_per_token)
+
+    @property
+    def max_file_chars(self) -> int:
+        """
+        A single file larger than the whole context allotment can never be included.
+        """
+        return self.context_chars
+
+
+class PromptBudgetAllocator:
+    """
+    Estimates tokens offline and splits a model's window into prompt sections.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_prompt_tokens: Optional[int] = DEFAULT_MAX_PROMPT_TOKENS,
+        output_reserve: int = DEFAULT_OUTPUT_RESERVE,
+        calibration: Optional[TokenCalibration] = None,
+        system_prompt: str = "",
+        chunk_chars: Optional[int] = None,
+    ):
+        """
+        system_prompt and chunk_chars describe how the client sends a prompt (one system
+        message, then one user message per chunk_chars slice) so allocate() can reserve
+        what the client will charge on top of the builder's sections.
+        """
+        self.model = model
+        window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+        if max_prompt_tokens:
+            window = min(window, max_prompt_tokens + output_reserve)
+        self.window_tokens = window
+        self.output_reserve = output_reserve
+        self.calibration = calibration or TokenCalibration()
+        self.system_prompt = system_prompt
+        self.chunk_chars = chunk_chars
+
+    def chars_per_token(self) -> float:
+        return self.calibration.chars_per_token(self.model)
+
+    def estimate_tokens(self, text: str) -> int:
+        """
+        Offline estimate: calibrated chars/token ratio plus chat message overhead.
+        Rounds up so estimates err on the side of rejecting.
+        """
+        if not text:
+            return 0
+        return int(len(text) / self.chars_per_token()) + 1 + MESSAGE_OVERHEAD_TOKENS
+
+    def estimate_chat_tokens(self, prompt: str) -> int:
+        """
+        Estimate for a prompt as the client sends it: the system message plus one message
+        per chunk_chars slice, each with its own overhead.
+        """
+        step = self.chunk_chars or len(prompt) or 1
+        tokens = self.estimate_tokens(self.system_prompt)
+        for start in range(0, len(prompt), step):
+            tokens += self.estimate_tokens(prompt[start:start + step])
+        return tokens
+
+    def allocate(self, header: str, metadata: str, instructions: str, guidance: str = "") -> PromptBudget:
+        """
+        Reserves output tokens, charges the fixed sections, and gives the remainder to context.
+        Raises PromptBudgetError if the fixed sections alone overflow the window.
+        """
+        header_tokens = self.estimate_tokens(header) + self.estimate_tokens(guidance)
+        metadata_tokens = self.estimate_tokens(metadata)
+        instructions_tokens = self.estimate_tokens(instructions)
+        available = self.window_tokens - self.output_reserve - self.estimate_tokens(self.system_prompt)
+        fixed = header_tokens + metadata_tokens + instructions_tokens
+        if fixed > available:
+            raise PromptBudgetError(
+                f"Prompt sections need ~{fixed} tokens but only {available} are available for model {self.model}."
+            )
+        context_tokens = available - fixed
+        if self.chunk_chars:
+            # A prompt filling the window is split into this many messages by the client.
+            chunks = math.ceil(available * self.chars_per_token() / self.chunk_chars)
+            context_tokens = max(0, context_tokens - chunks * (MESSAGE_OVERHEAD_TOKENS + 1))
+        return PromptBudget(
+            model=self.model,
+            window_tokens=self.window_tokens,
+            chars_per_token=self.chars_per_token(),
+            header_tokens=header_tokens,
+            metadata_tokens=metadata_tokens,
+            instructions_tokens=instructions_tokens,
+            context_tokens=context_tokens,
+            output_reserve_tokens=self.output_reserve,
+        )
+
+
+def compact_context(context: str, max_chars: int) -> str:
+    """
+    Trims context to at most `max_chars`, cutting at a `### FILE:` boundary so no file is
+    sent half-truncated. Returns an empty string if not even the first file fits.
+    """
+    if len(context) <= max_chars:
+        return context
+    cut = 0
+    for match in FILE_BLOCK_PATTERN.finditer(context):
+        if match.start() > max_chars:
+            break
+        cut = match.start()
+    return context[:cut]
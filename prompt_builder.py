@@ -1,3 +1,9 @@
+from typing import Optional, Union
+
+from context_bundle import ContextBundle
+from prompt_budget import PromptBudget, PromptBudgetAllocator, PromptBudgetError, compact_context
+
+
 class PromptBuilder:
     HEADER = (
         "You are Codex running inside Meta-Agent. "
@@ -7,23 +13,92 @@ class PromptBuilder:
         "<file content>\n"
         "Only include files that should be written.\n"
     )
+    OUTPUT_GUIDANCE = (
+        "# Output Guidance\n"
+        "Use the ===FILE: path=== blocks for any files to create or update. "
+        "Avoid extra commentary outside those blocks unless specifically requested."
+    )
+    # Section titles and separators build_prompt adds around the overview and context.
+    CONTEXT_FRAME = "\n\n# Project Overview\n\n\n# Project Context\n\n\n"
+
+    @staticmethod
+    def _metadata_section(metadata: dict | None) -> str:
+        if not metadata:
+            return ""
+        meta_lines = "\n".join(f"{key}: {value}" for key, value in metadata.items())
+        return "# Task Metadata\n" + meta_lines
+
+    @staticmethod
+    def _instructions_section(stage_instructions: str) -> str:
+        return "# Task Instructions\n" + stage_instructions.strip()
 
-    def build_prompt(self, stage_instructions: str, project_context: str = "", metadata: dict | None = None) -> str:
+    def plan_budget(
+        self,
+        allocator: PromptBudgetAllocator,
+        stage_instructions: str,
+        metadata: dict | None = None,
+    ) -> PromptBudget:
+        """
+        Splits the model window across the sections this builder emits.
+        The resulting budget's context_chars is what the scanner should collect.
+        """
+        return allocator.allocate(
+            self.HEADER,
+            self._metadata_section(metadata),
+            self._instructions_section(stage_instructions),
+            self.OUTPUT_GUIDANCE + self.CONTEXT_FRAME,
+        )
+
+    def build_prompt(
+        self,
+        stage_instructions: str,
+        project_context: Union[str, ContextBundle] = "",
+        metadata: dict | None = None,
+        budget: Optional[PromptBudget] = None,
+        project_overview: str = "",
+    ) -> str:
+        """
+        Assembles the prompt. A project overview (cached summaries) is placed before the raw
+        context and shares the context allotment with it.
+        A ContextBundle is budgeted by dropping whole trailing entries (in place, so the caller
+        can report what was sent) and its chunks are joined straight into the prompt.
+        """
         sections = [self.HEADER]
 
-        if metadata:
-            meta_lines = "\n".join(f"{key}: {value}" for key, value in metadata.items())
-            sections.append("# Task Metadata\n" + meta_lines)
+        metadata_section = self._metadata_section(metadata)
+        if metadata_section:
+            sections.append(metadata_section)
+
+        sections.append(self._instructions_section(stage_instructions))
 
-        sections.append("# Task Instructions\n" + stage_instructions.strip())
+        if budget is not None:
+            fixed_chars = sum(len(section) for section in sections) + len(self.OUTPUT_GUIDANCE)
+            if fixed_chars / budget.chars_per_token > budget.prompt_tokens:
+                raise PromptBudgetError(
+                    f"Prompt without context exceeds the {budget.prompt_tokens}-token budget for {budget.model}."
+                )
+            project_overview = project_overview.strip()[: budget.context_chars]
+            if isinstance(project_context, ContextBundle):
+                project_context.truncate(budget.context_chars - len(project_overview))
+            else:
+                project_context = compact_context(project_context.strip(), budget.context_chars - len(project_overview))
+
+        if project_overview.strip():
+            sections.append("# Project Overview\n" + project_overview.strip())
+
+        if isinstance(project_context, ContextBundle):
+            if not project_context:
+                return "\n\n".join(sections + [self.OUTPUT_GUIDANCE]) + "\n"
+            # Same layout as the str path; scanner chunks start with a header line, so only the
+            # last chunk's trailing whitespace needs stripping.
+            chunks = project_context.chunks
+            parts = ["\n\n".join(sections), "\n\n# Project Context\n", *chunks[:-1], chunks[-1].rstrip()]
+            parts += ["\n\n", self.OUTPUT_GUIDANCE, "\n"]
+            return "".join(parts)
 
         if project_context:
             sections.append("# Project Context\n" + project_context.strip())
 
-        sections.append(
-            "# Output Guidance\n"
-            "Use the ===FILE: path=== blocks for any files to create or update. "
-            "Avoid extra commentary outside those blocks unless specifically requested."
-        )
+        sections.append(self.OUTPUT_GUIDANCE)
 
         return "\n\n".join(sections) + "\n"
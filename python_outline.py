@@ -0,0 +1,69 @@
+import ast
+from typing import List, Optional
+
+DOCSTRING_PREVIEW_CHARS = 300
+
+
+def _signature(node: ast.AST) -> str:
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _class_header(node: ast.ClassDef) -> str:
+    bases = [ast.unparse(base) for base in node.bases] + [ast.unparse(kw) for kw in node.keywords]
+    return f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+
+
+def _docstring_preview(node: ast.AST) -> Optional[str]:
+    doc = ast.get_docstring(node)
+    if not doc:
+        return None
+    doc = " ".join(doc.split())
+    if len(doc) > DOCSTRING_PREVIEW_CHARS:
+        doc = doc[:DOCSTRING_PREVIEW_CHARS].rstrip() + "..."
+    return f'"""{doc}"""'
+
+
+def _outline_body(nodes: List[ast.stmt], depth: int, lines: List[str]) -> None:
+    indent = "    " * depth
+    for node in nodes:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in node.decorator_list:
+                lines.append(f"L{decorator.lineno}: {indent}@{ast.unparse(decorator)}")
+            lines.append(f"L{node.lineno}-{node.end_lineno}: {indent}{_signature(node)}")
+        elif isinstance(node, ast.ClassDef):
+            for decorator in node.decorator_list:
+                lines.append(f"L{decorator.lineno}: {indent}@{ast.unparse(decorator)}")
+            lines.append(f"L{node.lineno}-{node.end_lineno}: {indent}{_class_header(node)}")
+            doc = _docstring_preview(node)
+            if doc:
+                lines.append(f"    {indent}{doc}")
+            _outline_body(node.body, depth + 1, lines)
+        elif depth == 0 and isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(f"L{node.lineno}: {ast.unparse(node)}")
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            lines.append(f"L{node.lineno}: {indent}{node.target.id}: {ast.unparse(node.annotation)}")
+        elif isinstance(node, ast.Assign):
+            names = [ast.unparse(target) for target in node.targets]
+            if all(name.isidentifier() for name in names):
+                lines.append(f"L{node.lineno}: {indent}{' = '.join(names)} = ...")
+
+
+def build_outline(source: str) -> Optional[str]:
+    """
+    Returns a compact, line-numbered outline of a Python module: module docstring, imports,
+    module/class-level assignments, class headers and function signatures.
+    Returns None if the source does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+
+    lines: List[str] = []
+    doc = _docstring_preview(tree)
+    if doc:
+        lines.append(doc)
+    _outline_body(tree.body, 0, lines)
+    return "\n".join(lines)
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from paths import CACHE_DIR
+
+RATE_LIMIT_STATE_PATH = os.path.join(CACHE_DIR, "llm_rate_limit.json")
+# Quota shared by every process on this host using the same install (scheduler, CLI, GUI).
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = 400_000
+REQUESTS_PER_MINUTE_ENV = "META_AGENT_LLM_RPM"
+TOKENS_PER_MINUTE_ENV = "META_AGENT_LLM_TPM"
+# Longest single sleep while waiting, so a process notices quota freed by others.
+MAX_WAIT_SLICE_SECONDS = 5.0
+
+
+def _limit_from_env(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"[WARN] Ignoring invalid {name}={value!r}; using {default}")
+        return default
+
+
+class _FileLock:
+    """
+    Exclusive lock on a lock file (fcntl.flock on POSIX, msvcrt.locking on Windows). Locks
+    are per open handle, so threads of one process exclude each other too.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._handle = None
+
+    def __enter__(self) -> "_FileLock":
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._handle = open(self.path, "a+b")
+        if os.name == "nt":
+            import msvcrt
+
+            self._handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s
+                    time.sleep(0.05)
+        else:
+            import fcntl
+
+            fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._handle.close()
+
+
+class TokenBucketLimiter:
+    """
+    Requests/min and tokens/min token buckets whose state lives in a JSON file guarded by a
+    lock file, so all processes on the host draw from one quota. Each bucket holds up to one
+    minute of quota and refills continuously. A 429 can pause everyone via penalize().
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        path: str = RATE_LIMIT_STATE_PATH,
+    ):
+        self.requests_per_minute = max(1, int(requests_per_minute or _limit_from_env(REQUESTS_PER_MINUTE_ENV, DEFAULT_REQUESTS_PER_MINUTE)))
+        self.tokens_per_minute = max(1, int(tokens_per_minute or _limit_from_env(TOKENS_PER_MINUTE_ENV, DEFAULT_TOKENS_PER_MINUTE)))
+        self.path = path
+        self._lock_path = path + ".lock"
+        self.waited_seconds = 0.0
+
+    def _read(self, now: float) -> Dict[str, float]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            state = {}
+        if not isinstance(state, dict) or "updated" not in state:
+            return {"updated": now, "requests": float(self.requests_per_minute), "tokens": float(self.tokens_per_minute), "blocked_until": 0.0}
+        elapsed = max(0.0, now - float(state["updated"]))
+        # Another process may use different limits; clamp to ours.
+        return {
+            "updated": now,
+            "requests": min(float(self.requests_per_minute), float(state.get("requests", 0)) + elapsed * self.requests_per_minute / 60.0),
+            "tokens": min(float(self.tokens_per_minute), float(state.get("tokens", 0)) + elapsed * self.tokens_per_minute / 60.0),
+            "blocked_until": float(state.get("blocked_until", 0.0)),
+        }
+
+    def _write(self, state: Dict[str, float]) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        os.replace(tmp_path, self.path)
+
+    def try_acquire(self, tokens: int) -> float:
+        """
+        Takes one request and `tokens` tokens if available and returns 0; otherwise takes
+        nothing and returns the seconds to wait before trying again.
+        """
+        tokens = min(max(0, tokens), self.tokens_per_minute)  # a bigger call would never fit
+        with _FileLock(self._lock_path):
+            now = time.time()
+            state = self._read(now)
+            wait = state["blocked_until"] - now
+            if wait <= 0:
+                wait = max(
+                    (1.0 - state["requests"]) * 60.0 / self.requests_per_minute,
+                    (tokens - state["tokens"]) * 60.0 / self.tokens_per_minute,
+                )
+            if wait <= 0:
+                state["requests"] -= 1.0
+                state["tokens"] -= tokens
+            self._write(state)
+        return max(0.0, wait)
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Blocks until the call fits the shared quota; returns the seconds waited.
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                self.waited_seconds += waited
+                return waited
+            wait = min(wait, MAX_WAIT_SLICE_SECONDS)
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens: int) -> float:
+        """
+        acquire() for coroutines; the lock and file I/O run in a worker thread so a lock held
+        by another process does not stall the event loop.
+        """
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, tokens)
+            if wait <= 0:
+                self.waited_seconds += waited
+                return waited
+            wait = min(wait, MAX_WAIT_SLICE_SECONDS)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def penalize(self, seconds: float) -> None:
+        """
+        Pauses all processes for `seconds` (e.g. the server's Retry-After after a 429).
+        """
+        with _FileLock(self._lock_path):
+            now = time.time()
+            state = self._read(now)
+            state["blocked_until"] = max(state["blocked_until"], now + seconds)
+            self._write(state)
+
+    async def penalize_async(self, seconds: float) -> None:
+        await asyncio.to_thread(self.penalize, seconds)
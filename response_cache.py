@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from paths import CACHE_DIR
+
+RESPONSE_CACHE_DIR = os.path.join(CACHE_DIR, "responses")
+RESPONSE_CACHE_VERSION = 1
+DEFAULT_RESPONSE_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_RESPONSE_TTL_SECONDS = 7 * 24 * 3600.0
+# Eviction trims the cache to this fraction of max_bytes, so it does not run on every put.
+EVICTION_TARGET_RATIO = 0.9
+# Set to 0/off/false to bypass the cache (every call goes to the API).
+RESPONSE_CACHE_ENV = "META_AGENT_RESPONSE_CACHE"
+
+
+def response_cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """
+    Content address of a request: model, full message list and sampling parameters.
+    """
+    payload = json.dumps(
+        {"version": RESPONSE_CACHE_VERSION, "model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    __slots__ = ("done", "value")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+
+
+class ResponseCache:
+    """
+    Disk-backed model response cache: one JSON file per key under `directory`, expired after
+    ttl_seconds and evicted least-recently-used (file mtime, refreshed on hits) once the
+    directory exceeds max_bytes. Several processes may share the directory; concurrent
+    identical requests within a process share one in-flight call (single-flight).
+    """
+
+    def __init__(
+        self,
+        directory: str = RESPONSE_CACHE_DIR,
+        max_bytes: int = DEFAULT_RESPONSE_CACHE_BYTES,
+        ttl_seconds: float = DEFAULT_RESPONSE_TTL_SECONDS,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _InFlight] = {}
+        self._total_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        """
+        (mtime, path, size) of every cached response.
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if time.time() - float(data.get("created_at", 0)) > self.ttl_seconds:
+            self.expired += 1
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # LRU position
+        except OSError:
+            pass
+        return data.get("response")
+
+    def put(self, key: str, response: str, model: str = "") -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"created_at": time.time(), "model": model, "response": response}, handle)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += size
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _remove(self, path: str) -> None:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes -= size
+
+    def _evict(self) -> None:
+        """
+        Drops expired entries, then the least recently used ones down to the target size.
+        Re-scans the directory, since other processes write to it too.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * EVICTION_TARGET_RATIO)
+        cutoff = time.time() - self.ttl_seconds
+        for mtime, path, size in entries:
+            if total <= target and mtime >= cutoff:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        with self._lock:
+            self._total_bytes = total
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], str],
+        cacheable: Callable[[str], bool] = lambda response: True,
+        model: str = "",
+    ) -> Tuple[str, str]:
+        """
+        Returns (response, outcome) with outcome "hit", "shared" (joined an identical call
+        already in flight) or "miss" (computed here). Responses failing `cacheable` are
+        returned but not stored.
+        """
+        with self._lock:
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                owner = self._inflight[key] = _InFlight()
+        if waiting is not None:
+            waiting.done.wait()
+            if waiting.value is not None:
+                with self._lock:
+                    self.shared += 1
+                return waiting.value, "shared"
+            # The owner failed; compute independently.
+            return compute(), "miss"
+
+        try:
+            cached = self.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.hits += 1
+                owner.value = cached
+                return cached, "hit"
+            with self._lock:
+                self.misses += 1
+            response = compute()
+            if cacheable(response):
+                owner.value = response
+                try:
+                    self.put(key, response, model)
+                except OSError as exc:
+                    print(f"[WARN] Could not cache model response: {exc}")
+            return response, "miss"
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            owner.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+        }
+
+
+_SHARED_CACHE: Optional[ResponseCache] = None
+_SHARED_CACHE_LOCK = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide cache used by CodexClient, or None when disabled via RESPONSE_CACHE_ENV.
+    """
+    global _SHARED_CACHE
+    if os.getenv(RESPONSE_CACHE_ENV, "").strip().lower() in {"0", "off", "false", "no"}:
+        return None
+    with _SHARED_CACHE_LOCK:
+        if _SHARED_CACHE is None:
+            _SHARED_CACHE = ResponseCache()
+        return _SHARED_CACHE
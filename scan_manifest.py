@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from paths import CACHE_DIR
+
+MANIFEST_DIR = os.path.join(CACHE_DIR, "manifests")
+MANIFEST_VERSION = 2
+
+
+@dataclass
+class ManifestEntry:
+    """
+    Cached metadata and normalized text for a single scanned file.
+    `text` is None when the file was skipped at scan time; `skip_reason` says why
+    (large | binary | minified | generated).
+    """
+
+    size: int
+    mtime_ns: int
+    sha256: str
+    chars: int
+    text: Optional[str] = None
+    skip_reason: Optional[str] = None
+
+
+def content_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def skipped_digest(skip_reason: Optional[str], size: int, mtime_ns: int) -> str:
+    """
+    Skipped files are never fully read, so their identity is derived from metadata.
+    """
+    return hashlib.sha256(f"{skip_reason}:{size}:{mtime_ns}".encode("ascii")).hexdigest()
+
+
+def combine_digests(pairs: Iterable[Tuple[str, str]]) -> str:
+    """
+    Stable hash over (rel_path, content digest) pairs, independent of input order and os.sep.
+    """
+    digest = hashlib.sha256()
+    for rel_path, file_digest in sorted((path.replace("\\", "/"), value) for path, value in pairs):
+        digest.update(rel_path.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(file_digest.encode("ascii"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def manifest_path_for(project_root: str) -> str:
+    """
+    Returns the on-disk manifest location for a project root (one file per root).
+    """
+    root_key = hashlib.sha1(os.path.abspath(project_root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(MANIFEST_DIR, f"{root_key}.json")
+
+
+class ScanManifest:
+    """
+    Persistent per-project index of scanned files keyed by relative path.
+    Lets a rescan stat the tree and only re-read files whose size or mtime changed.
+    """
+
+    def __init__(self, project_root: str, path: Optional[str] = None):
+        self.project_root = os.path.abspath(project_root)
+        self.path = path or manifest_path_for(self.project_root)
+        self.entries: Dict[str, ManifestEntry] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                raw = json.load(handle) or {}
+        except (json.JSONDecodeError, OSError):
+            return
+        if raw.get("version") != MANIFEST_VERSION or raw.get("project_root") != self.project_root:
+            return
+        for rel_path, data in (raw.get("files") or {}).items():
+            try:
+                self.entries[rel_path] = ManifestEntry(**data)
+            except TypeError:
+                continue
+
+    def lookup(self, rel_path: str, stat: os.stat_result, max_file_chars: int) -> Optional[ManifestEntry]:
+        """
+        Returns the cached entry if it is still fresh for the given stat result, else None.
+        Entries recorded as too large are treated as stale once the char cap is raised past them,
+        and cached text is stale once the cap is lowered below it.
+        """
+        entry = self.entries.get(rel_path)
+        if entry is None or entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns:
+            self.misses += 1
+            return None
+        if (entry.skip_reason == "large") == (entry.chars <= max_file_chars):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def update(
+        self,
+        rel_path: str,
+        stat: os.stat_result,
+        text: Optional[str],
+        chars: int,
+        skip_reason: Optional[str] = None,
+    ) -> ManifestEntry:
+        """
+        Records a fresh read of a file and returns the new entry.
+        Skipped files are not fully read, so their hash is derived from size and mtime.
+        """
+        if text is not None:
+            digest = content_digest(text)
+        else:
+            digest = skipped_digest(skip_reason, stat.st_size, stat.st_mtime_ns)
+        entry = ManifestEntry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=digest,
+            chars=chars,
+            text=text,
+            skip_reason=skip_reason,
+        )
+        self.entries[rel_path] = entry
+        self._dirty = True
+        return entry
+
+    def prune(self, seen_paths: Iterable[str], covered: Optional[Callable[[str], bool]] = None) -> None:
+        """
+        Drops entries for files that no longer exist in the scanned tree. For a partial scan,
+        `covered` limits pruning to the paths that scan could have seen.
+        """
+        seen = set(seen_paths)
+        stale = [rel for rel in self.entries if rel not in seen and (covered is None or covered(rel))]
+        for rel in stale:
+            del self.entries[rel]
+        if stale:
+            self._dirty = True
+
+    def snapshot_hash(self) -> str:
+        """
+        Stable hash over (path, content hash) pairs; usable as a cache key for the project state.
+        """
+        return combine_digests((rel_path, entry.sha256) for rel_path, entry in self.entries.items())
+
+    def save(self) -> None:
+        """
+        Writes the manifest atomically if anything changed since load.
+        """
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        payload = {
+            "version": MANIFEST_VERSION,
+            "project_root": self.project_root,
+            "files": {rel: asdict(entry) for rel, entry in sorted(self.entries.items())},
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, ensure_ascii=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
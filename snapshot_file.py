@@ -0,0 +1,157 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from paths import CACHE_DIR
+
+SNAPSHOT_FILES_DIR = os.path.join(CACHE_DIR, "snapshots")
+SNAPSHOT_FILE_MAGIC = b"MASNAP01"
+SNAPSHOT_FILE_VERSION = 1
+# magic, index offset, index length
+_HEADER = struct.Struct("<8sQQ")
+
+
+def snapshot_file_path_for(project_root: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(project_root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_FILES_DIR, f"{digest}.snap")
+
+
+@dataclass
+class SnapshotEntry:
+    """
+    Index record for one file: where its UTF-8 text sits in the blob (length 0 and
+    skip_reason set for skipped files) plus the stat it was captured with.
+    """
+
+    rel_path: str
+    offset: int
+    length: int
+    digest: Optional[str]
+    chars: int
+    skip_reason: Optional[str]
+    size: int
+    mtime_ns: int
+    file_id: Optional[Tuple[int, int]] = None
+
+
+def write_snapshot_file(
+    path: str,
+    project_root: str,
+    scan_key: str,
+    files: Iterable[Tuple[str, Optional[str], int, Optional[str], Optional[str], os.stat_result, Optional[Tuple[int, int]]]],
+) -> int:
+    """
+    Writes a snapshot file: header, contiguous text blob, then a JSON offset index.
+    files: (rel_path, text, chars, digest, skip_reason, stat, file_id) in walk order.
+    The file is replaced atomically, so mapped readers keep a consistent (old) view.
+    Returns the blob size in bytes.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    entries = []
+    with open(tmp_path, "wb") as handle:
+        handle.write(_HEADER.pack(SNAPSHOT_FILE_MAGIC, 0, 0))
+        offset = _HEADER.size
+        for rel_path, text, chars, digest, skip_reason, stat, file_id in files:
+            data = text.encode("utf-8") if text is not None else b""
+            handle.write(data)
+            entries.append(
+                [
+                    rel_path,
+                    offset,
+                    len(data),
+                    digest,
+                    chars,
+                    skip_reason,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    list(file_id) if file_id else None,
+                ]
+            )
+            offset += len(data)
+        index = json.dumps(
+            {
+                "version": SNAPSHOT_FILE_VERSION,
+                "project_root": os.path.abspath(project_root),
+                "scan_key": scan_key,
+                "entries": entries,
+            }
+        ).encode("utf-8")
+        handle.write(index)
+        handle.seek(0)
+        handle.write(_HEADER.pack(SNAPSHOT_FILE_MAGIC, offset, len(index)))
+    os.replace(tmp_path, path)
+    return offset - _HEADER.size
+
+
+class MappedSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file. File contents are served as zero-copy
+    memoryview slices of the mapping, so every process mapping the same file shares one copy
+    in the page cache; only text that is actually decoded is materialized per process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # The mapping holds its own handle, so the file is closed right away and the mapping
+        # lives exactly as long as the slices handed out by view().
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, index_offset, index_length = _HEADER.unpack_from(self._view, 0)
+        if magic != SNAPSHOT_FILE_MAGIC or index_offset + index_length > len(self._view):
+            self.close()
+            raise ValueError(f"Not a snapshot file: {path}")
+        index = json.loads(str(self._view[index_offset : index_offset + index_length], "utf-8"))
+        if index.get("version") != SNAPSHOT_FILE_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot file version in {path}")
+        self.project_root: str = index.get("project_root", "")
+        self.scan_key: str = index.get("scan_key", "")
+        self.entries: Dict[str, SnapshotEntry] = {}
+        for rel_path, offset, length, digest, chars, skip_reason, size, mtime_ns, file_id in index.get("entries", []):
+            self.entries[rel_path] = SnapshotEntry(
+                rel_path, offset, length, digest, chars, skip_reason, size, mtime_ns, tuple(file_id) if file_id else None
+            )
+
+    @classmethod
+    def open(cls, path: str) -> Optional["MappedSnapshot"]:
+        """
+        Maps a snapshot file, or returns None if it is missing, empty or unreadable.
+        """
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error, json.JSONDecodeError):
+            return None
+
+    def view(self, rel_path: str) -> Optional[memoryview]:
+        """
+        Zero-copy slice with the file's UTF-8 text (None if unknown or skipped).
+        """
+        entry = self.entries.get(rel_path)
+        if entry is None or entry.skip_reason is not None:
+            return None
+        return self._view[entry.offset : entry.offset + entry.length]
+
+    def read_text(self, rel_path: str) -> Optional[str]:
+        view = self.view(rel_path)
+        return str(view, "utf-8") if view is not None else None
+
+    def close(self) -> None:
+        # Slices handed out by view() must be released first or the mapping stays open.
+        try:
+            self._view.release()
+            self._map.close()
+        except (BufferError, ValueError):
+            pass
+
+    def __enter__(self) -> "MappedSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,346 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from paths import CACHE_DIR
+from project_scanner import OUTLINE_MAX_BYTES
+from python_outline import build_outline
+from scan_manifest import content_digest, skipped_digest
+
+SUMMARY_CACHE_PATH = os.path.join(CACHE_DIR, "summaries.json")
+SUMMARY_CACHE_VERSION = 1
+# Bump when the summary prompts change so stale summaries are regenerated.
+SUMMARY_PROMPT_VERSION = 1
+DEFAULT_SUMMARY_CACHE_BYTES = 16 * 1024 * 1024
+# Material per summarization request and per file within it.
+SUMMARY_BATCH_CHARS = 60_000
+SUMMARY_FILE_CHARS = 6_000
+# Upper bound on LLM-generated summaries per overview build; the rest use cheap fallbacks.
+MAX_NEW_SUMMARIES = 400
+SEPARATOR = " :: "
+
+FILE_SUMMARY_PROMPT = (
+    "Summarize each file below in one line: its purpose and the main classes/functions it "
+    "defines. Reply with exactly one line per file in the form `<path>{sep}<summary>` and "
+    "nothing else.\n\n"
+)
+DIR_SUMMARY_PROMPT = (
+    "Summarize each directory below in one line from the summaries of its contents. Reply with "
+    "exactly one line per directory in the form `<directory>/{sep}<summary>` and nothing else.\n\n"
+)
+
+
+class SummaryCache:
+    """
+    Persistent summary store keyed by content hash, evicting least-recently-used entries once
+    the total size (summary + key bytes) exceeds max_bytes.
+    """
+
+    def __init__(self, path: str = SUMMARY_CACHE_PATH, max_bytes: int = DEFAULT_SUMMARY_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def _entry_size(key: str, summary: str) -> int:
+        return len(key) + len(summary.encode("utf-8"))
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") != SUMMARY_CACHE_VERSION:
+            return
+        # Stored oldest-first, so insertion order restores the LRU order.
+        for key, summary in data.get("entries") or []:
+            self._entries[key] = summary
+            self.total_bytes += self._entry_size(key, summary)
+        self._evict()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump({"version": SUMMARY_CACHE_VERSION, "entries": list(self._entries.items())}, handle)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def get(self, key: str) -> Optional[str]:
+        summary = self._entries.get(key)
+        if summary is None:
+            self.misses += 1
+            return None
+        # Recency on hits is kept in memory only; persisting it would rewrite the whole
+        # cache after every read-only overview.
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return summary
+
+    def put(self, key: str, summary: str) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= self._entry_size(key, previous)
+        self._entries[key] = summary
+        self.total_bytes += self._entry_size(key, summary)
+        self._dirty = True
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, summary = self._entries.popitem(last=False)
+            self.total_bytes -= self._entry_size(key, summary)
+            self.evictions += 1
+            self._dirty = True
+
+
+def _file_key(digest: str) -> str:
+    return f"file:v{SUMMARY_PROMPT_VERSION}:{digest}"
+
+
+def _dir_key(rel_dir: str, child_keys: Iterable[str]) -> str:
+    """
+    Directory keys hash their children's keys, so a change anywhere below regenerates the
+    summaries of every enclosing directory and nothing else.
+    """
+    digest = hashlib.sha256("\n".join([rel_dir, *sorted(child_keys)]).encode("utf-8")).hexdigest()
+    return f"dir:v{SUMMARY_PROMPT_VERSION}:{digest}"
+
+
+def _fallback_summary(material: str) -> str:
+    """
+    Cheap summary when no model summary is available: the first meaningful line.
+    """
+    for line in material.splitlines():
+        stripped = line.strip().strip('#"\'/* ').strip()
+        if len(stripped) >= 12:
+            return stripped[:160]
+    return "(no summary)"
+
+
+def _parse_reply(reply: str, expected: Iterable[str]) -> Dict[str, str]:
+    wanted = set(expected)
+    parsed: Dict[str, str] = {}
+    for line in reply.splitlines():
+        if SEPARATOR not in line:
+            continue
+        name, summary = line.split(SEPARATOR, 1)
+        name = name.strip().strip("`").strip()
+        if name in wanted and summary.strip():
+            parsed[name] = summary.strip()
+    return parsed
+
+
+class ProjectSummarizer:
+    """
+    Builds a hierarchical project overview (directory and file one-liners) from cached
+    summaries, generating only the missing ones with `complete(prompt) -> reply` in batches.
+    With `complete_many(prompts) -> replies`, the batches of one level are sent concurrently.
+    """
+
+    def __init__(
+        self,
+        complete: Callable[[str], str],
+        cache: Optional[SummaryCache] = None,
+        max_new_summaries: int = MAX_NEW_SUMMARIES,
+        complete_many: Optional[Callable[[List[str]], List[str]]] = None,
+    ):
+        self.complete = complete
+        self.complete_many = complete_many
+        self.cache = cache or SummaryCache()
+        self.max_new_summaries = max_new_summaries
+        self.generated = 0
+        self.failed_requests = 0
+
+    def _generate(self, prompt_head: str, items: List[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        items: (name, material). Returns name -> summary for the names the model answered.
+        """
+        batches: List[List[Tuple[str, str]]] = []
+        batch_chars = 0
+        for name, material in items:
+            if self.generated >= self.max_new_summaries:
+                break
+            if not batches or batch_chars + len(material) > SUMMARY_BATCH_CHARS:
+                batches.append([])
+                batch_chars = 0
+            batches[-1].append((name, material))
+            batch_chars += len(material)
+            self.generated += 1
+
+        prompts = [
+            prompt_head.format(sep=SEPARATOR) + "\n\n".join(f"=== {name} ===\n{material}" for name, material in batch)
+            for batch in batches
+        ]
+        if self.complete_many is not None and len(prompts) > 1:
+            replies = self.complete_many(prompts)
+        else:
+            replies = [self.complete(prompt) for prompt in prompts]
+        results: Dict[str, str] = {}
+        for batch, reply in zip(batches, replies):
+            if isinstance(reply, str) and not reply.lstrip().startswith("[ERROR]"):
+                results.update(_parse_reply(reply, (name for name, _ in batch)))
+            else:
+                self.failed_requests += 1
+        return results
+
+    @staticmethod
+    def _material(project_root: str, scanned, blob: Optional[str] = None, reader=None) -> Tuple[str, str]:
+        """
+        (cache digest, text to summarize) for a scanned file; oversized Python files are
+        summarized from their outline. Oversized files scanned at a git ref (`blob` set) are
+        read through `reader` instead of the working tree.
+        """
+        if scanned.text is not None:
+            digest = scanned.digest or content_digest(scanned.text)
+            text = scanned.text
+            if len(text) > SUMMARY_FILE_CHARS and scanned.rel_path.endswith(".py"):
+                text = build_outline(text) or text
+            return digest, text[:SUMMARY_FILE_CHARS]
+        # Skipped files can be huge dumps or logs: read only what the summary can use.
+        is_python = scanned.rel_path.endswith(".py")
+        limit = OUTLINE_MAX_BYTES + 1 if is_python else SUMMARY_FILE_CHARS * 4
+        if blob is not None:
+            digest = scanned.digest or f"large:{blob}"
+            raw = reader.read(blob)
+            if raw is None:
+                raise OSError(f"missing blob {blob} for {scanned.rel_path}")
+            raw = raw[:limit]
+        else:
+            abs_path = os.path.join(project_root, scanned.rel_path)
+            if scanned.digest is None:
+                stat = os.stat(abs_path)
+                digest = skipped_digest("large", stat.st_size, stat.st_mtime_ns)
+            else:
+                digest = scanned.digest
+            with open(abs_path, "rb") as handle:
+                raw = handle.read(limit)
+        source = raw.decode("utf-8", errors="ignore")
+        if is_python and len(raw) <= OUTLINE_MAX_BYTES:
+            source = build_outline(source) or source
+        return digest, source[:SUMMARY_FILE_CHARS]
+
+    def summarize(
+        self, project_root: str, files: Iterable, git_blobs: Optional[Dict[str, str]] = None
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Returns (file summaries, directory summaries) keyed by posix path ("" is the root).
+        `git_blobs` (rel path -> blob hash) marks files scanned at a git ref.
+        """
+        file_keys: Dict[str, str] = {}
+        materials: Dict[str, str] = {}
+        file_summaries: Dict[str, str] = {}
+        reader = None
+        try:
+            for scanned in files:
+                rel_path = scanned.rel_path.replace(os.sep, "/")
+                blob = (git_blobs or {}).get(scanned.rel_path) if scanned.text is None else None
+                if blob is not None and reader is None:
+                    from git_context import GitBlobReader
+
+                    reader = GitBlobReader(project_root)
+                try:
+                    digest, material = self._material(project_root, scanned, blob, reader)
+                except OSError:
+                    continue
+                key = _file_key(digest)
+                file_keys[rel_path] = key
+                cached = self.cache.get(key)
+                if cached is not None:
+                    file_summaries[rel_path] = cached
+                else:
+                    materials[rel_path] = material
+        finally:
+            if reader is not None:
+                reader.close()
+        generated = self._generate(FILE_SUMMARY_PROMPT, list(materials.items()))
+        for rel_path, material in materials.items():
+            if rel_path in generated:
+                self.cache.put(file_keys[rel_path], generated[rel_path])
+                file_summaries[rel_path] = generated[rel_path]
+            else:
+                file_summaries[rel_path] = _fallback_summary(material)
+
+        # Directories bottom-up, so each one's key and material include its subdirectories.
+        children: Dict[str, List[str]] = {}
+        for rel_path in file_keys:
+            parts = rel_path.split("/")
+            for depth in range(len(parts)):
+                parent = "/".join(parts[:depth])
+                child = "/".join(parts[: depth + 1])
+                if child not in children.setdefault(parent, []):
+                    children[parent].append(child)
+        dir_summaries: Dict[str, str] = {}
+        dir_keys: Dict[str, str] = {}
+        depth_of = {rel_dir: (rel_dir.count("/") + 1 if rel_dir else 0) for rel_dir in children}
+        for depth in sorted(set(depth_of.values()), reverse=True):
+            pending: List[Tuple[str, str]] = []
+            for rel_dir in sorted(path for path, level in depth_of.items() if level == depth):
+                entries = sorted(children[rel_dir])
+                dir_keys[rel_dir] = _dir_key(rel_dir, (file_keys.get(child) or dir_keys[child] for child in entries))
+                cached = self.cache.get(dir_keys[rel_dir])
+                if cached is not None:
+                    dir_summaries[rel_dir] = cached
+                    continue
+                material = "\n".join(
+                    f"{child}{'/' if child in children else ''}: {file_summaries.get(child) or dir_summaries.get(child, '')}"
+                    for child in entries
+                )
+                pending.append((f"{rel_dir or '.'}/", material))
+            generated = self._generate(DIR_SUMMARY_PROMPT, pending)
+            for name, _ in pending:
+                rel_dir = "" if name == "./" else name[:-1]
+                if name in generated:
+                    dir_summaries[rel_dir] = generated[name]
+                    self.cache.put(dir_keys[rel_dir], generated[name])
+                else:
+                    names = [child.rsplit("/", 1)[-1] for child in sorted(children[rel_dir])[:8]]
+                    dir_summaries[rel_dir] = "Contains " + ", ".join(names)
+        self.cache.save()
+        return file_summaries, dir_summaries
+
+    def overview(
+        self, project_root: str, files: Iterable, max_chars: int, git_blobs: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Renders the summaries as an indented tree (directory line, then its files and
+        subdirectories), truncated at a line boundary to max_chars.
+        """
+        file_summaries, dir_summaries = self.summarize(project_root, files, git_blobs)
+        lines = ["### PROJECT OVERVIEW"]
+
+        def _walk(rel_dir: str, depth: int) -> None:
+            indent = "  " * depth
+            lines.append(f"{indent}{rel_dir or '.'}/ — {dir_summaries.get(rel_dir, '')}")
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            direct = sorted(path for path in file_summaries if path.startswith(prefix) and "/" not in path[len(prefix):])
+            for path in direct:
+                lines.append(f"{indent}  {path.rsplit('/', 1)[-1]} — {file_summaries[path]}")
+            subdirs = sorted(
+                path for path in dir_summaries if path and path.startswith(prefix) and "/" not in path[len(prefix):]
+            )
+            for subdir in subdirs:
+                _walk(subdir, depth + 1)
+
+        if dir_summaries:
+            _walk("", 0)
+        text = ""
+        for line in lines:
+            if len(text) + len(line) + 1 > max_chars:
+                break
+            text += line + "\n"
+        return text
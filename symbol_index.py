@@ -0,0 +1,242 @@
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from paths import CACHE_DIR
+
+SYMBOL_INDEX_VERSION = 1
+SYMBOL_INDEXES_DIR = os.path.join(CACHE_DIR, "symbol_indexes")
+# Files larger than this are not parsed at all.
+SYMBOL_INDEX_MAX_BYTES = 8_000_000
+MAX_CALLERS_PER_SYMBOL = 5
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)*")
+BACKTICKED = re.compile(r"`([^`\n]+)`")
+CALL_MENTION = re.compile(r"([A-Za-z_][A-Za-z0-9_.]*)\s*\(")
+
+
+@dataclass
+class SymbolSpan:
+    """
+    A class, function or method definition: qualified name (Class.method), 1-based inclusive
+    line span (decorators included) and the bare names it calls.
+    """
+
+    name: str
+    kind: str  # class | function | method
+    start: int
+    end: int
+    calls: List[str] = field(default_factory=list)
+
+    @property
+    def short_name(self) -> str:
+        return self.name.rsplit(".", 1)[-1]
+
+
+def symbol_index_path_for(project_root: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(project_root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SYMBOL_INDEXES_DIR, f"{digest}.json")
+
+
+def _called_names(nodes: Iterable[ast.AST]) -> List[str]:
+    names: Set[str] = set()
+    for node in nodes:
+        for child in ast.walk(node):
+            if isinstance(child, ast.Call):
+                func = child.func
+                if isinstance(func, ast.Name):
+                    names.add(func.id)
+                elif isinstance(func, ast.Attribute):
+                    names.add(func.attr)
+    return sorted(names)
+
+
+def parse_symbols(source: str) -> List[SymbolSpan]:
+    """
+    Module-level classes/functions and class methods of a Python source, in file order.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    symbols: List[SymbolSpan] = []
+
+    def _span(node: ast.AST) -> Tuple[int, int]:
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+        return start, getattr(node, "end_lineno", None) or node.lineno
+
+    functions = (ast.FunctionDef, ast.AsyncFunctionDef)
+    for node in tree.body:
+        if isinstance(node, functions):
+            start, end = _span(node)
+            symbols.append(SymbolSpan(node.name, "function", start, end, _called_names(node.body)))
+        elif isinstance(node, ast.ClassDef):
+            start, end = _span(node)
+            others = [child for child in node.body if not isinstance(child, functions)]
+            symbols.append(SymbolSpan(node.name, "class", start, end, _called_names(others)))
+            for child in node.body:
+                if isinstance(child, functions):
+                    child_start, child_end = _span(child)
+                    symbols.append(
+                        SymbolSpan(f"{node.name}.{child.name}", "method", child_start, child_end, _called_names(child.body))
+                    )
+    return symbols
+
+
+def referenced_identifiers(text: str) -> Set[str]:
+    """
+    Identifiers in a task body that plausibly name code: backticked names, names followed by
+    "(", dotted names, and snake_case / CamelCase words. Plain prose words are ignored.
+    """
+    found: Set[str] = set()
+    for quoted in BACKTICKED.findall(text):
+        found.update(IDENTIFIER.findall(quoted))
+    found.update(CALL_MENTION.findall(text))
+    for word in IDENTIFIER.findall(text):
+        if "." in word or "_" in word.strip("_") or any(ch.isupper() for ch in word[1:]):
+            found.add(word)
+    return {name.rstrip(".") for name in found if len(name) >= 3}
+
+
+class SymbolIndex:
+    """
+    Persistent name -> (file, line span) index for Python files, updated incrementally: a file
+    is only re-parsed when its size or mtime changed.
+    """
+
+    def __init__(self, project_root: str, path: Optional[str] = None):
+        self.project_root = os.path.abspath(project_root)
+        self.path = path or symbol_index_path_for(self.project_root)
+        self.files: Dict[str, Tuple[str, int, List[SymbolSpan]]] = {}  # rel -> (signature, chars, symbols)
+        self.parsed_files = 0
+        self._dirty = False
+        self._by_name: Dict[str, List[Tuple[str, SymbolSpan]]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") != SYMBOL_INDEX_VERSION:
+            return
+        for rel_path, entry in (data.get("files") or {}).items():
+            symbols = [SymbolSpan(*item) for item in entry.get("symbols", [])]
+            self.files[rel_path] = (entry.get("signature", ""), int(entry.get("chars", 0)), symbols)
+        self._reindex()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        payload = {
+            "version": SYMBOL_INDEX_VERSION,
+            "project_root": self.project_root,
+            "files": {
+                rel_path: {
+                    "signature": signature,
+                    "chars": chars,
+                    "symbols": [[s.name, s.kind, s.start, s.end, s.calls] for s in symbols],
+                }
+                for rel_path, (signature, chars, symbols) in sorted(self.files.items())
+            },
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def update(self, files: Iterable[Tuple[str, str, int]]) -> None:
+        """
+        Syncs the index with (rel_path, signature, size) of the files to cover; others are
+        dropped. A file is re-parsed when its signature (size:mtime, or a content digest)
+        changes.
+        """
+        seen: Set[str] = set()
+        for rel_path, signature, size in files:
+            seen.add(rel_path)
+            cached = self.files.get(rel_path)
+            if cached is not None and cached[0] == signature:
+                continue
+            chars, symbols = 0, []
+            if size <= SYMBOL_INDEX_MAX_BYTES:
+                try:
+                    with open(os.path.join(self.project_root, rel_path), "rb") as handle:
+                        source = handle.read().decode("utf-8", errors="ignore")
+                except OSError:
+                    source = ""
+                chars, symbols = len(source), parse_symbols(source)
+            self.files[rel_path] = (signature, chars, symbols)
+            self.parsed_files += 1
+            self._dirty = True
+        for rel_path in set(self.files) - seen:
+            del self.files[rel_path]
+            self._dirty = True
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_name = {}
+        for rel_path, (_, _, symbols) in self.files.items():
+            for symbol in symbols:
+                self._by_name.setdefault(symbol.name, []).append((rel_path, symbol))
+                if symbol.kind == "method":
+                    self._by_name.setdefault(symbol.short_name, []).append((rel_path, symbol))
+
+    def chars(self, rel_path: str) -> int:
+        entry = self.files.get(rel_path)
+        return entry[1] if entry else 0
+
+    def lookup(self, name: str) -> List[Tuple[str, SymbolSpan]]:
+        """
+        Definitions named `name` (qualified Class.method or bare name); for dotted names that
+        are not symbols (module.func), the last component is tried.
+        """
+        found = self._by_name.get(name)
+        if found is None and "." in name:
+            found = self._by_name.get(name.rsplit(".", 1)[-1])
+        return list(found or [])
+
+    def callers(self, symbol: SymbolSpan, limit: int = MAX_CALLERS_PER_SYMBOL) -> List[Tuple[str, SymbolSpan]]:
+        """
+        Indexed definitions whose body calls `symbol` by its bare name.
+        """
+        result: List[Tuple[str, SymbolSpan]] = []
+        for rel_path, (_, _, symbols) in sorted(self.files.items()):
+            for candidate in symbols:
+                if candidate is not symbol and symbol.short_name in candidate.calls:
+                    result.append((rel_path, candidate))
+                    if len(result) >= limit:
+                        return result
+        return result
+
+
+def merge_spans(spans: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def render_excerpt(rel_path: str, lines: List[str], spans: Iterable[Tuple[int, int]]) -> str:
+    """
+    Line-numbered excerpt block for a file; non-adjacent spans are separated by "...".
+    """
+    parts = [f"### EXCERPT: {rel_path}\n"]
+    for index, (start, end) in enumerate(merge_spans(spans)):
+        if index:
+            parts.append("...\n")
+        parts.extend(f"{number:>6}| {lines[number - 1]}\n" for number in range(start, min(end, len(lines)) + 1))
+    parts.append("\n")
+    return "".join(parts)
@@ -1,6 +1,7 @@
 import os
-from dataclasses import dataclass
-from typing import Optional
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 class TaskParseError(Exception):
@@ -19,6 +20,12 @@ class Task:
     raw_header: str
     body_markdown: str
     path: str
+    # Optional CONTEXT_REF header: scan the project as committed at this git ref (e.g. a
+    # release tag) instead of the working tree.
+    context_ref: Optional[str] = None
+    # Optional SCOPE header: comma/space separated path globs (e.g. "ml/, strategies/*.py")
+    # limiting scanning, accepted changes and quality checks to that part of the project.
+    scope: List[str] = field(default_factory=list)
 
 
 REQUIRED_FIELDS = {"TASK_ID", "PROJECT", "TASK_TYPE", "TITLE"}
@@ -93,5 +100,7 @@ def parse_task_file(path: str) -> Task:
         raw_header="\n".join(header_lines).strip(),
         body_markdown=body.strip(),
         path=os.path.abspath(path),
+        context_ref=header_dict.get("CONTEXT_REF") or None,
+        scope=[item for item in re.split(r"[,\s]+", header_dict.get("SCOPE", "")) if item],
     )
     return task
@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("openai")
+
+from codex_client import CodexClient
+from prompt_budget import TokenCalibration
+from prompt_builder import PromptBuilder
+from rate_limiter import TokenBucketLimiter
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY_DEV", "test-key")
+    monkeypatch.delenv("META_AGENT_MODE", raising=False)
+    client = CodexClient(
+        mode="dev",
+        response_cache=None,
+        rate_limiter=TokenBucketLimiter(path=str(tmp_path / "rate_limit.json")),
+    )
+    client.budget.calibration = TokenCalibration(str(tmp_path / "calibration.json"))
+    return client
+
+
+def test_budget_filling_context_is_accepted(client):
+    builder = PromptBuilder()
+    metadata = {"task_id": "t1", "stage": "dev"}
+    budget = builder.plan_budget(client.budget, "Refactor the package.", metadata)
+    context = "".join(
+        f"### FILE: pkg/module_{index}.py\nVALUE_{index} = {index}\n\n" for index in range(8000)
+    )
+    assert len(context) > budget.context_chars
+
+    prompt = builder.build_prompt(
+        "Refactor the package.", context, metadata, budget=budget, project_overview="pkg: example package"
+    )
+    _, _, _, error = client._prepare(prompt)
+
+    assert error is None
+    # the context really fills its allotment (a file block is ~40 chars)
+    assert len(prompt) > budget.context_chars